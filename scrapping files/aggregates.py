@@ -0,0 +1,243 @@
+import argparse
+import csv
+import os
+import sqlite3
+
+from columnar import overs_to_balls, parse_int
+from metrics import log
+from player_index import add_player_ids, load_index, opponents
+
+# Running tournament totals per player and per team, updated as each match is
+# written. Only additive counts are stored, so adding a match is one upsert per
+# row and touches just the players in it; averages and rates are derived on read
+
+batting_counts = ['innings', 'not_outs', 'runs', 'balls', 'fours', 'sixes']
+bowling_counts = ['innings', 'balls', 'maidens', 'runs', 'wickets', 'dots', 'fours', 'sixes', 'wides', 'no_balls']
+
+tables = {
+    # table: (key columns, count columns)
+    'player_batting': (['player_id'], batting_counts),
+    'player_bowling': (['player_id'], bowling_counts),
+    'team_batting': (['team'], batting_counts),
+    'team_bowling': (['team'], bowling_counts),
+}
+
+
+def batting_counts_of(row):
+    not_out = row['not_out'] == 'Not Out'
+    return [1, int(not_out), parse_int(row['runs']) or 0, parse_int(row['balls']) or 0,
+            parse_int(row['fours']) or 0, parse_int(row['sixes']) or 0]
+
+
+def bowling_counts_of(row):
+    return [1, overs_to_balls(row['overs']) or 0] + [parse_int(row[column]) or 0 for column in bowling_counts[2:]]
+
+
+def ratio(numerator, denominator, scale=1.0):
+    return scale * numerator / denominator if denominator else None
+
+
+class Aggregates:
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            for table, (keys, counts) in tables.items():
+                extra = ', name TEXT, team TEXT' if keys == ['player_id'] else ''
+                columns = ', '.join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in counts)
+                self.connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ({keys[0]} PRIMARY KEY{extra}, {columns})")
+            # Which outputs of which match are already counted, so no match is added twice
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS processed (match_id TEXT, kind TEXT, PRIMARY KEY (match_id, kind))")
+            # Size of each CSV when the aggregates were last caught up with it
+            self.connection.execute("CREATE TABLE IF NOT EXISTS caught_up (file TEXT PRIMARY KEY, size INTEGER)")
+
+    def close(self):
+        self.connection.close()
+
+    def _upsert(self, table, key, counts, name=None, team=None):
+        key_column = tables[table][0][0]
+        columns = tables[table][1]
+        increments = ', '.join(f"{column} = {column} + excluded.{column}" for column in columns)
+        if key_column == 'player_id':
+            self.connection.execute(
+                f"INSERT INTO {table} (player_id, name, team, {', '.join(columns)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (player_id) DO UPDATE SET {increments}",
+                [key, name, team] + counts)
+        else:
+            self.connection.execute(
+                f"INSERT INTO {table} (team, {', '.join(columns)}) VALUES (?, {', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (team) DO UPDATE SET {increments}",
+                [key] + counts)
+
+    def is_processed(self, match_id, kind):
+        return self.connection.execute(
+            "SELECT 1 FROM processed WHERE match_id = ? AND kind = ?", (match_id, kind)).fetchone() is not None
+
+    def add_match(self, match_id, teams, batting=(), bowling=()):
+        # One transaction per match: either every row of the match is counted or none is
+        match_id = str(match_id)
+        with self.connection:
+            if batting and not self.is_processed(match_id, 'batting'):
+                seen_teams = set()
+                for row in batting:
+                    counts = batting_counts_of(row)
+                    if row.get('player_id'):
+                        self._upsert('player_batting', int(row['player_id']), counts, row['name'], row['team'])
+                    # A team's innings count once per match, not once per batter
+                    counts[0] = int(row['team'] not in seen_teams)
+                    seen_teams.add(row['team'])
+                    self._upsert('team_batting', row['team'], counts)
+                self.connection.execute("INSERT INTO processed VALUES (?, 'batting')", (match_id,))
+
+            if bowling and not self.is_processed(match_id, 'bowling'):
+                seen_teams = set()
+                for row in bowling:
+                    # Bowling rows carry the batting side; the bowler plays for the other team
+                    fielding = [team for team in teams if team != row['team']]
+                    if not fielding:
+                        # Only one side batted; fall back to the 'A vs B' match name
+                        fielding = [side for side in row['match'].split(' vs ') if side != row['team']]
+                    team = fielding[0] if fielding else ''
+                    counts = bowling_counts_of(row)
+                    if row.get('player_id'):
+                        self._upsert('player_bowling', int(row['player_id']), counts, row['name'], team)
+                    counts[0] = int(team not in seen_teams)
+                    seen_teams.add(team)
+                    self._upsert('team_bowling', team, counts)
+                self.connection.execute("INSERT INTO processed VALUES (?, 'bowling')", (match_id,))
+
+    def batting(self, table='player_batting'):
+        rows = []
+        for row in self.connection.execute(f"SELECT * FROM {table}"):
+            row = dict(row)
+            outs = row['innings'] - row['not_outs']
+            row['average'] = ratio(row['runs'], outs)
+            row['strike_rate'] = ratio(row['runs'], row['balls'], 100)
+            row['boundary_pct'] = ratio(row['fours'] + row['sixes'], row['balls'], 100)
+            rows.append(row)
+        return rows
+
+    def bowling(self, table='player_bowling'):
+        rows = []
+        for row in self.connection.execute(f"SELECT * FROM {table}"):
+            row = dict(row)
+            row['overs'] = f"{row['balls'] // 6}.{row['balls'] % 6}"
+            row['economy'] = ratio(row['runs'], row['balls'], 6)
+            row['average'] = ratio(row['runs'], row['wickets'])
+            row['strike_rate'] = ratio(row['balls'], row['wickets'])
+            row['dot_pct'] = ratio(row['dots'], row['balls'], 100)
+            row['boundary_pct'] = ratio(row['fours'] + row['sixes'], row['balls'], 100)
+            rows.append(row)
+        return rows
+
+
+def open_aggregates(folder, catch_up_csvs=True):
+    # The aggregates live next to the CSVs they summarise. A new database, or one
+    # whose CSVs have grown since it last looked, first counts the matches it is
+    # missing, so matches skipped by the manifest are not left out of the totals
+    aggregates = Aggregates(os.path.join(folder, 'aggregates.sqlite'))
+    if catch_up_csvs and is_behind(aggregates, folder):
+        added = catch_up(aggregates, folder)
+        if added:
+            log.info(f"Added {added} matches from the CSVs to {aggregates.path}")
+    return aggregates
+
+
+def csv_sizes(folder):
+    return {name: os.path.getsize(os.path.join(folder, name)) if os.path.isfile(os.path.join(folder, name)) else 0
+            for name in ('batting_stats.csv', 'bowling_stats.csv')}
+
+
+def is_behind(aggregates, folder):
+    recorded = dict(aggregates.connection.execute("SELECT file, size FROM caught_up").fetchall())
+    return any(recorded.get(name) != size for name, size in csv_sizes(folder).items())
+
+
+def read_unique_rows(csv_file, key_columns):
+    # Append-mode reruns repeat whole matches, so keep the first copy of each row
+    if not os.path.isfile(csv_file):
+        return []
+    rows, seen = [], set()
+    with open(csv_file, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            key = tuple(row[column] for column in key_columns)
+            if key not in seen:
+                seen.add(key)
+                rows.append(row)
+    return rows
+
+
+def catch_up(aggregates, folder):
+    # Count every match in the CSVs that the aggregates have not seen yet,
+    # e.g. after the first run or a crash between the CSV and aggregate writes
+    batting = read_unique_rows(os.path.join(folder, 'batting_stats.csv'), ['match_id', 'team', 'bat_pos'])
+    bowling = read_unique_rows(os.path.join(folder, 'bowling_stats.csv'), ['match_id', 'team', 'name'])
+    if any(not row.get('player_id') for row in batting + bowling):
+        add_player_ids(load_index(folder), batting, bowling)
+
+    match_teams = opponents(batting + bowling)
+    by_match = {}
+    for kind, rows in (('batting', batting), ('bowling', bowling)):
+        for row in rows:
+            by_match.setdefault(row['match_id'], {'batting': [], 'bowling': []})[kind].append(row)
+
+    added = 0
+    for match_id, rows in by_match.items():
+        if not all(aggregates.is_processed(match_id, kind) for kind in ('batting', 'bowling')):
+            aggregates.add_match(match_id, match_teams[match_id], rows['batting'], rows['bowling'])
+            added += 1
+    with aggregates.connection:
+        aggregates.connection.executemany("INSERT OR REPLACE INTO caught_up VALUES (?, ?)", csv_sizes(folder).items())
+    return added
+
+
+text_columns = {'name', 'team'}
+
+
+def format_cell(value, column):
+    if column in text_columns:
+        return f"{value or '':<26}"
+    if isinstance(value, float):
+        return f"{value:>14.2f}"
+    return f"{'' if value is None else value:>14}"
+
+
+def print_top(rows, sort_column, columns, count=10, descending=True):
+    rows = [row for row in rows if row[sort_column] is not None]
+    rows.sort(key=lambda row: row[sort_column], reverse=descending)
+    print(''.join(f"{column:<26}" if column in text_columns else f"{column:>14}" for column in columns))
+    for row in rows[:count]:
+        print(''.join(format_cell(row[column], column) for column in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Bring the tournament aggregates up to date with the CSVs and show the leaders')
+    parser.add_argument('folder', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csv files'))
+    parser.add_argument('--min-balls', type=int, default=30, help='Minimum balls faced or bowled to be ranked')
+    args = parser.parse_args()
+
+    aggregates = open_aggregates(args.folder, catch_up_csvs=False)
+    try:
+        print(f"Added {catch_up(aggregates, args.folder)} matches to {aggregates.path}")
+
+        batters = [row for row in aggregates.batting() if row['balls'] >= args.min_balls]
+        print("\nTop run scorers")
+        print_top(batters, 'runs', ['name', 'team', 'innings', 'runs', 'average', 'strike_rate'])
+
+        bowlers = [row for row in aggregates.bowling() if row['balls'] >= args.min_balls]
+        print("\nMost economical bowlers")
+        print_top(bowlers, 'economy', ['name', 'team', 'overs', 'wickets', 'economy', 'dot_pct'], descending=False)
+
+        print("\nTeams")
+        teams = [dict(row, innings_runs=ratio(row['runs'], row['innings'])) for row in aggregates.batting('team_batting')]
+        print_top(teams, 'strike_rate', ['team', 'innings', 'innings_runs', 'strike_rate', 'boundary_pct'], count=30)
+    finally:
+        aggregates.close()
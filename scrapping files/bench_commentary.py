@@ -0,0 +1,72 @@
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+
+from commentary import delivery_record, load_deliveries, phase_summary, resolve_player, scrape_commentary
+from commentary_parser import parse_deliveries
+from fixture_pages import commentary_pages, csv_folder, series_path
+from fixture_server import server_url, start_server
+from http_fetch import fetch_page
+from player_index import PlayerIndex
+from scorecard_parser import parse_match_links
+
+# Ingestion throughput for ball-by-ball commentary: streaming parse speed, then
+# end-to-end pages over the local fixture server into deliveries.bin, with the
+# time a full season backfill would take at that rate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark ball-by-ball commentary ingestion')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated per-request latency in seconds')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--season-matches', type=int, default=74, help='Matches in the season used for the backfill estimate')
+    args = parser.parse_args()
+
+    pages = commentary_pages()
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        deliveries = sum(1 for page in pages for _ in parse_deliveries(page))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"Parse: {len(pages) / best:,.0f} pages/sec, {deliveries / best:,.0f} deliveries/sec "
+          f"({deliveries / len(pages):.0f} deliveries per match)")
+
+    # Players missing from the index (late replacements) must get an id of their
+    # own, otherwise their deliveries are stored under id 0 and drop out of the phases
+    index = PlayerIndex(os.path.join(csv_folder, 'player_index.csv'), persist=False)
+    new_id = resolve_player(index, 'Zzyzx Newguy', 'India', {})
+    assert new_id and index.resolve('Zzyzx Newguy', ['India']) == new_id, 'new players are stored under id 0'
+
+    server = start_server(latency=args.latency)
+    base = server_url(server)
+    match_urls = parse_match_links(fetch_page(f"{base}{series_path}/match-schedule-fixtures-and-results"), base)
+
+    with tempfile.TemporaryDirectory() as folder:
+        for workers in args.workers:
+            output = os.path.join(folder, f"workers-{workers}")
+            os.makedirs(output)
+            # Resolve names against the shipped player index like a real run would
+            shutil.copy(os.path.join(csv_folder, 'player_index.csv'), output)
+            start = time.perf_counter()
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                scrape_commentary(match_urls, fetch_page, workers=workers, folder=output)
+            elapsed = time.perf_counter() - start
+            stored = load_deliveries(output)
+            print(f"{workers} workers: {len(match_urls) / elapsed:6.1f} matches/sec, {len(stored) / elapsed:8,.0f} deliveries/sec, "
+                  f"season of {args.season_matches} matches in {args.season_matches * elapsed / len(match_urls):.1f}s")
+
+        start = time.perf_counter()
+        summary = phase_summary(stored)
+        elapsed = time.perf_counter() - start
+        csv_bytes = os.path.getsize(os.path.join(csv_folder, 'batting_stats.csv')) + os.path.getsize(os.path.join(csv_folder, 'bowling_stats.csv'))
+        print(f"Storage: {delivery_record.size} bytes per delivery, {len(stored) * delivery_record.size / 1024:.0f} KiB for "
+              f"{len(stored):,} deliveries (scorecard CSVs: {csv_bytes / 1024:.0f} KiB)")
+        print(f"Phase summary over the memory-mapped deliveries: {elapsed * 1000:.1f} ms for {len(summary)} player-phases")
+        del stored
+
+    server.shutdown()
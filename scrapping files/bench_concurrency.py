@@ -0,0 +1,44 @@
+import argparse
+import contextlib
+import filecmp
+import os
+import tempfile
+import time
+
+from fixture_pages import series_path
+from fixture_server import server_url, start_server
+from http_fetch import fetch_page
+from scorecard import all_kinds, outputs, scrape_matches_concurrent
+from scorecard_parser import parse_match_links
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure match-page throughput from 1 to 8 workers against the local fixture server')
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated per-request latency in seconds')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency)
+    base = server_url(server)
+    match_urls = parse_match_links(fetch_page(f"{base}{series_path}/match-schedule-fixtures-and-results"), base)
+
+    with tempfile.TemporaryDirectory() as folder:
+        baseline = None
+        for workers in args.workers:
+            output = os.path.join(folder, f"workers-{workers}")
+            start = time.perf_counter()
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                scrape_matches_concurrent(match_urls, fetch_page, workers=workers, folder=output)
+            elapsed = time.perf_counter() - start
+
+            # Every worker count has to produce byte-identical CSVs
+            if baseline is None:
+                baseline = output
+                identical = 'baseline'
+            else:
+                names = [outputs[kind][0] for kind in all_kinds]
+                _, mismatch, errors = filecmp.cmpfiles(baseline, output, names, shallow=False)
+                identical = 'identical' if not mismatch and not errors else f"DIFFERS: {mismatch + errors}"
+
+            print(f"{workers} workers: {len(match_urls) / elapsed:6.1f} matches/sec ({elapsed:.2f}s, output {identical})")
+
+    server.shutdown()
@@ -0,0 +1,80 @@
+import argparse
+import contextlib
+import csv
+import os
+import tempfile
+import time
+from collections import OrderedDict
+
+from csv_sink import MatchCSVWriter
+
+# Sample data shipped with the repo
+default_source = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csv files', 'batting_stats.csv')
+
+
+def load_matches(source):
+    with open(source, newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        header = reader.fieldnames
+        matches = OrderedDict()
+        for row in reader:
+            matches.setdefault(row['match_id'], []).append(row)
+    return header, list(matches.values())
+
+
+# The old path: reopen, stat and build a writer for every single row
+def per_row_save(csv_file, header, data):
+    file_exists = os.path.isfile(csv_file)
+    with open(csv_file, mode='a', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=header)
+        if not file_exists:
+            writer.writeheader()
+        writer.writerow(data)
+    print(f"Successfully saved data for {data['name']} to CSV")
+
+
+def run_per_row(csv_file, header, matches):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for match in matches:
+            for row in match:
+                per_row_save(csv_file, header, row)
+
+
+def run_batched(csv_file, header, matches):
+    writer = MatchCSVWriter(csv_file, header)
+    for match in matches:
+        for row in match:
+            writer.add(row)
+        writer.commit()
+
+
+def time_run(func, header, matches, repeat):
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as folder:
+            csv_file = os.path.join(folder, 'out.csv')
+            start = time.perf_counter()
+            func(csv_file, header, matches)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare per-row CSV writes with the per-match batched sink')
+    parser.add_argument('--source', default=default_source)
+    parser.add_argument('--copies', type=int, default=5, help='Repeat the tournament this many times')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    header, matches = load_matches(args.source)
+    matches = matches * args.copies
+    total_rows = sum(len(match) for match in matches)
+
+    per_row_time = time_run(run_per_row, header, matches, args.repeat)
+    batched_time = time_run(run_batched, header, matches, args.repeat)
+
+    print(f"Rows: {total_rows} in {len(matches)} matches")
+    print(f"Per-row path: {total_rows / per_row_time:,.0f} rows/sec ({per_row_time:.3f}s)")
+    print(f"Batched sink: {total_rows / batched_time:,.0f} rows/sec ({batched_time:.3f}s)")
+    print(f"Speedup: {per_row_time / batched_time:.1f}x")
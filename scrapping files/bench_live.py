@@ -0,0 +1,98 @@
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+
+from fixture_pages import csv_folder, fixtures_page_size, live_match, load_scorecards, render_fixtures, render_scorecard, \
+    scorecard_path, series_path, site_pages
+from fixture_server import server_url, start_server
+from http_fetch import fetch_page
+from live_scores import LivePoller, conditional_fetch
+from metrics import metrics
+from scorecard import scrape_matches_concurrent
+from scorecard_parser import parse_match_links
+from throttle import rate_limiter
+
+# Cost of one live poll against the local fixture server while a few matches are
+# in progress: pages answered with 304, pages whose markup changed but whose
+# scorecard did not, and pages with new rows, next to rerunning the full crawl
+
+
+def counters():
+    return dict(metrics.summary('bench')['counters'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark live polling against rerunning the full scorecard crawl')
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated per-request latency in seconds')
+    parser.add_argument('--live', type=int, default=3, help='Matches in progress')
+    parser.add_argument('--steps', type=int, default=40, help='Polls from the first ball to the result')
+    args = parser.parse_args()
+    rate_limiter.configure(1000, 100)
+
+    pages = site_pages()
+    server = start_server(latency=args.latency, pages=pages)
+    base = server_url(server)
+    fixtures_url = f"{base}{series_path}/match-schedule-fixtures-and-results"
+    matches = load_scorecards()
+    paths = [scorecard_path(match_id, match) for match_id, match in matches.items()]
+    live = dict(list(zip(paths, matches.values()))[:args.live])
+    pages[fixtures_url[len(base):]] = render_fixtures(paths, fixtures_page_size, live=live)
+
+    def publish(progress, ad_seed):
+        for path, match in live.items():
+            status = 'Live' if progress < 1 else 'Match over, won by a margin'
+            pages[path] = render_scorecard(live_match(match, progress), status, ad_seed)
+
+    def timed_poll(poller, label):
+        before = counters()
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            changed = poller.poll()
+        elapsed = time.perf_counter() - start
+        after = counters()
+        delta = {name: after.get(name, 0) - before.get(name, 0) for name in after}
+        print(f"{label:<28} {elapsed * 1000:7.1f} ms, {delta.get('http_bytes', 0) / 1024:7.1f} KiB, "
+              f"{delta.get('polls_not_modified', 0)} not modified, {changed:3} rows changed")
+        return elapsed
+
+    with tempfile.TemporaryDirectory() as folder:
+        shutil.copy(os.path.join(csv_folder, 'player_index.csv'), folder)
+        poller = LivePoller(conditional_fetch, folder, workers=4)
+        publish(0.1, 0)
+        poller.discover(fixtures_url)
+        print(f"Watching {len(poller.watched)} of {len(paths)} matches")
+        timed_poll(poller, 'First poll')
+        timed_poll(poller, 'Nothing changed (304)')
+        publish(0.1, 1)
+        timed_poll(poller, 'Markup changed, same score')
+        publish(0.15, 2)
+        timed_poll(poller, 'A few balls later')
+
+        poll_times = []
+        for step in range(4, args.steps + 1):
+            publish(0.1 + 0.9 * step / args.steps, step)
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                poller.poll()
+                poll_times.append(time.perf_counter() - start)
+        print(f"Rest of the matches: {len(poll_times)} polls, slowest {max(poll_times) * 1000:.1f} ms, "
+              f"{len(poller.watched)} still watched")
+        poller.close()
+        with open(os.path.join(folder, 'batting_stats.csv'), encoding='utf-8') as file:
+            written = sum(1 for _ in file) - 1
+        expected = sum(len(innings['batting']) for match in live.values() for innings in match['innings'].values())
+        print(f"Final batting rows written to the CSV: {written} (full scorecards have {expected})")
+
+        match_urls = parse_match_links(fetch_page(fixtures_url), base)
+        before = counters()
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            scrape_matches_concurrent(match_urls, fetch_page, workers=4, folder=os.path.join(folder, 'rerun'))
+        elapsed = time.perf_counter() - start
+        print(f"{'Full crawl rerun':<28} {elapsed * 1000:7.1f} ms, "
+              f"{(counters().get('http_bytes', 0) - before.get('http_bytes', 0)) / 1024:7.1f} KiB")
+
+    server.shutdown()
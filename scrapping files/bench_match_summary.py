@@ -0,0 +1,56 @@
+import argparse
+import filecmp
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from fixture_pages import match_list_path
+from fixture_server import server_url, start_server
+
+# Cold start to CSV for match_summary.py: every run is a fresh interpreter, so
+# imports, browser startup, the page load, parsing and the CSV write all count
+
+script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'match_summary.py')
+
+
+def run_once(url, output, browser):
+    command = [sys.executable, script, '--url', url, '--output', output, '--no-cache', '--rate', '1000']
+    if browser:
+        command.append('--browser')
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed')
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare cold-start-to-CSV time of the HTTP and browser paths of match_summary.py')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated per-request latency in seconds')
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency)
+    url = f"{server_url(server)}{match_list_path}"
+
+    with tempfile.TemporaryDirectory() as folder:
+        outputs = {}
+        for name, browser in (('http', False), ('browser', True)):
+            output = os.path.join(folder, f"{name}.csv")
+            try:
+                times = [run_once(url, output, browser) for _ in range(args.runs)]
+            except Exception as e:
+                print(f"{name:>8}: unavailable ({e})")
+                continue
+            outputs[name] = output
+            print(f"{name:>8}: median {statistics.median(times) * 1000:7.0f} ms, best {min(times) * 1000:7.0f} ms over {args.runs} runs")
+
+        if len(outputs) == 2:
+            same = filecmp.cmp(outputs['http'], outputs['browser'], shallow=False)
+            print(f"CSV output {'identical' if same else 'DIFFERS'} between the two paths")
+
+    server.shutdown()
@@ -0,0 +1,41 @@
+import argparse
+import glob
+import os
+import time
+
+from fixture_pages import scorecard_pages
+from scorecard_parser import batting_rows, bowling_rows, parse_scorecard
+
+
+def load_pages(folder):
+    # Saved pages, e.g. from driver.page_source, one scorecard per .html file
+    pages = []
+    for path in sorted(glob.glob(os.path.join(folder, '*.html'))):
+        with open(path, encoding='utf-8') as file:
+            pages.append(file.read())
+    return pages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark offline scorecard extraction')
+    parser.add_argument('--pages', help='Folder of saved scorecard pages (defaults to synthetic pages built from the CSVs)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages) if args.pages else scorecard_pages()
+    if not pages:
+        print("No pages to parse.")
+        raise SystemExit(1)
+
+    best = None
+    for _ in range(args.repeat):
+        rows = 0
+        start = time.perf_counter()
+        for match_id, page in enumerate(pages, start=1):
+            scorecard = parse_scorecard(page)
+            rows += len(batting_rows(scorecard, match_id)) + len(bowling_rows(scorecard, match_id))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"Pages: {len(pages)}, rows per pass: {rows}")
+    print(f"{len(pages) / best:,.0f} pages/sec, {rows / best:,.0f} rows/sec ({best:.3f}s per pass)")
@@ -0,0 +1,38 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from best11 import load_stats, score_players
+from simulator import best_xi, candidate_xis, fit_model, rank_xis
+
+# Throughput of the match simulator: simulated matches per second when ranking
+# candidate XIs, single process against the process pool
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark ranking candidate XIs by simulated win probability')
+    parser.add_argument('--candidates', type=int, nargs='+', default=[100, 500])
+    parser.add_argument('--simulations', type=int, default=5000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    batting, bowling, players = load_stats()
+    stats = score_players(batting, bowling, players)
+    start = time.perf_counter()
+    model = fit_model(batting, bowling, stats)
+    print(f"Fitted {len(stats)} players in {(time.perf_counter() - start) * 1000:.1f} ms")
+    opponent = best_xi(stats)
+
+    for count in args.candidates:
+        xis = candidate_xis(stats, count, rng=np.random.default_rng(0))
+        results = {}
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            results[workers] = rank_xis(model, xis, opponent, args.simulations, workers)
+            elapsed = time.perf_counter() - start
+            print(f"{len(xis)} XIs, {workers} workers: {len(xis) * args.simulations / elapsed:12,.0f} matches/sec "
+                  f"({elapsed:.2f}s)")
+        first = next(iter(results.values()))
+        assert all(np.array_equal(first[0], wins) for wins, _, _ in results.values()), 'worker counts disagree'
@@ -0,0 +1,199 @@
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from fixture_pages import (load_squads, match_list_path, render_match_list, render_squad, scorecard_pages, series_path,
+                           site_pages, squads_path)
+from fixture_server import recorded_pages, server_url, start_server
+from http_fetch import fetch_page
+from scorecard_parser import batting_rows, bowling_rows, parse_match_links, parse_scorecard
+from squad_parser import parse_squad
+from summary_parser import parse_match_summaries
+
+# One benchmark run over every scraper against the local stand-in site: offline
+# extraction speed, end-to-end pages/sec on the HTTP fast paths and on the
+# browser paths the scripts use by default, and what starting a browser costs.
+# Browser numbers are reported as unavailable when Chrome cannot be started
+
+folder = os.path.dirname(os.path.abspath(__file__))
+fixtures_path = f"{series_path}/match-schedule-fixtures-and-results"
+
+
+def best_of(repeat, run):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_extraction(repeat):
+    # rows/sec and pages/sec of the offline parsers on the same pages the server sends
+    scorecards = scorecard_pages()
+    squads = [(country, render_squad(players)) for country, players in load_squads().items()]
+    match_list = render_match_list()
+
+    def parse_scorecards():
+        rows = 0
+        for match_id, page in enumerate(scorecards, start=1):
+            scorecard = parse_scorecard(page)
+            rows += len(batting_rows(scorecard, match_id)) + len(bowling_rows(scorecard, match_id))
+        return rows
+
+    cases = (
+        ('scorecard', len(scorecards), parse_scorecards),
+        ('squad', len(squads), lambda: sum(len(parse_squad(page, country)) for country, page in squads)),
+        ('match list', 1, lambda: len(parse_match_summaries(match_list))),
+    )
+    results = {}
+    for name, pages, parse in cases:
+        elapsed, rows = best_of(repeat, parse)
+        results[name] = {'pages': pages, 'rows': rows, 'pages_per_sec': pages / elapsed, 'rows_per_sec': rows / elapsed}
+    return results
+
+
+def run_script(name, arguments):
+    # Cold start of one scraper script in a fresh interpreter
+    command = [sys.executable, os.path.join(folder, name)] + arguments + ['--rate', '1000', '--burst', '100']
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed')
+    return elapsed
+
+
+def bench_http(base, workers):
+    from scorecard import scrape_matches_concurrent
+
+    results = {}
+    match_urls = parse_match_links(fetch_page(f"{base}{fixtures_path}"), base)
+    for count in workers:
+        with tempfile.TemporaryDirectory() as output, open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            scrape_matches_concurrent(match_urls, fetch_page, workers=count, folder=output)
+            elapsed = time.perf_counter() - start
+        results[f"scorecard http, {count} workers"] = {'pages': len(match_urls), 'seconds': elapsed}
+
+    squad_pages = 1 + len(load_squads())
+    with tempfile.TemporaryDirectory() as output:
+        results['match_summary.py http'] = {
+            'pages': 1,
+            'seconds': run_script('match_summary.py', ['--url', f"{base}{match_list_path}",
+                                                        '--output', os.path.join(output, 'match_summary.csv'), '--no-cache']),
+        }
+        results['player_data.py http'] = {
+            'pages': squad_pages,
+            'seconds': run_script('player_data.py', ['--http', '--url', f"{base}{squads_path}", '--output-dir', output,
+                                                      '--no-cache', '--no-manifest']),
+        }
+    return results
+
+
+def bench_browser_startup(repeat):
+    import load_profile
+
+    results = {}
+    for profile in load_profile.profiles:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            driver = load_profile.create_driver(profile, headless=True)
+            times.append(time.perf_counter() - start)
+            driver.quit()
+        results[profile] = {'seconds': min(times)}
+    return results
+
+
+def bench_browser(base):
+    # The default paths of batsman.py, bowling.py, match_summary.py and player_data.py
+    import scorecard
+
+    results = {}
+    scorecard.base_url = f"{base}{fixtures_path}"
+    match_count = len(parse_match_links(fetch_page(scorecard.base_url), base))
+    for name, kinds in (('batsman.py browser', ('batting',)), ('bowling.py browser', ('bowling',))):
+        with tempfile.TemporaryDirectory() as output:
+            start = time.perf_counter()
+            driver = scorecard.create_driver()
+            try:
+                scorecard.scrape_matches(driver, kinds=kinds, folder=output)
+            finally:
+                driver.quit()
+            results[name] = {'pages': 1 + match_count, 'seconds': time.perf_counter() - start}
+
+    squad_pages = 1 + len(load_squads())
+    with tempfile.TemporaryDirectory() as output:
+        results['match_summary.py browser'] = {
+            'pages': 1,
+            'seconds': run_script('match_summary.py', ['--url', f"{base}{match_list_path}", '--browser',
+                                                        '--output', os.path.join(output, 'match_summary.csv'), '--no-cache']),
+        }
+        results['player_data.py browser'] = {
+            'pages': squad_pages,
+            'seconds': run_script('player_data.py', ['--url', f"{base}{squads_path}", '--output-dir', output,
+                                                      '--no-cache', '--no-manifest']),
+        }
+    return results
+
+
+def print_runs(results):
+    for name, run in results.items():
+        print(f"  {name:<32} {run['pages'] / run['seconds']:8.1f} pages/sec ({run['pages']} pages in {run['seconds']:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark every scraper against the local stand-in site')
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated per-request latency in seconds')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--cache-dir', help='Serve pages recorded in this page cache as well as the synthetic ones')
+    parser.add_argument('--no-browser', action='store_true', help='Skip the browser startup and browser path runs')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    pages = None
+    if args.cache_dir:
+        pages = site_pages()
+        pages.update(recorded_pages(args.cache_dir))
+    server = start_server(latency=args.latency, pages=pages)
+    base = server_url(server)
+    results = {'latency': args.latency}
+
+    print(f"Extraction (offline, best of {args.repeat}):")
+    results['extraction'] = bench_extraction(args.repeat)
+    for name, run in results['extraction'].items():
+        print(f"  {name:<32} {run['pages_per_sec']:8,.0f} pages/sec {run['rows_per_sec']:10,.0f} rows/sec")
+
+    print(f"End to end over HTTP ({args.latency * 1000:.0f} ms latency):")
+    results['http'] = bench_http(base, args.workers)
+    print_runs(results['http'])
+
+    if not args.no_browser:
+        print(f"Browser startup (best of {args.repeat}):")
+        try:
+            results['browser_startup'] = bench_browser_startup(args.repeat)
+            for profile, run in results['browser_startup'].items():
+                print(f"  {profile:<32} {run['seconds'] * 1000:8.0f} ms")
+        except Exception as e:
+            print(f"  unavailable ({str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__})")
+
+        print(f"End to end in a browser ({args.latency * 1000:.0f} ms latency):")
+        try:
+            results['browser'] = bench_browser(base)
+            print_runs(results['browser'])
+        except Exception as e:
+            print(f"  unavailable ({str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__})")
+
+    server.shutdown()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.json}")
@@ -0,0 +1,264 @@
+import argparse
+import os
+import pathlib
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+from player_index import add_player_ids, load_index, team_key
+
+# Best-11 selection: per-player impact scores computed column-wise over the
+# scraped CSVs, then an exact integer program picks the XI under role constraints
+
+csv_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csv files')
+
+# Scoring weights
+wicket_value = 20.0      # Runs a wicket is worth when adding bowling to batting impact
+shrinkage_innings = 2.0  # Damps players with only a couple of appearances
+
+# Default role constraints for the XI
+default_constraints = {
+    'size': 11,
+    'min_keepers': 1,
+    'min_openers': 2,
+    'min_bowling_options': 5,
+    'min_specialist_bowlers': 3,
+    'max_per_team': None,
+}
+
+bowling_roles = {'Bowler', 'Allrounder', 'Batting Allrounder', 'Bowling Allrounder'}
+
+
+def overs_to_balls(overs):
+    # Cricket notation: 3.4 overs is 3 overs and 4 balls
+    overs = pd.to_numeric(overs, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    whole = np.floor(overs)
+    return (whole * 6 + np.rint((overs - whole) * 10)).astype(np.int64)
+
+
+def ratio(numerator, denominator):
+    # Element-wise division that yields 0 where the denominator is 0
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+def load_players(folder=csv_folder, index=None):
+    players = pd.read_csv(os.path.join(folder, 'player_data.csv')).drop_duplicates(['Country', 'Name'])
+    index = index or load_index(folder, persist=False)
+    return players.assign(player_id=[index.add_player(country, name)
+                                     for country, name in zip(players['Country'], players['Name'])])
+
+
+def load_stats(folder=csv_folder):
+    batting = pd.read_csv(os.path.join(folder, 'batting_stats.csv'), dtype={'match_id': str})
+    bowling = pd.read_csv(os.path.join(folder, 'bowling_stats.csv'), dtype={'match_id': str})
+
+    # Append-mode reruns repeat whole matches, so keep one copy of each row
+    batting = batting.drop_duplicates(['match_id', 'team', 'bat_pos'])
+    bowling = bowling.drop_duplicates(['match_id', 'team', 'name'])
+
+    # Everything is joined on player ids; CSVs written before the index existed
+    # are resolved here without being rewritten, and so is the player index
+    index = load_index(folder, persist=False)
+    players = load_players(folder, index)
+    if 'player_id' not in batting or 'player_id' not in bowling or \
+            batting['player_id'].isna().any() or bowling['player_id'].isna().any():
+        batting_rows = batting.astype({'player_id': object} if 'player_id' in batting else {}).to_dict('records')
+        bowling_rows = bowling.astype({'player_id': object} if 'player_id' in bowling else {}).to_dict('records')
+        add_player_ids(index, batting_rows, bowling_rows)
+        batting = batting.assign(player_id=[row['player_id'] for row in batting_rows])
+        bowling = bowling.assign(player_id=[row['player_id'] for row in bowling_rows])
+    batting = batting.astype({'player_id': np.int64})
+    bowling = bowling.astype({'player_id': np.int64})
+    return batting, bowling, players
+
+
+def aggregate_players(batting, bowling):
+    # Per-player totals straight from the raw rows
+    batting = batting.assign(
+        out=(batting['not_out'] == 'Out').astype(np.int64),
+        runs=pd.to_numeric(batting['runs'], errors='coerce').fillna(0),
+        balls=pd.to_numeric(batting['balls'], errors='coerce').fillna(0),
+    )
+    bowling = bowling.assign(
+        balls_bowled=overs_to_balls(bowling['overs']),
+        runs_conceded=pd.to_numeric(bowling['runs'], errors='coerce').fillna(0),
+        wickets=pd.to_numeric(bowling['wickets'], errors='coerce').fillna(0),
+    )
+
+    bat = batting.groupby('player_id').agg(
+        name=('name', 'first'), bat_team=('team', 'first'), innings=('runs', 'size'),
+        runs=('runs', 'sum'), balls=('balls', 'sum'), outs=('out', 'sum'),
+    )
+    bowl = bowling.groupby('player_id').agg(
+        bowl_name=('name', 'first'), bowl_innings=('wickets', 'size'), balls_bowled=('balls_bowled', 'sum'),
+        runs_conceded=('runs_conceded', 'sum'), wickets=('wickets', 'sum'),
+    )
+    stats = bat.join(bowl, how='outer')
+    stats['name'] = stats['name'].fillna(stats['bowl_name'])
+    return stats.drop(columns='bowl_name')
+
+
+def load_aggregated(folder=csv_folder):
+    # The same totals read from the running aggregates kept by the scrapers,
+    # without touching the raw CSVs (aggregates.py builds them for older folders).
+    # The database is opened read-only, so a folder without one is left alone
+    path = os.path.join(folder, 'aggregates.sqlite')
+    missing = (f"No aggregates in {path}. Run 'python aggregates.py \"{folder}\"' to build them, "
+               f"or score from the CSVs without --from-aggregates")
+    if not os.path.isfile(path):
+        raise ValueError(missing)
+    connection = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + '?mode=ro', uri=True)
+    try:
+        try:
+            matches = connection.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+        except sqlite3.OperationalError:
+            matches = 0
+        if not matches:
+            raise ValueError(missing)
+        bat = pd.read_sql_query(
+            "SELECT player_id, name, team AS bat_team, innings, runs, balls, innings - not_outs AS outs "
+            "FROM player_batting", connection, index_col='player_id')
+        bowl = pd.read_sql_query(
+            "SELECT player_id, name AS bowl_name, innings AS bowl_innings, balls AS balls_bowled, "
+            "runs AS runs_conceded, wickets FROM player_bowling", connection, index_col='player_id')
+    finally:
+        connection.close()
+    stats = bat.join(bowl, how='outer')
+    stats['name'] = stats['name'].fillna(stats['bowl_name'])
+    return stats.drop(columns='bowl_name')
+
+
+def score_players(batting, bowling, players):
+    return score_stats(aggregate_players(batting, bowling), players)
+
+
+def score_stats(stats, players):
+    stats = stats.fillna({
+        'innings': 0, 'runs': 0, 'balls': 0, 'outs': 0,
+        'bowl_innings': 0, 'balls_bowled': 0, 'runs_conceded': 0, 'wickets': 0,
+    })
+
+    runs = stats['runs'].to_numpy(dtype=np.float64)
+    balls = stats['balls'].to_numpy(dtype=np.float64)
+    outs = stats['outs'].to_numpy(dtype=np.float64)
+    innings = stats['innings'].to_numpy(dtype=np.float64)
+    wickets = stats['wickets'].to_numpy(dtype=np.float64)
+    runs_conceded = stats['runs_conceded'].to_numpy(dtype=np.float64)
+    bowl_innings = stats['bowl_innings'].to_numpy(dtype=np.float64)
+    overs = stats['balls_bowled'].to_numpy(dtype=np.float64) / 6
+
+    # Batting: runs per innings scaled by strike rate relative to the tournament
+    league_strike_rate = 100 * runs.sum() / max(balls.sum(), 1)
+    strike_rate = ratio(100 * runs, balls)
+    batting_impact = ratio(runs, innings) * strike_rate / league_strike_rate
+    batting_impact *= innings / (innings + shrinkage_innings)
+
+    # Bowling: wickets plus runs saved against the tournament economy, per innings
+    league_economy = runs_conceded.sum() / max(overs.sum(), 1)
+    economy = ratio(runs_conceded, overs)
+    runs_saved = np.where(overs > 0, (league_economy - economy) * overs, 0)
+    bowling_impact = ratio(wicket_value * wickets + runs_saved, bowl_innings)
+    bowling_impact *= bowl_innings / (bowl_innings + shrinkage_innings)
+
+    stats['strike_rate'] = strike_rate
+    stats['average'] = np.where(outs > 0, ratio(runs, outs), runs)
+    stats['economy'] = economy
+    stats['batting_impact'] = batting_impact
+    stats['bowling_impact'] = bowling_impact
+    stats['score'] = batting_impact + bowling_impact
+
+    # Roles and countries come from the squad lists
+    squad = players.rename(columns={'Country': 'team'}).drop_duplicates('player_id').set_index('player_id')[['team', 'Role']]
+    stats = stats.join(squad, how='left')
+    stats['team'] = stats['team'].fillna(stats['bat_team'])
+    stats['role'] = stats['Role'].fillna('Unknown')
+    stats = stats.drop(columns=['Role', 'bat_team'])
+
+    role = stats['role']
+    stats['is_keeper'] = role.str.contains('Wicketkeeper')
+    stats['is_opener'] = role == 'Opening Batter'
+    stats['is_bowling_option'] = role.isin(bowling_roles)
+    stats['is_specialist_bowler'] = role == 'Bowler'
+    return stats.reset_index()
+
+
+def prune_candidates(stats, constraints):
+    # Players with the same role flags (and team, when capped) are interchangeable
+    # for every constraint, so an optimal XI only ever uses the best `size` of each
+    # such group. Keeping just those makes the integer program tiny and still exact
+    group_columns = ['is_keeper', 'is_opener', 'is_bowling_option', 'is_specialist_bowler']
+    if constraints['max_per_team']:
+        group_columns.append('team')
+    ranked = stats.sort_values('score', ascending=False, kind='stable')
+    return ranked.groupby(group_columns, sort=False).head(constraints['size'])
+
+
+def select_best_xi(stats, constraints=None):
+    constraints = {**default_constraints, **(constraints or {})}
+    candidates = prune_candidates(stats, constraints).reset_index(drop=True)
+    count = len(candidates)
+
+    rows = [np.ones(count)]
+    lower = [constraints['size']]
+    upper = [constraints['size']]
+    for column, minimum in (('is_keeper', 'min_keepers'), ('is_opener', 'min_openers'),
+                            ('is_bowling_option', 'min_bowling_options'),
+                            ('is_specialist_bowler', 'min_specialist_bowlers')):
+        if constraints[minimum]:
+            rows.append(candidates[column].to_numpy(dtype=np.float64))
+            lower.append(constraints[minimum])
+            upper.append(np.inf)
+
+    if constraints['max_per_team']:
+        codes, _ = pd.factorize(candidates['team'].map(team_key))
+        team_matrix = (codes[None, :] == np.arange(codes.max() + 1)[:, None]).astype(np.float64)
+        rows.extend(team_matrix)
+        lower.extend([0] * len(team_matrix))
+        upper.extend([constraints['max_per_team']] * len(team_matrix))
+
+    result = milp(
+        c=-candidates['score'].to_numpy(dtype=np.float64),
+        constraints=LinearConstraint(np.vstack(rows), lower, upper),
+        integrality=np.ones(count),
+        bounds=Bounds(0, 1),
+    )
+    if not result.success:
+        raise ValueError(f"No XI satisfies the constraints: {result.message}")
+
+    chosen = candidates[result.x > 0.5]
+    return chosen.sort_values(['is_opener', 'batting_impact'], ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pick the best XI from the scraped tournament data')
+    parser.add_argument('--csv-dir', default=csv_folder)
+    parser.add_argument('--min-keepers', type=int, default=default_constraints['min_keepers'])
+    parser.add_argument('--min-openers', type=int, default=default_constraints['min_openers'])
+    parser.add_argument('--min-bowling-options', type=int, default=default_constraints['min_bowling_options'])
+    parser.add_argument('--min-specialist-bowlers', type=int, default=default_constraints['min_specialist_bowlers'])
+    parser.add_argument('--max-per-team', type=int, default=None)
+    parser.add_argument('--from-aggregates', action='store_true', help='Score from the running aggregates instead of the raw CSVs')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.from_aggregates:
+        stats = score_stats(load_aggregated(args.csv_dir), load_players(args.csv_dir))
+    else:
+        batting, bowling, players = load_stats(args.csv_dir)
+        start = time.perf_counter()
+        stats = score_players(batting, bowling, players)
+    xi = select_best_xi(stats, {
+        'min_keepers': args.min_keepers,
+        'min_openers': args.min_openers,
+        'min_bowling_options': args.min_bowling_options,
+        'min_specialist_bowlers': args.min_specialist_bowlers,
+        'max_per_team': args.max_per_team,
+    })
+    elapsed = time.perf_counter() - start
+
+    columns = ['name', 'team', 'role', 'runs', 'strike_rate', 'wickets', 'economy', 'score']
+    print(xi[columns].to_string(index=False, float_format=lambda value: f"{value:.2f}"))
+    print(f"Total score: {xi['score'].sum():.2f} (scored {len(stats)} players and selected in {elapsed * 1000:.1f} ms)")
@@ -0,0 +1,189 @@
+import argparse
+import csv
+import os
+import re
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from metrics import configure_logging, log
+
+# Typed copies of the scraped CSVs. Numbers are stored as real integer and float
+# columns, overs as balls, ages as days, and repeated strings such as teams and
+# player names are dictionary-encoded. Each CSV gets a zstd-compressed Parquet
+# file for other tools and an uncompressed Arrow IPC file next to it, which
+# load_columnar memory-maps without decompressing or decoding anything
+
+dictionary = pa.dictionary(pa.int32(), pa.string())
+
+# Output column, source CSV column and Arrow type for every output
+schemas = {
+    'batting': [
+        ('match_id', 'match_id', pa.int32()),
+        ('match', 'match', dictionary),
+        ('team', 'team', dictionary),
+        ('bat_pos', 'bat_pos', pa.int8()),
+        ('name', 'name', dictionary),
+        ('not_out', 'not_out', pa.bool_()),
+        ('runs', 'runs', pa.int16()),
+        ('balls', 'balls', pa.int16()),
+        ('minutes', 'minutes', pa.int16()),
+        ('fours', 'fours', pa.int8()),
+        ('sixes', 'sixes', pa.int8()),
+        ('strike_rate', 'strike_rate', pa.float32()),
+        ('player_id', 'player_id', pa.int32()),
+    ],
+    'bowling': [
+        ('match_id', 'match_id', pa.int32()),
+        ('match', 'match', dictionary),
+        ('team', 'team', dictionary),
+        ('name', 'name', dictionary),
+        ('balls', 'overs', pa.int16()),
+        ('maidens', 'maidens', pa.int8()),
+        ('runs', 'runs', pa.int16()),
+        ('wickets', 'wickets', pa.int8()),
+        ('economy', 'economy', pa.float32()),
+        ('dots', 'dots', pa.int16()),
+        ('fours', 'fours', pa.int8()),
+        ('sixes', 'sixes', pa.int8()),
+        ('wides', 'wides', pa.int8()),
+        ('no_balls', 'no_balls', pa.int8()),
+        ('player_id', 'player_id', pa.int32()),
+    ],
+    'matches': [
+        ('match_id', 'match_id', pa.int32()),
+        ('match', 'match', dictionary),
+        ('title', 'title', pa.string()),
+        ('team_1', 'team_1', dictionary),
+        ('team_2', 'team_2', dictionary),
+        ('url', 'url', pa.string()),
+    ],
+    'squad': [
+        ('country', 'Country', dictionary),
+        ('name', 'Name', dictionary),
+        ('role', 'Role', dictionary),
+        ('age_days', 'Age', pa.int32()),
+        ('batting_type', 'Batting Type', dictionary),
+        ('bowling_type', 'Bowling Type', dictionary),
+        ('image_url', 'Image URL', dictionary),
+    ],
+}
+
+csv_names = {
+    'batting': 'batting_stats.csv',
+    'bowling': 'bowling_stats.csv',
+    'matches': 'match_data.csv',
+    'squad': 'player_data.csv',
+}
+
+
+def parse_int(text):
+    try:
+        return int(float(text))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def overs_to_balls(text):
+    # Cricket notation: '3.4' overs is 3 overs and 4 balls, i.e. 22 balls
+    if text is None or text == '':
+        return None
+    whole, _, part = str(text).partition('.')
+    try:
+        return int(whole or 0) * 6 + int(part or 0)
+    except ValueError:
+        return None
+
+
+def age_to_days(text):
+    # Squad pages give ages like '22y 155d'
+    match = re.match(r'\s*(\d+)y(?:\s*(\d+)d)?', text or '')
+    if not match:
+        return None
+    years, days = int(match.group(1)), int(match.group(2) or 0)
+    return years * 365 + years // 4 + days
+
+
+def convert(csv_column, arrow_type, values):
+    if csv_column == 'overs':
+        return pa.array([overs_to_balls(value) for value in values], type=arrow_type)
+    if csv_column == 'Age':
+        return pa.array([age_to_days(value) for value in values], type=arrow_type)
+    if csv_column == 'not_out':
+        return pa.array([value == 'Not Out' for value in values], type=arrow_type)
+    if pa.types.is_integer(arrow_type):
+        return pa.array([parse_int(value) for value in values], type=arrow_type)
+    if pa.types.is_floating(arrow_type):
+        return pa.array([parse_float(value) for value in values], type=arrow_type)
+    if pa.types.is_dictionary(arrow_type):
+        return pa.array(values, type=pa.string()).dictionary_encode()
+    return pa.array(values, type=arrow_type)
+
+
+def csv_to_table(csv_file, kind):
+    with open(csv_file, newline='', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+
+    columns = {}
+    for name, csv_column, arrow_type in schemas[kind]:
+        values = [row.get(csv_column) for row in rows]
+        columns[name] = convert(csv_column, arrow_type, values)
+    return pa.table(columns)
+
+
+def arrow_path(parquet_file):
+    return os.path.splitext(parquet_file)[0] + '.arrow'
+
+
+def write_parquet(csv_file, kind, parquet_file=None):
+    parquet_file = parquet_file or os.path.splitext(csv_file)[0] + '.parquet'
+    table = csv_to_table(csv_file, kind)
+
+    # Write to a temporary name first so readers never see a half-written file
+    temp_file = parquet_file + '.tmp'
+    pq.write_table(table, temp_file, compression='zstd', use_dictionary=True)
+    os.replace(temp_file, parquet_file)
+
+    temp_file = arrow_path(parquet_file) + '.tmp'
+    with pa.OSFile(temp_file, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(temp_file, arrow_path(parquet_file))
+    return parquet_file
+
+
+def write_parquet_outputs(folder, kinds):
+    for kind in kinds:
+        csv_file = os.path.join(folder, csv_names[kind])
+        if not os.path.isfile(csv_file):
+            continue
+        try:
+            parquet_file = write_parquet(csv_file, kind)
+            log.info(f"Wrote typed copy of {csv_file} to {parquet_file}")
+        except Exception as e:
+            log.error(f"Error writing Parquet copy of {csv_file}: {str(e)}")
+
+
+def load_columnar(parquet_file):
+    # Zero-copy read of the Arrow IPC file: the columns point into the memory map.
+    # Parquet files from before the IPC copies existed are decompressed instead
+    if os.path.isfile(arrow_path(parquet_file)):
+        return pa.ipc.open_file(pa.memory_map(arrow_path(parquet_file), 'r')).read_all()
+    dictionary_columns = [field.name for field in pq.read_schema(parquet_file)
+                          if pa.types.is_dictionary(field.type)]
+    return pq.read_table(parquet_file, memory_map=True, read_dictionary=dictionary_columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write typed Parquet copies of the scraped CSVs')
+    parser.add_argument('folder', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csv files'))
+    args = parser.parse_args()
+
+    configure_logging(verbose=True)
+    write_parquet_outputs(args.folder, csv_names)
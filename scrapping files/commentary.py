@@ -0,0 +1,407 @@
+import argparse
+import csv
+import hashlib
+import os
+import struct
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from columnar import overs_to_balls
+from commentary_parser import extra_types, parse_deliveries
+from crawl_manifest import commit_record
+from http_fetch import fetch_page
+import load_profile
+import metrics as run_metrics
+from metrics import log, metrics
+from page_cache import PageCache, cached_fetch
+from player_index import load_index, name_key, team_key
+import quarantine as page_quarantine
+from quarantine import parse_or_quarantine, quarantine
+from scorecard_parser import is_completed_match
+from throttle import add_arguments, configure_from_args, throttled
+
+# Ball-by-ball deliveries for phase analysis. Each match's commentary page is
+# parsed as a stream and its deliveries are appended to deliveries.bin as
+# fixed-width 19-byte records with one fsync'd append per match, next to the
+# CSVs. Reading them back is a single memory map into a numpy record array
+
+folder_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csv files')
+deliveries_name = 'deliveries.bin'
+
+# One delivery, little-endian and unpadded; player ids are the ids of player_index.csv
+delivery_record = struct.Struct('<IBBBiiBBBB')
+delivery_dtype = np.dtype([
+    ('match_id', '<u4'),
+    ('innings', 'u1'),
+    ('over', 'u1'),          # 0-based over number
+    ('ball', 'u1'),          # Ball number within the over as shown in the commentary
+    ('batter_id', '<i4'),
+    ('bowler_id', '<i4'),
+    ('batter_runs', 'u1'),
+    ('extras', 'u1'),
+    ('extra_type', 'u1'),    # Index into commentary_parser.extra_types
+    ('wicket', 'u1'),
+])
+assert delivery_dtype.itemsize == delivery_record.size
+
+# (phase, first over, last over), 0-based
+phases = [
+    ('powerplay', 0, 5),
+    ('middle', 6, 14),
+    ('death', 15, 19),
+]
+
+commentary_selector = 'div.ds-text-tight-m.ds-font-regular.ds-flex.ds-px-3.ds-py-2'
+over_selector = f"{commentary_selector} span.ds-text-tight-s.ds-font-regular.ds-mb-1"
+
+# The page shows the latest overs first and loads older ones as it is scrolled
+first_ball_script = """
+return Array.from(document.querySelectorAll(arguments[0])).some(span => span.textContent.trim() === '0.1');
+"""
+load_more_script = 'window.scrollTo(0, document.body.scrollHeight);'
+
+
+def commentary_url(match_url):
+    return match_url.replace('/full-scorecard', '/ball-by-ball-commentary')
+
+
+def load_older_overs(driver, timeout=60, pause=0.5, patience=6):
+    # Scroll until the first ball of the match has been rendered. Gives up when
+    # nothing new has loaded for a few scrolls; the partial page is then caught by
+    # delivery_problem and the match is not recorded
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+
+    deadline = time.monotonic() + timeout
+    loaded, stalled = -1, 0
+    while not driver.execute_script(first_ball_script, over_selector):
+        count = len(driver.find_elements(By.CSS_SELECTOR, commentary_selector))
+        stalled = stalled + 1 if count == loaded else 0
+        if stalled >= patience or time.monotonic() > deadline:
+            metrics.count('timeouts')
+            raise TimeoutException(f"Older overs stopped loading after {count} deliveries")
+        loaded = count
+        driver.execute_script(load_more_script)
+        metrics.count('commentary_scrolls')
+        time.sleep(pause)
+
+
+def match_number(match_url):
+    # The ESPN object id, or the hash fallback of scorecard.match_id_from_url
+    from scorecard import match_id_from_url
+    return int(match_id_from_url(match_url))
+
+
+class DeliveryWriter:
+    # Same commit protocol as MatchCSVWriter: a match's records are buffered and
+    # written with a single fsync'd append, and last_commit feeds the manifest
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.buffer = bytearray()
+        self.rows = 0
+        self.last_commit = None
+
+        folder = os.path.dirname(output_file)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._repair_torn_tail()
+
+    def _repair_torn_tail(self):
+        # A crash in the middle of an append leaves a partial record at the end
+        if not os.path.isfile(self.output_file):
+            return
+        size = os.path.getsize(self.output_file)
+        if size % delivery_record.size:
+            with open(self.output_file, 'rb+') as file:
+                file.truncate(size - size % delivery_record.size)
+            log.warning(f"Removed partial delivery at the end of {self.output_file}")
+
+    def add(self, *fields):
+        self.buffer += delivery_record.pack(*fields)
+        self.rows += 1
+
+    def rollback(self):
+        self.buffer = bytearray()
+        self.rows = 0
+
+    def commit(self):
+        data = bytes(self.buffer)
+        if not data:
+            self.last_commit = {'rows': 0, 'sha256': hashlib.sha256(b'').hexdigest()}
+            return 0
+
+        fd = os.open(self.output_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            start = os.lseek(fd, 0, os.SEEK_END)
+            try:
+                written = 0
+                while written < len(data):
+                    written += os.write(fd, data[written:])
+                os.fsync(fd)
+            except Exception:
+                os.ftruncate(fd, start)
+                raise
+        finally:
+            os.close(fd)
+
+        count = self.rows
+        self.last_commit = {'start': start, 'end': start + len(data), 'rows': count,
+                            'sha256': hashlib.sha256(data).hexdigest()}
+        self.rollback()
+        return count
+
+
+def surname(name):
+    parts = name_key(name).split()
+    return parts[-1] if parts else ''
+
+
+def resolve_player(index, name, team, surnames):
+    # Commentary often names players by surname only ('Bumrah to Kohli'), so fall
+    # back to a surname that is unique within the team
+    player_id = index.resolve(name, [team])
+    if player_id is None and surname(name):
+        by_surname = surnames.get(team_key(team))
+        if by_surname is None:
+            by_surname = surnames[team_key(team)] = {}
+            for candidate_id, (country, full_name) in index.players.items():
+                if team_key(country) == team_key(team):
+                    by_surname.setdefault(surname(full_name), []).append(candidate_id)
+        candidates = by_surname.get(surname(name), [])
+        player_id = candidates[0] if len(candidates) == 1 else None
+    if player_id is None:
+        player_id = index.resolve(name, [team], create=True)
+    return player_id or 0
+
+
+def fetch_deliveries(fetch, match_url):
+    # Runs in a worker: fetch and stream-parse one match. The parsed deliveries
+    # of a single match (about 250) are all that is held in memory
+    url = commentary_url(match_url)
+    page_source = fetch(url)
+    with metrics.timer('extract'):
+        deliveries = parse_or_quarantine('commentary', lambda page: list(parse_deliveries(page)), url, page_source)
+    if not deliveries:
+        metrics.count('parse_failures')
+        quarantine.capture('commentary', url, page_source, 'no deliveries')
+    return deliveries, is_completed_match(page_source)
+
+
+def scorecard_balls(folder):
+    # Legal balls per match id according to the bowling figures in bowling_stats.csv.
+    # Keyed by bowler first, so a match appended twice by older reruns counts once
+    path = os.path.join(folder, 'bowling_stats.csv')
+    if not os.path.isfile(path):
+        return {}
+    figures = {}
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            figures[row['match_id'], row['team'], row['name']] = overs_to_balls(row['overs']) or 0
+    balls = {}
+    for (match_id, _, _), count in figures.items():
+        balls[match_id] = balls.get(match_id, 0) + count
+    return balls
+
+
+def delivery_problem(deliveries, expected_balls=None):
+    # A page without older overs loaded looks like a shorter match; it must not be
+    # recorded as done. No-balls are faced but not in the bowlers' overs, so the
+    # commentary may have more legal balls than the scorecard, never fewer
+    innings = {delivery[0] for delivery in deliveries}
+    started = {delivery[0] for delivery in deliveries if delivery[2] == 0 and delivery[3] == 1}
+    if innings - started:
+        return f"no first ball in innings {', '.join(str(number) for number in sorted(innings - started))}"
+    legal = sum(1 for delivery in deliveries if extra_types[delivery[8]] not in ('wide', 'no ball'))
+    if expected_balls and legal < expected_balls:
+        return f"{legal} legal balls, the scorecard has {expected_balls}"
+    return None
+
+
+def write_deliveries(writer, match_url, deliveries, index, surnames):
+    match_id = match_number(match_url)
+    teams = []
+    for delivery in deliveries:
+        if delivery[1] not in teams:
+            teams.append(delivery[1])
+
+    with metrics.timer('write'):
+        try:
+            for innings, team, over, ball, bowler, batter, batter_runs, extras, extra_type, wicket in deliveries:
+                fielding = [other for other in teams if other != team]
+                writer.add(match_id, innings, over, ball,
+                           resolve_player(index, batter, team, surnames),
+                           resolve_player(index, bowler, fielding[0] if fielding else '', surnames),
+                           min(batter_runs, 255), min(extras, 255), extra_type, wicket)
+            count = writer.commit()
+        except Exception:
+            writer.rollback()
+            metrics.count('write_failures')
+            raise
+    metrics.count('rows_deliveries', count)
+    return count
+
+
+def scrape_commentary(match_urls, fetch, workers=4, folder=None, manifest=None, index=None):
+    folder = folder or folder_path
+    writer = DeliveryWriter(os.path.join(folder, deliveries_name))
+    index = index or load_index(folder)
+    surnames = {}
+    expected = scorecard_balls(folder)
+
+    if manifest:
+        match_urls = [match_url for match_url in match_urls if not manifest.is_done(match_url, ['deliveries'])]
+
+    def fetch_and_parse(match_url):
+        try:
+            return fetch_deliveries(fetch, match_url) + (None,)
+        except Exception as e:
+            return None, False, e
+
+    # Pages are fetched and parsed in parallel and written in the given order
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for match_url, (deliveries, completed, error) in zip(match_urls, executor.map(fetch_and_parse, match_urls)):
+            if error is not None:
+                metrics.count('match_failures')
+                log.error(f"Error scraping commentary of {match_url}: {error}")
+                continue
+            if manifest and not completed:
+                metrics.count('matches_incomplete')
+                log.info(f"Skipping the commentary of {match_url} until the match has a result")
+                continue
+            problem = delivery_problem(deliveries, expected.get(str(match_number(match_url))))
+            if problem:
+                metrics.count('commentary_incomplete')
+                log.warning(f"Skipping the commentary of {match_url}, it is incomplete ({problem})")
+                continue
+            try:
+                count = write_deliveries(writer, match_url, deliveries, index, surnames)
+                if manifest:
+                    manifest.record(match_url, {'deliveries': commit_record(writer)})
+                log.info(f"Saved {count} deliveries for {match_url}")
+            except Exception as e:
+                metrics.count('match_failures')
+                log.error(f"Error saving the commentary of {match_url}: {e}")
+                log.debug(traceback.format_exc())
+
+
+def load_deliveries(folder=None):
+    # Memory-mapped record array over deliveries.bin
+    path = os.path.join(folder or folder_path, deliveries_name)
+    if not os.path.isfile(path) or os.path.getsize(path) < delivery_record.size:
+        return np.zeros(0, dtype=delivery_dtype)
+    return np.memmap(path, dtype=delivery_dtype, mode='r', shape=(os.path.getsize(path) // delivery_record.size,))
+
+
+def phase_of(overs):
+    # Phase index per delivery, -1 for overs outside a 20-over innings
+    result = np.full(len(overs), -1, dtype=np.int8)
+    for number, (_, first, last) in enumerate(phases):
+        result[(overs >= first) & (overs <= last)] = number
+    return result
+
+
+def phase_summary(deliveries):
+    # Per player and phase: batting runs and balls faced, bowling runs conceded,
+    # legal balls and wickets. Returns {(player_id, phase): {...}}
+    phase = phase_of(deliveries['over'])
+    wides = deliveries['extra_type'] == extra_types.index('wide')
+    no_balls = deliveries['extra_type'] == extra_types.index('no ball')
+    byes = deliveries['extra_type'] >= extra_types.index('bye')
+    conceded = deliveries['batter_runs'].astype(np.int32) + np.where(byes, 0, deliveries['extras'])
+
+    summary = {}
+
+    def add(keys, column, values):
+        frame = np.stack([keys, phase.astype(np.int64)], axis=1)
+        unique, inverse = np.unique(frame, axis=0, return_inverse=True)
+        totals = np.bincount(inverse.reshape(-1), weights=values, minlength=len(unique))
+        for (player_id, phase_number), total in zip(unique, totals):
+            if phase_number >= 0 and player_id:
+                entry = summary.setdefault((int(player_id), phases[phase_number][0]), {
+                    'runs': 0, 'balls_faced': 0, 'runs_conceded': 0, 'balls_bowled': 0, 'wickets': 0})
+                entry[column] += int(total)
+
+    if len(deliveries):
+        batters = deliveries['batter_id'].astype(np.int64)
+        bowlers = deliveries['bowler_id'].astype(np.int64)
+        add(batters, 'runs', deliveries['batter_runs'])
+        add(batters, 'balls_faced', (~wides).astype(np.int32))
+        add(bowlers, 'runs_conceded', conceded)
+        add(bowlers, 'balls_bowled', (~wides & ~no_balls).astype(np.int32))
+        add(bowlers, 'wickets', deliveries['wicket'])
+    return summary
+
+
+def match_urls_from(folder):
+    # Match URLs recorded by the scorecard crawler
+    path = os.path.join(folder, 'match_data.csv')
+    if not os.path.isfile(path):
+        return []
+    with open(path, newline='', encoding='utf-8') as file:
+        urls = [row['url'] for row in csv.DictReader(file) if row.get('url')]
+    return list(dict.fromkeys(urls))
+
+
+def print_phases(folder, min_balls=30, count=5):
+    index = load_index(folder, persist=False)
+    summary = phase_summary(load_deliveries(folder))
+    for phase, _, _ in phases:
+        batters = [(player_id, entry) for (player_id, name), entry in summary.items()
+                   if name == phase and entry['balls_faced'] >= min_balls]
+        batters.sort(key=lambda item: item[1]['runs'] / item[1]['balls_faced'], reverse=True)
+        print(f"\n{phase.capitalize()}: highest strike rates (at least {min_balls} balls)")
+        for player_id, entry in batters[:count]:
+            name = index.players.get(player_id, ('', str(player_id)))[1]
+            print(f"  {name:<26}{entry['runs']:>6} runs{entry['balls_faced']:>6} balls"
+                  f"{100 * entry['runs'] / entry['balls_faced']:>9.2f}")
+
+        bowlers = [(player_id, entry) for (player_id, name), entry in summary.items()
+                   if name == phase and entry['balls_bowled'] >= min_balls]
+        bowlers.sort(key=lambda item: item[1]['runs_conceded'] / item[1]['balls_bowled'])
+        print(f"{phase.capitalize()}: lowest economy (at least {min_balls} balls)")
+        for player_id, entry in bowlers[:count]:
+            name = index.players.get(player_id, ('', str(player_id)))[1]
+            print(f"  {name:<26}{entry['runs_conceded']:>6} runs{entry['balls_bowled']:>6} balls"
+                  f"{6 * entry['runs_conceded'] / entry['balls_bowled']:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scrape the ball-by-ball commentary of every match in match_data.csv')
+    parser.add_argument('--output-dir', default=folder_path)
+    parser.add_argument('--workers', type=int, default=4, help='Number of commentary pages fetched in parallel')
+    parser.add_argument('--http', action='store_true', help='Fetch pages with a plain HTTP client instead of browsers')
+    parser.add_argument('--cache-dir', help='Page cache folder (default: page_cache in the output folder)')
+    parser.add_argument('--no-cache', action='store_true', help='Always fetch pages from the site')
+    parser.add_argument('--no-manifest', action='store_true', help='Scrape every match again instead of only the new ones')
+    parser.add_argument('--phases', action='store_true', help='Only print the phase leaders from the stored deliveries')
+    add_arguments(parser)
+    load_profile.add_arguments(parser)
+    page_quarantine.add_arguments(parser)
+    run_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    page_quarantine.configure_from_args(args, args.output_dir)
+    run_metrics.configure_logging(args.verbose)
+
+    if args.phases:
+        print_phases(args.output_dir)
+        raise SystemExit(0)
+
+    from scorecard import BrowserFetcher, open_manifest
+
+    cache = None if args.no_cache else PageCache(args.cache_dir or os.path.join(args.output_dir, 'page_cache'))
+    manifest = None if args.no_manifest else open_manifest(args.output_dir)
+    fetcher = fetch_page if args.http else BrowserFetcher(wait_selector=commentary_selector, profile=args.profile,
+                                                          prepare=load_older_overs)
+    fetch_politely = throttled(fetcher)
+    fetch = lambda url: cached_fetch(cache, fetch_politely, url, pin_completed=True)
+    try:
+        scrape_commentary(match_urls_from(args.output_dir), fetch, args.workers, args.output_dir, manifest)
+    finally:
+        if not args.http:
+            fetcher.close()
+            log.info(load_profile.load_report.summary())
+    run_metrics.finish_run('commentary', args.metrics_dir or args.output_dir)
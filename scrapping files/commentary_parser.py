@@ -0,0 +1,99 @@
+import io
+import re
+
+from lxml import etree
+
+# Offline extraction for ESPNcricinfo ball-by-ball commentary pages. The page is
+# read as a stream of elements: every delivery is parsed as soon as its element
+# is complete and then dropped from the tree, so memory stays bounded by one
+# delivery rather than by the length of the match
+
+innings_classes = {'ds-text-title-xs', 'ds-font-bold'}
+delivery_classes = {'ds-text-tight-m', 'ds-font-regular', 'ds-flex', 'ds-px-3', 'ds-py-2'}
+over_classes = {'ds-text-tight-s', 'ds-font-regular', 'ds-mb-1'}
+
+# Extra types stored with each delivery
+extra_types = ['', 'wide', 'no ball', 'bye', 'leg bye']
+
+runs_pattern = re.compile(r'(\d+)\s+runs?\b', re.IGNORECASE)
+extras_pattern = re.compile(r'(?:(\d+)\s+)?(wides?|no ?balls?|leg ?byes?|byes?)\b', re.IGNORECASE)
+
+
+def class_set(element):
+    return set((element.get('class') or '').split())
+
+
+def element_text(element):
+    return ' '.join(''.join(element.itertext()).split())
+
+
+def iter_events(page_source):
+    # ('innings', team) when an innings header ends, ('delivery', over, text) per ball
+    data = page_source.encode('utf-8') if isinstance(page_source, str) else page_source
+    for _, element in etree.iterparse(io.BytesIO(data), events=('end',), tag=('div', 'h2'), html=True):
+        classes = class_set(element)
+        if element.tag == 'h2' and innings_classes <= classes:
+            text = element_text(element)
+            if text.endswith(' Innings'):
+                yield 'innings', text[:-len(' Innings')]
+        elif element.tag == 'div' and delivery_classes <= classes:
+            over = next((element_text(span) for span in element.iter('span') if over_classes <= class_set(span)), None)
+            text = element_text(element)
+            if over:
+                yield 'delivery', over, text[len(over):].strip() if text.startswith(over) else text
+        else:
+            continue
+
+        # Drop the finished element and everything before it
+        element.clear()
+        parent = element.getparent()
+        while parent is not None and element.getprevious() is not None:
+            del parent[0]
+
+
+def parse_outcome(outcome):
+    # 'no run', '1 run', 'FOUR runs', 'SIX runs', 'OUT', '2 wides', '(no ball) 1 run', '1 leg bye'
+    # -> (batter runs, extras, extra type, wicket)
+    batter_runs, extras, extra_type = 0, 0, 0
+    wicket = int(re.search(r'\bOUT\b', outcome) is not None)
+
+    extra = extras_pattern.search(outcome)
+    if extra:
+        kind = extra.group(2).lower().replace(' ', '')
+        extra_type = (1 if kind.startswith('wide') else 2 if kind.startswith('noball') else
+                      4 if kind.startswith('legbye') else 3)
+        extras = int(extra.group(1) or 1)
+        outcome = outcome[:extra.start()] + outcome[extra.end():]
+
+    if extra_type in (1, 3, 4):
+        return batter_runs, extras, extra_type, wicket
+    if 'FOUR' in outcome:
+        batter_runs = 4
+    elif 'SIX' in outcome:
+        batter_runs = 6
+    else:
+        runs = runs_pattern.search(outcome)
+        batter_runs = int(runs.group(1)) if runs else 0
+    return batter_runs, extras, extra_type, wicket
+
+
+def parse_deliveries(page_source):
+    # Generator of deliveries in page order:
+    # (innings, batting team, over, ball, bowler, batter, batter runs, extras, extra type, wicket)
+    innings, team = 0, ''
+    for event in iter_events(page_source):
+        if event[0] == 'innings':
+            innings, team = innings + 1, event[1]
+            continue
+
+        _, over_text, text = event
+        over, _, ball = over_text.partition('.')
+        players, _, outcome = text.partition(',')
+        bowler, _, batter = players.partition(' to ')
+        if not over.isdigit() or not ball.isdigit() or not batter:
+            continue
+        yield (max(innings, 1), team, int(over), int(ball), bowler.strip(), batter.strip()) + parse_outcome(outcome)
+
+
+def innings_teams(page_source):
+    return [event[1] for event in iter_events(page_source) if event[0] == 'innings']
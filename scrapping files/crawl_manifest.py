@@ -0,0 +1,86 @@
+import json
+import os
+import time
+
+from metrics import log
+
+# Persisted record of finished crawl work. Every completed match or squad URL is
+# appended as one JSON line with, per output, the byte range and checksum of the
+# rows it added, so reruns can skip finished work and only append new matches
+
+
+class CrawlManifest:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A torn last line from a crash
+                self.entries.setdefault(entry['url'], {}).update(entry['outputs'])
+
+    def done_kinds(self, url):
+        return set(self.entries.get(url, {}))
+
+    def is_done(self, url, kinds):
+        return set(kinds) <= self.done_kinds(url)
+
+    def pending_kinds(self, url, kinds):
+        done = self.done_kinds(url)
+        return [kind for kind in kinds if kind not in done]
+
+    def record(self, url, outputs):
+        # outputs maps an output name to {'file', 'inode', 'start', 'end', 'rows', 'sha256'}
+        entry = {'url': url, 'completed_at': time.time(), 'outputs': outputs}
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(entry) + '\n').encode('utf-8'))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.entries.setdefault(url, {}).update(outputs)
+
+    def repair_outputs(self):
+        # Rows appended after the last recorded commit belong to a match whose
+        # manifest entry never made it to disk; drop them so the rerun does not
+        # write that match twice
+        recorded_ends = {}
+        for outputs in self.entries.values():
+            for output in outputs.values():
+                if 'end' in output:
+                    end, inode = recorded_ends.get(output['file'], (0, None))
+                    if output['end'] >= end:
+                        recorded_ends[output['file']] = (output['end'], output.get('inode'))
+
+        for csv_file, (end, inode) in recorded_ends.items():
+            if not os.path.isfile(csv_file):
+                continue
+            # A file rewritten since (e.g. by player_index.py) no longer matches the recorded offsets
+            if inode is not None and os.stat(csv_file).st_ino != inode:
+                continue
+            if os.path.getsize(csv_file) > end:
+                with open(csv_file, 'rb+') as file:
+                    file.truncate(end)
+                log.warning(f"Removed unrecorded rows from the end of {csv_file}")
+
+
+def commit_record(writer):
+    # A MatchCSVWriter, or any writer with last_commit and an output_file
+    output_file = getattr(writer, 'output_file', None) or writer.csv_file
+    record = dict(writer.last_commit)
+    record['file'] = os.path.abspath(output_file)
+    record['inode'] = os.stat(output_file).st_ino
+    return record
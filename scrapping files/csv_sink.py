@@ -0,0 +1,124 @@
+import csv
+import hashlib
+import io
+import os
+
+from metrics import log
+
+
+# Buffered CSV writer that collects the rows of one match and commits them
+# with a single fsync'd append, so a crash never leaves half a scorecard behind
+class MatchCSVWriter:
+    def __init__(self, csv_file, header):
+        self.csv_file = csv_file
+        self.header = header
+        self.rows = []
+
+        # Byte range and checksum of the most recent commit
+        self.last_commit = None
+
+        # Check if the folder exists, if not create it
+        folder = os.path.dirname(csv_file)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._repair_torn_tail()
+        self._check_header()
+
+    def _check_header(self):
+        # Appending rows under a different header would silently shift columns
+        if not os.path.isfile(self.csv_file) or os.path.getsize(self.csv_file) == 0:
+            return
+        with open(self.csv_file, newline='', encoding='utf-8') as file:
+            existing = next(csv.reader(file), [])
+        if existing != list(self.header):
+            raise ValueError(f"{self.csv_file} has columns {existing}, expected {list(self.header)}")
+
+    def _repair_torn_tail(self):
+        # A crash in the middle of an append can leave a partial last line,
+        # so cut the file back to the last complete row
+        if not os.path.isfile(self.csv_file):
+            return
+
+        with open(self.csv_file, mode='rb+') as file:
+            size = file.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+
+            file.seek(size - 1)
+            if file.read(1) == b'\n':
+                return
+
+            # Walk back in blocks until a newline is found
+            position = size
+            while position > 0:
+                block_start = max(0, position - 4096)
+                file.seek(block_start)
+                block = file.read(position - block_start)
+                newline = block.rfind(b'\n')
+                if newline != -1:
+                    file.truncate(block_start + newline + 1)
+                    log.warning(f"Removed partial row at the end of {self.csv_file}")
+                    return
+                position = block_start
+
+            file.truncate(0)
+            log.warning(f"Removed partial header from {self.csv_file}")
+
+    def add(self, row):
+        self.rows.append(row)
+
+    def rollback(self):
+        # Drop the rows of a match that failed halfway through
+        self.rows = []
+
+    def revert(self):
+        # Take back the last commit when another output of the same match failed
+        # after it. Only possible while those rows are still the end of the file
+        if not self.last_commit or 'end' not in self.last_commit:
+            return
+        if os.path.getsize(self.csv_file) == self.last_commit['end']:
+            with open(self.csv_file, 'rb+') as file:
+                file.truncate(self.last_commit['start'])
+                os.fsync(file.fileno())
+        self.last_commit = None
+
+    def commit(self):
+        if not self.rows:
+            self.last_commit = {'rows': 0, 'sha256': hashlib.sha256(b'').hexdigest()}
+            return 0
+
+        needs_header = not os.path.isfile(self.csv_file) or os.path.getsize(self.csv_file) == 0
+
+        # Render the whole match into memory first
+        buffer = io.StringIO(newline='')
+        writer = csv.DictWriter(buffer, fieldnames=self.header)
+        if needs_header:
+            writer.writeheader()
+        writer.writerows(self.rows)
+        data = buffer.getvalue().encode('utf-8')
+
+        fd = os.open(self.csv_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            start = os.lseek(fd, 0, os.SEEK_END)
+            try:
+                written = 0
+                while written < len(data):
+                    written += os.write(fd, data[written:])
+                os.fsync(fd)
+            except Exception:
+                # Undo the partial append so the file only ever holds whole matches
+                os.ftruncate(fd, start)
+                raise
+        finally:
+            os.close(fd)
+
+        count = len(self.rows)
+        self.last_commit = {
+            'start': start,
+            'end': start + len(data),
+            'rows': count,
+            'sha256': hashlib.sha256(data).hexdigest(),
+        }
+        self.rows = []
+        return count
@@ -0,0 +1,329 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from columnar import age_to_days, overs_to_balls, parse_float, parse_int
+from page_cache import write_atomic
+from player_index import add_player_ids, load_index, team_key
+
+# One loader for the four CSVs. They are parsed once into compact numpy columns
+# (small integers, float32 rates, integer codes for teams, matches, players and
+# other repeated strings) and saved as .npy files in a cache folder next to the
+# CSVs. Later loads memory-map those files instead of parsing any text, and the
+# cache is rebuilt whenever a CSV changes
+
+csv_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csv files')
+cache_name = '.dataset_cache'
+cache_version = 2
+
+dataset_files = {
+    'batting': 'batting_stats.csv',
+    'bowling': 'bowling_stats.csv',
+    'matches': 'icc_t20_worldcup_2024_matches.csv',
+    'squad': 'player_data.csv',
+}
+
+# Output column, source CSV column and storage: a numpy type, or the name of the
+# vocabulary a categorical column is coded against. Vocabularies are shared
+# between tables, so a team or player code means the same thing everywhere
+schemas = {
+    'batting': [
+        ('match_id', 'match_id', np.int32),
+        ('match', 'match', 'match'),
+        ('team', 'team', 'team'),
+        ('bat_pos', 'bat_pos', np.int8),
+        ('name', 'name', 'player'),
+        ('not_out', 'not_out', np.bool_),
+        ('runs', 'runs', np.int16),
+        ('balls', 'balls', np.int16),
+        ('minutes', 'minutes', np.int16),
+        ('fours', 'fours', np.int16),
+        ('sixes', 'sixes', np.int16),
+        ('strike_rate', 'strike_rate', np.float32),
+        ('player_id', 'player_id', np.int32),
+    ],
+    'bowling': [
+        ('match_id', 'match_id', np.int32),
+        ('match', 'match', 'match'),
+        ('team', 'team', 'team'),
+        ('name', 'name', 'player'),
+        ('balls', 'overs', np.int16),
+        ('maidens', 'maidens', np.int16),
+        ('runs', 'runs', np.int16),
+        ('wickets', 'wickets', np.int16),
+        ('economy', 'economy', np.float32),
+        ('dots', 'dots', np.int16),
+        ('fours', 'fours', np.int16),
+        ('sixes', 'sixes', np.int16),
+        ('wides', 'wides', np.int16),
+        ('no_balls', 'no_balls', np.int16),
+        ('player_id', 'player_id', np.int32),
+    ],
+    'matches': [
+        ('match_id', 'Match_Id', np.int32),
+        ('team_1', 'Team 1', 'team'),
+        ('team_2', 'Team 2', 'team'),
+        ('group', 'Group', 'group'),
+        ('venue', 'Venue', 'venue'),
+        ('team_1_runs', 'Team 1 Runs', np.int16),
+        ('team_1_wickets', 'Team 1 Wickets', np.int16),
+        ('team_1_balls', 'Team 1 Overs', np.int16),
+        ('team_2_runs', 'Team 2 Runs', np.int16),
+        ('team_2_wickets', 'Team 2 Wickets', np.int16),
+        ('team_2_balls', 'Team 2 Overs', np.int16),
+        ('winner', 'Winner', 'team'),
+        ('result', 'Result', 'result'),
+        ('margin', 'Margin', 'margin'),
+    ],
+    'squad': [
+        ('team', 'Country', 'team'),
+        ('name', 'Name', 'player'),
+        ('role', 'Role', 'role'),
+        ('age_days', 'Age', np.int32),
+        ('batting_type', 'Batting Type', 'batting_type'),
+        ('bowling_type', 'Bowling Type', 'bowling_type'),
+        ('image_url', 'Image URL', 'image_url'),
+        ('player_id', 'player_id', np.int32),
+    ],
+}
+
+# Spellings that mean the same value share one code, e.g. 'U.S.A.' and 'UNITED STATES'
+vocabulary_keys = {'team': team_key}
+
+overs_columns = {'overs', 'Team 1 Overs', 'Team 2 Overs'}
+
+
+class Vocabulary:
+    def __init__(self, name, labels=()):
+        self.key = vocabulary_keys.get(name, lambda value: value)
+        self.labels = list(labels)
+        self.codes = {self.key(label): code for code, label in enumerate(self.labels)}
+
+    def encode(self, value):
+        # -1 marks a missing value
+        if value is None or value == '':
+            return -1
+        key = self.key(value)
+        if key not in self.codes:
+            self.codes[key] = len(self.labels)
+            self.labels.append(value)
+        return self.codes[key]
+
+    def code(self, value):
+        return self.codes.get(self.key(value), -1)
+
+
+class Table:
+    def __init__(self, columns, categorical, vocabularies):
+        self.columns = columns
+        self.categorical = categorical  # column -> vocabulary name
+        self.vocabularies = vocabularies
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def labels(self, column):
+        # Decode a categorical column back to strings, '' where missing
+        labels = np.array(self.vocabularies[self.categorical[column]].labels + [''], dtype=object)
+        return labels[self.columns[column]]
+
+    def to_pandas(self):
+        import pandas as pd
+        data = {}
+        for column, values in self.columns.items():
+            if column in self.categorical:
+                labels = self.vocabularies[self.categorical[column]].labels
+                data[column] = pd.Categorical.from_codes(values, categories=labels)
+            else:
+                data[column] = values
+        return pd.DataFrame(data)
+
+
+class Dataset:
+    def __init__(self, tables, vocabularies):
+        self.tables = tables
+        self.vocabularies = vocabularies
+        for name, table in tables.items():
+            setattr(self, name, table)
+
+    def code(self, vocabulary, value):
+        return self.vocabularies[vocabulary].code(value)
+
+
+def convert(csv_column, dtype, values):
+    if csv_column in overs_columns:
+        values = [overs_to_balls(value) for value in values]
+    elif csv_column == 'Age':
+        values = [age_to_days(value) for value in values]
+    elif dtype is np.bool_:
+        return np.array([value == 'Not Out' for value in values], dtype=dtype)
+    elif dtype is np.float32:
+        return np.array([parse_float(value) for value in values], dtype=np.float64).astype(dtype)
+    else:
+        values = [parse_int(value) for value in values]
+    # -1 marks a missing number
+    return np.array([-1 if value is None else value for value in values], dtype=dtype)
+
+
+def clean_match_row(row):
+    # The results file writes ties as 'Match tied (Namibia,the super over)', which
+    # splits over Winner and Margin, and puts outcomes without a winner in Winner
+    winner = row.get('Winner') or ''
+    row['Margin'] = '' if row.get('Margin') == 'NA' else row.get('Margin')
+    if winner.startswith('Match tied ('):
+        row['Winner'], row['Result'], row['Margin'] = winner[len('Match tied ('):], 'tied', 'super over'
+    elif winner == 'No Result' or winner.startswith('Match abandoned'):
+        row['Winner'], row['Result'] = '', 'abandoned' if winner.startswith('Match abandoned') else 'no result'
+    else:
+        row['Result'] = 'won'
+    return row
+
+
+def read_rows(csv_file):
+    with open(csv_file, newline='', encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+
+def source_state(csv_file, with_hash=True):
+    if not os.path.isfile(csv_file):
+        return None
+    stat = os.stat(csv_file)
+    state = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(csv_file, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        state['sha256'] = digest.hexdigest()
+    return state
+
+
+def build(folder, cache_folder, sources):
+    rows = {name: read_rows(os.path.join(folder, file_name)) if sources[name] else []
+            for name, file_name in dataset_files.items()}
+
+    # Rows are joined on player ids; fill them in for CSVs written before the index
+    index = load_index(folder)
+    if any(not row.get('player_id') for row in rows['batting'] + rows['bowling']):
+        add_player_ids(index, rows['batting'], rows['bowling'])
+    for row in rows['squad']:
+        row['player_id'] = index.add_player(row['Country'], row['Name'])
+    for row in rows['matches']:
+        clean_match_row(row)
+
+    vocabularies = {}
+    build_folder = tempfile.mkdtemp(prefix='build-', dir=cache_folder)
+    columns = {}
+    for name, schema in schemas.items():
+        columns[name] = {}
+        for column, csv_column, storage in schema:
+            values = [row.get(csv_column) for row in rows[name]]
+            if isinstance(storage, str):
+                vocabulary = vocabularies.setdefault(storage, Vocabulary(storage))
+                array = np.array([vocabulary.encode(value) for value in values], dtype=np.int32)
+                columns[name][column] = storage
+            else:
+                array = convert(csv_column, storage, values)
+                columns[name][column] = None
+            np.save(os.path.join(build_folder, f"{name}.{column}.npy"), array)
+
+    meta = {
+        'version': cache_version,
+        'build': os.path.basename(build_folder),
+        'sources': sources,
+        'columns': columns,
+        'vocabularies': {name: vocabulary.labels for name, vocabulary in vocabularies.items()},
+    }
+    write_atomic(os.path.join(cache_folder, 'meta.json'), json.dumps(meta).encode('utf-8'))
+
+    # Older builds are no longer referenced; open memory maps of them stay valid
+    for entry in os.listdir(cache_folder):
+        if entry.startswith('build-') and entry != meta['build']:
+            shutil.rmtree(os.path.join(cache_folder, entry), ignore_errors=True)
+    return meta
+
+
+def read_meta(cache_folder):
+    try:
+        with open(os.path.join(cache_folder, 'meta.json'), encoding='utf-8') as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != cache_version or not os.path.isdir(os.path.join(cache_folder, meta['build'])):
+        return None
+    return meta
+
+
+def is_current(meta, folder, cache_folder):
+    # Unchanged size and mtime means unchanged; a touched file with the same
+    # size is hashed before the cache is thrown away
+    touched = False
+    for name, file_name in dataset_files.items():
+        recorded = meta['sources'].get(name)
+        state = source_state(os.path.join(folder, file_name), with_hash=False)
+        if state is None or recorded is None:
+            if state != recorded:
+                return False
+            continue
+        if state['size'] != recorded['size']:
+            return False
+        if state['mtime_ns'] != recorded['mtime_ns']:
+            if source_state(os.path.join(folder, file_name))['sha256'] != recorded['sha256']:
+                return False
+            recorded['mtime_ns'] = state['mtime_ns']
+            touched = True
+
+    if touched:
+        write_atomic(os.path.join(cache_folder, 'meta.json'), json.dumps(meta).encode('utf-8'))
+    return True
+
+
+def load_dataset(folder=csv_folder, rebuild=False):
+    cache_folder = os.path.join(folder, cache_name)
+    os.makedirs(cache_folder, exist_ok=True)
+
+    meta = None if rebuild else read_meta(cache_folder)
+    if meta is None or not is_current(meta, folder, cache_folder):
+        sources = {name: source_state(os.path.join(folder, file_name)) for name, file_name in dataset_files.items()}
+        meta = build(folder, cache_folder, sources)
+
+    vocabularies = {name: Vocabulary(name, labels) for name, labels in meta['vocabularies'].items()}
+    build_folder = os.path.join(cache_folder, meta['build'])
+    tables = {}
+    for name, columns in meta['columns'].items():
+        arrays = {column: np.load(os.path.join(build_folder, f"{name}.{column}.npy"), mmap_mode='r')
+                  for column in columns}
+        categorical = {column: vocabulary for column, vocabulary in columns.items() if vocabulary}
+        tables[name] = Table(arrays, categorical, vocabularies)
+    return Dataset(tables, vocabularies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build or load the memory-mapped dataset cache')
+    parser.add_argument('folder', nargs='?', default=csv_folder)
+    parser.add_argument('--rebuild', action='store_true', help='Parse the CSVs again even if the cache is current')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    dataset = load_dataset(args.folder, rebuild=args.rebuild)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    dataset = load_dataset(args.folder)
+    second = time.perf_counter() - start
+
+    for name, table in dataset.tables.items():
+        size = sum(array.nbytes for array in table.columns.values())
+        print(f"{name:>8}: {len(table):>6} rows, {len(table.columns):>2} columns, {size / 1024:.1f} KiB")
+    print(f"Vocabularies: " + ', '.join(f"{name} {len(vocabulary.labels)}" for name, vocabulary in dataset.vocabularies.items()))
+    print(f"First load {first * 1000:.1f} ms, cached load {second * 1000:.1f} ms")
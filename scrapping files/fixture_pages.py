@@ -0,0 +1,353 @@
+import csv
+import html
+import os
+from collections import OrderedDict
+
+# Synthetic ESPNcricinfo- and Cricbuzz-style pages rebuilt from the CSVs in
+# 'csv files', so the parsers and benchmarks can run without a browser or network access
+
+csv_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csv files')
+
+
+def read_csv(name):
+    with open(os.path.join(csv_folder, name), newline='', encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+
+def load_scorecards():
+    # Group the shipped batting and bowling rows back into per-match innings.
+    # The append-mode CSVs repeat some matches, so keep the first copy of each row
+    matches = OrderedDict()
+    seen = set()
+    for kind, name_key, file_name in (('batting', 'bat_pos', 'batting_stats.csv'), ('bowling', 'name', 'bowling_stats.csv')):
+        for row in read_csv(file_name):
+            key = (kind, row['match_id'], row['team'], row[name_key])
+            if key in seen:
+                continue
+            seen.add(key)
+            match = matches.setdefault(row['match_id'], {'match_name': row['match'], 'innings': OrderedDict()})
+            match['innings'].setdefault(row['team'], {'batting': [], 'bowling': []})[kind].append(row)
+    return matches
+
+
+def batting_row_html(row):
+    dismissal = 'not out' if row['not_out'] == 'Not Out' else 'c Fielder b Bowler'
+    cells = [row['runs'], row['balls'], row['minutes'], row['fours'], row['sixes'], row['strike_rate']]
+    return (
+        '<tr class="">'
+        f'<td class="ds-w-0 ds-whitespace-nowrap ds-min-w-max"><a href="#" title="{html.escape(row["name"])}">'
+        f'<span class="ds-text-tight-s ds-font-medium">{html.escape(row["name"])}</span></a></td>'
+        f'<td class="ds-w-0 ds-whitespace-nowrap ds-min-w-max"><span>{dismissal}</span></td>'
+        + ''.join(f'<td class="ds-w-0 ds-whitespace-nowrap ds-min-w-max ds-text-right">{html.escape(cell)}</td>' for cell in cells)
+        + '</tr>'
+        '<tr class="ds-hidden"><td colspan="8"><div>commentary</div></td></tr>'
+    )
+
+
+def bowling_row_html(row):
+    cells = [row['overs'], row['maidens'], row['runs'], row['wickets'], row['economy'], row['dots'],
+             row['fours'], row['sixes'], row['wides'], row['no_balls']]
+    return (
+        '<tr class="">'
+        f'<td class="ds-flex ds-items-center"><a href="#"><span>{html.escape(row["name"])}</span></a></td>'
+        + ''.join(f'<td class="ds-w-0 ds-whitespace-nowrap ds-min-w-max ds-text-right">{html.escape(cell)}</td>' for cell in cells)
+        + '</tr>'
+    )
+
+
+def innings_html(team, innings):
+    return (
+        '<div class="ds-rounded-lg ds-mt-2"><div class="ds-flex ds-px-4">'
+        f'<span class="ds-text-title-xs ds-font-bold ds-capitalize">{html.escape(team)}</span>'
+        '<span class="ds-text-compact-xs">(20 ovs maximum)</span></div>'
+        '<table class="ds-w-full ds-table ds-table-md ds-table-auto ci-scorecard-table">'
+        '<thead><tr><th>Batting</th><th></th><th>R</th><th>B</th><th>M</th><th>4s</th><th>6s</th><th>SR</th></tr></thead>'
+        '<tbody>' + ''.join(batting_row_html(row) for row in innings['batting']) + '</tbody></table>'
+        '<table class="ds-w-full ds-table ds-table-md ds-table-auto">'
+        '<thead><tr><th>Bowling</th><th>O</th><th>M</th><th>R</th><th>W</th><th>ECON</th><th>0s</th>'
+        '<th>4s</th><th>6s</th><th>WD</th><th>NB</th></tr></thead>'
+        '<tbody>' + ''.join(bowling_row_html(row) for row in innings['bowling']) + '</tbody></table></div>'
+    )
+
+
+def render_scorecard(match, status='Match over, won by a margin', ad_seed=0):
+    # Pad the page with the kind of markup a real page carries around the tables;
+    # a different ad_seed changes the page without changing the scorecard
+    noise = ''.join(f'<div class="ds-ad-slot" id="ad-{index}"><script>window.ads = {index + ad_seed};</script></div>'
+                    for index in range(40))
+    return (
+        '<!DOCTYPE html><html><head><title>Scorecard</title></head><body>'
+        f'<header>{noise}</header>'
+        f'<h1 class="ds-text-title-xs ds-font-bold ds-mb-2 ds-m-1">{html.escape(match["match_name"])}, ICC Men\'s T20 World Cup</h1>'
+        + f'<p class="ds-text-tight-s ds-font-medium ds-truncate ds-text-typo"><span>{html.escape(status)}</span></p>'
+        + ''.join(innings_html(team, innings) for team, innings in match['innings'].items())
+        + f'<footer>{noise}</footer></body></html>'
+    )
+
+
+def scorecard_pages():
+    return [render_scorecard(match) for match in load_scorecards().values()]
+
+
+def scaled_batting_row(row, fraction):
+    # A batter part way through their innings
+    row = dict(row, not_out='Not Out')
+    for column in ('runs', 'balls', 'minutes', 'fours', 'sixes'):
+        row[column] = str(int(int(row[column] or 0) * fraction))
+    balls = int(row['balls'])
+    row['strike_rate'] = f"{100 * int(row['runs']) / balls:.2f}" if balls else '-'
+    return row
+
+
+def live_match(match, progress):
+    # The match as its scorecard looks part way through: the first innings fills
+    # up over the first half of `progress` (0 to 1) and the second over the rest,
+    # with the batter at the crease still adding to their score
+    innings = OrderedDict()
+    for number, (team, rows) in enumerate(match['innings'].items()):
+        done = min(max(2 * progress - number, 0.0), 1.0)
+        if not done:
+            break
+        batting = rows['batting']
+        shown, partial = divmod(done * len(batting), 1)
+        shown = int(shown)
+        current = [scaled_batting_row(batting[shown], partial)] if shown < len(batting) and partial else []
+        bowling = rows['bowling'][:max(1, round(done * len(rows['bowling'])))]
+        innings[team] = {'batting': batting[:shown] + current, 'bowling': bowling}
+    return dict(match, innings=innings)
+
+
+def overs_to_balls(overs):
+    whole, _, part = (overs or '0').partition('.')
+    return int(whole or 0) * 6 + int(part or 0)
+
+
+def batter_outcomes(row):
+    # The batter's balls carry their fours, sixes and remaining runs, and a
+    # dismissed batter's last ball is the wicket
+    faced = int(row['balls'] or 0)
+    dismissed = row['not_out'] != 'Not Out' and faced > 0
+    scoring = faced - dismissed
+    outcomes = [4] * int(row['fours'] or 0) + [6] * int(row['sixes'] or 0)
+    rest = max(int(row['runs'] or 0) - sum(outcomes), 0)
+    while len(outcomes) < scoring and rest > 0:
+        step = 2 if rest >= 2 and len(outcomes) % 3 == 0 else 1
+        outcomes.append(step)
+        rest -= step
+    outcomes = (outcomes + [0] * scoring)[:scoring]
+    # Spread the boundaries through the innings instead of front-loading them
+    outcomes = [outcomes[(index * 7) % scoring] for index in range(scoring)] if scoring and scoring % 7 else outcomes
+    return outcomes + (['OUT'] if dismissed else [])
+
+
+def bowler_per_ball(bowling):
+    # Overs go to the bowlers in scorecard order, never the same bowler twice in a row
+    remaining = OrderedDict((row['name'], overs_to_balls(row['overs'])) for row in bowling)
+    bowlers, last = [], None
+    while any(remaining.values()):
+        choices = [name for name, balls in remaining.items() if balls and name != last] or \
+                  [name for name, balls in remaining.items() if balls]
+        last = choices[0]
+        over = min(6, remaining[last])
+        remaining[last] -= over
+        bowlers += [last] * over
+    return bowlers
+
+
+def outcome_text(outcome):
+    if outcome == 'OUT':
+        return 'OUT'
+    return {0: 'no run', 1: '1 run', 4: 'FOUR runs', 6: 'SIX runs'}.get(outcome, f"{outcome} runs")
+
+
+def delivery_html(over_text, text):
+    return (
+        '<div class="ds-text-tight-m ds-font-regular ds-flex ds-px-3 ds-py-2 lg:ds-px-4 ds-items-start">'
+        '<div class="ds-flex ds-flex-col ds-items-center">'
+        f'<span class="ds-text-tight-s ds-font-regular ds-mb-1 lg:ds-mb-0 lg:ds-mr-3 ds-block ds-text-center">{over_text}</span></div>'
+        f'<div class="ds-ml-4"><p class="ci-html-content">{html.escape(text)}</p></div></div>'
+    )
+
+
+def commentary_html(team, innings):
+    # One batter at a time in batting order; wides are bowled before a legal ball of the same bowler
+    legal = [(row['name'], outcome) for row in innings['batting'] for outcome in batter_outcomes(row)]
+    bowlers = bowler_per_ball(innings['bowling']) or ['Bowler']
+    wides = {row['name']: int(row['wides'] or 0) for row in innings['bowling']}
+    deliveries = []
+    for index, (batter, outcome) in enumerate(legal):
+        bowler = bowlers[min(index, len(bowlers) - 1)]
+        over_text = f"{index // 6}.{index % 6 + 1}"
+        if wides.get(bowler):
+            wides[bowler] -= 1
+            deliveries.append(delivery_html(over_text, f"{bowler} to {batter}, 1 wide"))
+        deliveries.append(delivery_html(over_text, f"{bowler} to {batter}, {outcome_text(outcome)}"))
+    return f'<h2 class="ds-text-title-xs ds-font-bold ds-mb-2">{html.escape(team)} Innings</h2><div class="ds-mb-4">{"".join(deliveries)}</div>'
+
+
+def render_commentary(match):
+    noise = ''.join(f'<div class="ds-ad-slot" id="ad-{index}"><script>window.ads = {index};</script></div>' for index in range(40))
+    return (
+        '<!DOCTYPE html><html><head><title>Ball by ball commentary</title></head><body>'
+        f'<header>{noise}</header>'
+        f'<h1 class="ds-text-title-xs ds-font-bold ds-mb-2 ds-m-1">{html.escape(match["match_name"])}, ICC Men\'s T20 World Cup</h1>'
+        + '<p class="ds-text-tight-s ds-font-medium ds-truncate ds-text-typo"><span>Match over, won by a margin</span></p>'
+        + ''.join(commentary_html(team, innings) for team, innings in match['innings'].items())
+        + f'<footer>{noise}</footer></body></html>'
+    )
+
+
+def commentary_pages():
+    return [render_commentary(match) for match in load_scorecards().values()]
+
+
+series_path = '/series/fixture-series-1'
+# Matches on the fixtures list before the first 'Show More' click
+fixtures_page_size = 20
+
+
+def scorecard_path(match_id, match):
+    slug = '-'.join(match['match_name'].lower().split())
+    return f"{series_path}/{slug}-{1400000 + int(match_id)}/full-scorecard"
+
+
+live_badge = '<span class="ds-text-tight-xs ds-font-bold ds-uppercase ds-leading-5">Live</span>'
+
+
+def render_fixtures(paths, page_size=None, live=()):
+    # Matches in progress carry a 'Live' badge, like on the real page
+    match_divs = [
+        f'<div class="ds-p-4 hover:ds-bg-ui-fill-translucent ds-border-t"><a href="{html.escape(path)}">'
+        f'<span class="ds-text-compact-s">Match</span>{live_badge if path in live else ""}</a></div>'
+        for path in paths
+    ]
+    if not page_size or len(match_divs) <= page_size:
+        return f'<!DOCTYPE html><html><body><div class="ds-mb-4">{"".join(match_divs)}</div></body></html>'
+
+    # Like the real page, only the first matches are shown and every click on
+    # 'Show More' adds the next batch to the list
+    pages = [''.join(match_divs[start:start + page_size]) for start in range(0, len(match_divs), page_size)]
+    templates = ''.join(f'<template class="more-matches">{page}</template>' for page in pages[1:])
+    script = (
+        "<script>document.getElementById('show-more').addEventListener('click', function () {"
+        "var next = document.querySelector('template.more-matches');"
+        "if (!next) { return; }"
+        "setTimeout(function () {"
+        "document.getElementById('matches').appendChild(next.content.cloneNode(true)); next.remove();"
+        "if (!document.querySelector('template.more-matches')) { document.getElementById('show-more').remove(); }"
+        "}, 50); });</script>"
+    )
+    return (
+        f'<!DOCTYPE html><html><body><div class="ds-mb-4" id="matches">{pages[0]}</div>{templates}'
+        '<button id="show-more" class="ds-button ds-text-center ds-uppercase ds-font-bold ds-border-none ds-bg-fill-primary">'
+        f'Show More</button>{script}</body></html>'
+    )
+
+
+squads_path = f"{series_path}/squads"
+
+
+def squad_path(country):
+    slug = '-'.join(country.lower().split())
+    return f"{series_path}/{slug}-squad-{sum(map(ord, country))}/series-squads"
+
+
+def load_squads():
+    squads = OrderedDict()
+    seen = set()
+    for row in read_csv('player_data.csv'):
+        if (row['Country'], row['Name']) not in seen:
+            seen.add((row['Country'], row['Name']))
+            squads.setdefault(row['Country'], []).append(row)
+    return squads
+
+
+def render_squads_index(countries):
+    links = ''.join(
+        f'<div class="ds-flex ds-flex-row ds-space-x-2 ds-items-center"><img alt="{html.escape(country)}" src="/flags/{index}.png">'
+        f'<a href="{html.escape(squad_path(country))}"><span>{html.escape(country)} Squad</span></a></div>'
+        for index, country in enumerate(countries)
+    )
+    return f'<!DOCTYPE html><html><body><div class="ds-mb-4">{links}</div></body></html>'
+
+
+def player_info_html(label, value):
+    return (f'<div class="ds-flex ds-items-center ds-space-x-1"><span class="ds-text-tight-s">{label}</span>'
+            f'<span class="ds-text-tight-s ds-font-medium">{html.escape(value)}</span></div>')
+
+
+def render_squad(players):
+    cards = ''.join(
+        '<div class="ds-relative ds-flex ds-flex-row ds-space-x-4 ds-p-3">'
+        f'<img src="{html.escape(player["Image URL"])}"><div>'
+        f'<a href="#"><span class="ds-text-compact-s ds-font-bold">{html.escape(player["Name"])}</span></a>'
+        f'<p class="ds-text-tight-s">{html.escape(player["Role"])}</p>'
+        + player_info_html('Age:', player['Age'])
+        + player_info_html('Batting:', player['Batting Type'])
+        + player_info_html('Bowling:', player['Bowling Type'])
+        + '</div></div>'
+        for player in players
+    )
+    return f'<!DOCTYPE html><html><body><div class="ds-grid">{cards}</div></body></html>'
+
+
+match_list_path = '/cricket-series/7476/icc-mens-t20-world-cup-2024/matches'
+
+
+def ordinal(number):
+    suffix = 'th' if 10 <= number % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th')
+    return f"{number}{suffix}"
+
+
+def score_html(team, runs, wickets, overs):
+    if runs == 'NA':
+        return ''
+    score = runs if wickets == '10' else f"{runs}-{wickets}"
+    return (f'<div class="flex justify-between"><span class="text-cbTxtPrim">{html.escape(team)}</span>'
+            f'<span class="font-bold">{score} ({overs})</span></div>')
+
+
+def result_text(row):
+    # The results CSV splits ties over Winner and Margin and has no margin for other outcomes
+    if row['Winner'].startswith('Match tied ('):
+        return f"Match tied ({row['Winner'][len('Match tied ('):]} won {row['Margin'].rstrip(')')})"
+    if row['Margin'] == 'NA':
+        return row['Winner']
+    return f"{row['Winner']} won {row['Margin']}"
+
+
+def render_match_list():
+    # The Cricbuzz mobile series matches list read by match_summary.py
+    match_divs = []
+    for row in read_csv('icc_t20_worldcup_2024_matches.csv'):
+        team1, team2 = row['Team 1'].title(), row['Team 2'].title()
+        title = f"{team1} vs {team2}, {ordinal(int(row['Match_Id']))} Match, {row['Group']}"
+        scores = score_html(team1, row['Team 1 Runs'], row['Team 1 Wickets'], row['Team 1 Overs']) + \
+            score_html(team2, row['Team 2 Runs'], row['Team 2 Wickets'], row['Team 2 Overs'])
+        match_divs.append(
+            f'<a class="w-full bg-cbWhite flex flex-col p-3 gap-1" href="/live-cricket-scores/{row["Match_Id"]}" title="{html.escape(title)}">'
+            f'<div class="text-xs text-cbTxtSec dark:text-cbTxtSec">{ordinal(int(row["Match_Id"]))} Match • {html.escape(row["Venue"])}</div>'
+            f'<div class="flex flex-col gap-3 my-2">{scores}</div>'
+            f'<span class="text-cbComplete">{html.escape(result_text(row))}</span></a>'
+        )
+    noise = ''.join(f'<script src="/static/chunk-{index}.js"></script>' for index in range(20))
+    return f'<!DOCTYPE html><html><head>{noise}</head><body><div class="flex flex-col">{"".join(match_divs)}</div></body></html>'
+
+
+def site_pages():
+    # Every page of the stand-in site keyed by path
+    pages = {}
+    paths = []
+    for match_id, match in load_scorecards().items():
+        path = scorecard_path(match_id, match)
+        pages[path] = render_scorecard(match)
+        pages[path.replace('/full-scorecard', '/ball-by-ball-commentary')] = render_commentary(match)
+        paths.append(path)
+    pages[f"{series_path}/match-schedule-fixtures-and-results"] = render_fixtures(paths, page_size=fixtures_page_size)
+    pages[match_list_path] = render_match_list()
+
+    squads = load_squads()
+    pages[squads_path] = render_squads_index(squads)
+    for country, players in squads.items():
+        pages[squad_path(country)] = render_squad(players)
+    return pages
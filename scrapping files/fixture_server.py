@@ -0,0 +1,84 @@
+import argparse
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from fixture_pages import site_pages
+from page_cache import PageCache
+
+# Local stand-in for the scraped sites, serving the synthetic fixture pages (or
+# pages recorded in a page cache) with an optional per-request delay to imitate
+# network latency. Pages carry an ETag and conditional requests are answered
+# with 304, and the pages dict is read on every request, so a caller can change
+# pages while the server runs
+
+
+def recorded_pages(cache_folder):
+    # Pages recorded by earlier runs, served under the path they had on the site
+    cache = PageCache(cache_folder)
+    pages = {}
+    for url in cache.urls():
+        page = cache.get(url, allow_stale=True)
+        if page is not None:
+            pages[urlparse(url).path] = page
+    return pages
+
+
+def make_handler(pages, latency):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            page = pages.get(self.path.split('?')[0])
+            if page is None:
+                self.send_error(404)
+                return
+            body = page.encode('utf-8')
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def start_server(latency=0.0, port=0, pages=None):
+    # Serve from a background thread; port 0 picks a free port
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(site_pages() if pages is None else pages, latency))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def server_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve the fixture pages locally')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before answering each request')
+    parser.add_argument('--cache-dir', help='Serve the pages recorded in this page cache instead of the synthetic ones')
+    args = parser.parse_args()
+
+    pages = recorded_pages(args.cache_dir) if args.cache_dir else None
+    server = start_server(args.latency, args.port, pages)
+    print(f"Serving {'recorded' if pages else 'fixture'} pages on {server_url(server)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
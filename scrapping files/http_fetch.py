@@ -0,0 +1,59 @@
+import gzip
+import socket
+import urllib.error
+import urllib.request
+
+from metrics import metrics
+
+# Plain HTTP page fetching for pages whose content is already in the server HTML
+
+user_agent = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/126.0 Safari/537.36')
+
+
+def open_page(url, headers=None, timeout=30):
+    # Returns (body, response headers)
+    request = urllib.request.Request(url, headers={
+        'User-Agent': user_agent,
+        'Accept': 'text/html,application/xhtml+xml',
+        'Accept-Encoding': 'gzip',
+        **(headers or {}),
+    })
+    try:
+        with metrics.timer('navigation'), urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            if response.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            response_headers = response.headers
+    except socket.timeout:
+        metrics.count('timeouts')
+        raise
+    metrics.count('pages_http')
+    metrics.count('http_bytes', len(body))
+    return body, response_headers
+
+
+def fetch_page(url, timeout=30):
+    body, headers = open_page(url, timeout=timeout)
+    return body.decode(headers.get_content_charset() or 'utf-8', errors='replace')
+
+
+def fetch_if_changed(url, validators=None, timeout=30):
+    # Conditional GET with the ETag and Last-Modified of the previous answer.
+    # Returns (page source, validators), with None as the page source when the
+    # server answers 304 Not Modified
+    validators = validators or {}
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    try:
+        body, response_headers = open_page(url, headers, timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            metrics.count('pages_not_modified')
+            return None, validators
+        raise
+    validators = {'etag': response_headers.get('ETag'), 'last_modified': response_headers.get('Last-Modified')}
+    return body.decode(response_headers.get_content_charset() or 'utf-8', errors='replace'), validators
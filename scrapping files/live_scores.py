@@ -0,0 +1,249 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from aggregates import open_aggregates
+from http_fetch import fetch_if_changed
+import load_profile
+from match_store import open_store, series_slug
+from metrics import log, metrics
+import metrics as run_metrics
+from player_index import load_index
+import quarantine as page_quarantine
+from scorecard import all_kinds, base_url, folder_path, match_id_from_url, match_rows, open_manifest, open_writers, \
+    parse_page, write_match
+from scorecard_parser import parse_match_links
+from throttle import add_arguments, configure_from_args, fetch_with_retries, throttled
+
+# Live scorecards while matches are in progress. Only matches marked live on the
+# fixtures page (or given on the command line) are watched, and each poll does
+# as little as the page allows: a conditional request answered with 304 costs
+# no transfer, a body identical to the last one is not parsed, and a parsed
+# scorecard is diffed row by row against the previous poll so only batting and
+# bowling rows that changed go downstream. Changed rows are upserted into the
+# keyed match store and appended to live_changes.jsonl; once a match has a
+# result, its final scorecard is written to the CSVs and manifest as usual
+
+poll_interval = 30         # Seconds between polls of the watched matches
+discover_interval = 300    # Seconds between looks at the fixtures page for newly started matches
+changes_name = 'live_changes.jsonl'
+
+
+def row_key(kind, row):
+    return kind, row['team'], row['name']
+
+
+class LiveMatch:
+    def __init__(self, url):
+        self.url = url
+        self.match_id = match_id_from_url(url)
+        self.validators = None
+        self.page_hash = None
+        self.rows = {}
+        self.teams = []
+
+    def changed_rows(self, rows_by_kind):
+        # Rows that are new or differ from the last applied poll, per kind.
+        # Nothing is remembered until the poll has been applied, see commit()
+        return {kind: [row for row in rows_by_kind[kind] if self.rows.get(row_key(kind, row)) != row]
+                for kind in ('batting', 'bowling')}
+
+    def commit(self, page_hash, validators, changed, teams):
+        # Called once every sink has taken the poll
+        self.page_hash = page_hash
+        self.validators = validators
+        self.teams = teams
+        for kind, rows in changed.items():
+            for row in rows:
+                self.rows[row_key(kind, row)] = row
+
+    def forget_page(self):
+        # After a failed poll the next one fetches and applies the page again
+        self.page_hash = None
+        self.validators = None
+
+
+class LivePoller:
+    def __init__(self, fetch, folder=None, workers=4, on_change=None):
+        # fetch(url, validators) returns (page source, validators), with None as
+        # the page source when the page has not changed since those validators
+        self.fetch = fetch
+        self.folder = folder or folder_path
+        self.workers = workers
+        self.on_change = on_change
+        self.watched = {}
+        self.fixtures_validators = None
+        self.index = load_index(self.folder)
+        self.writers = open_writers(all_kinds, self.folder)
+        self.manifest = open_manifest(self.folder)
+        self.aggregates = open_aggregates(self.folder)
+        self.store = open_store(self.folder)
+        self.changes = open(os.path.join(self.folder, changes_name), 'a', encoding='utf-8')
+
+    def close(self):
+        self.changes.close()
+        self.aggregates.close()
+        self.store.close()
+
+    def watch(self, match_urls):
+        for match_url in match_urls:
+            if match_url not in self.watched and not self.manifest.is_done(match_url, all_kinds):
+                log.info(f"Watching {match_url}")
+                self.watched[match_url] = LiveMatch(match_url)
+
+    def discover(self, fixtures_url):
+        page_source, self.fixtures_validators = self.fetch(fixtures_url, self.fixtures_validators)
+        if page_source is not None:
+            self.watch(parse_match_links(page_source, fixtures_url, live_only=True))
+
+    def fetch_scorecard(self, match):
+        # Runs on the worker threads. Returns (scorecard, page hash, validators),
+        # with None as the scorecard when nothing can have changed; the match
+        # itself is only updated once the poll has been applied
+        page_source, validators = self.fetch(match.url, match.validators)
+        if page_source is None:
+            metrics.count('polls_not_modified')
+            return None, match.page_hash, validators
+        page_hash = hashlib.sha1(page_source.encode('utf-8')).hexdigest()
+        if page_hash == match.page_hash:
+            metrics.count('polls_unchanged')
+            return None, page_hash, validators
+        return parse_page(page_source, match.url), page_hash, validators
+
+    def apply(self, match, scorecard, page_hash=None, validators=None):
+        rows = match_rows(scorecard, match.url, self.index)
+        changed = match.changed_rows(rows)
+        teams = [innings['team'] for innings in scorecard['innings']]
+        new_teams = teams != match.teams
+
+        count = len(changed['batting']) + len(changed['bowling'])
+        metrics.count('live_rows_changed', count)
+        if count or new_teams:
+            with metrics.timer('write'):
+                self.store.add_match(series_slug(match.url), match.match_id, teams, changed['batting'], changed['bowling'],
+                                     rows['matches'][0] if new_teams else None)
+                now = time.time()
+                for kind in ('batting', 'bowling'):
+                    for row in changed[kind]:
+                        self.changes.write(json.dumps({'time': now, 'url': match.url, 'kind': kind, 'row': row}) + '\n')
+                self.changes.flush()
+            if self.on_change:
+                self.on_change(match.url, changed)
+            log.info(f"{scorecard['match_name']}: {len(changed['batting'])} batting and "
+                     f"{len(changed['bowling'])} bowling rows changed")
+        else:
+            metrics.count('polls_no_changes')
+
+        if scorecard['completed']:
+            # The finished scorecard goes through the normal path once, so the
+            # CSVs, manifest and aggregates never hold a partial match
+            write_match(self.writers, scorecard, match.url, self.manifest, self.index, self.aggregates, self.store)
+            del self.watched[match.url]
+            log.info(f"{scorecard['match_name']}: finished, final scorecard saved")
+        match.commit(page_hash, validators, changed, teams)
+        return count
+
+    def poll(self):
+        # Every watched match is fetched in parallel; changes are applied in order
+        def fetch_one(match):
+            try:
+                return (match,) + self.fetch_scorecard(match) + (None,)
+            except Exception as e:
+                return match, None, None, None, e
+
+        changed = 0
+        matches = list(self.watched.values())
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(matches)))) as executor:
+            for match, scorecard, page_hash, validators, error in executor.map(fetch_one, matches):
+                if error is not None:
+                    metrics.count('poll_failures')
+                    log.error(f"Error polling {match.url}: {error}")
+                    continue
+                if scorecard is None:
+                    match.validators = validators
+                    continue
+                try:
+                    changed += self.apply(match, scorecard, page_hash, validators)
+                except Exception as e:
+                    match.forget_page()
+                    metrics.count('poll_failures')
+                    log.error(f"Error saving {match.url}: {e}")
+                    log.debug(traceback.format_exc())
+        metrics.count('polls', len(matches))
+        return changed
+
+    def run(self, fixtures_url=None, interval=poll_interval, discover_every=discover_interval, cycles=None,
+            until_done=False):
+        next_discovery = 0.0
+        cycle = 0
+        while cycles is None or cycle < cycles:
+            started = time.monotonic()
+            if fixtures_url and started >= next_discovery:
+                try:
+                    self.discover(fixtures_url)
+                except Exception as e:
+                    log.error(f"Error reading the fixtures page {fixtures_url}: {e}")
+                next_discovery = started + discover_every
+            if until_done and not self.watched:
+                break
+
+            with metrics.timer('poll'):
+                self.poll()
+            cycle += 1
+            if cycles is not None and cycle >= cycles:
+                break
+            time.sleep(max(0.0, started + interval - time.monotonic()))
+
+
+def conditional_fetch(url, validators):
+    return fetch_with_retries(lambda page_url: fetch_if_changed(page_url, validators), url)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Poll the scorecards of matches in progress and store only what changed')
+    parser.add_argument('match_urls', nargs='*', help='Scorecards to watch besides the live matches on the fixtures page')
+    parser.add_argument('--url', default=base_url, help='Fixtures and results page of the series')
+    parser.add_argument('--no-discover', action='store_true', help='Only watch the given match URLs')
+    parser.add_argument('--output-dir', default=folder_path)
+    parser.add_argument('--interval', type=float, default=poll_interval, help='Seconds between polls')
+    parser.add_argument('--discover-interval', type=float, default=discover_interval,
+                        help='Seconds between looks at the fixtures page for newly started matches')
+    parser.add_argument('--cycles', type=int, help='Stop after this many polls (default: run until interrupted)')
+    parser.add_argument('--until-done', action='store_true', help='Stop once no watched match is still in progress')
+    parser.add_argument('--workers', type=int, default=4, help='Number of match pages fetched in parallel')
+    parser.add_argument('--http', action='store_true', help='Fetch pages with a plain HTTP client instead of browsers')
+    add_arguments(parser)
+    load_profile.add_arguments(parser)
+    page_quarantine.add_arguments(parser)
+    run_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    page_quarantine.configure_from_args(args, args.output_dir)
+    run_metrics.configure_logging(args.verbose)
+
+    browsers = []
+    if args.http:
+        fetch = conditional_fetch
+    else:
+        # A browser cannot make conditional requests, so unchanged pages are
+        # only recognised by their content
+        from scorecard import BrowserFetcher, match_div_selector
+        browsers = [BrowserFetcher(profile=args.profile), BrowserFetcher(wait_selector=match_div_selector, profile=args.profile)]
+        fetch_scorecard, fetch_fixtures = (throttled(browser) for browser in browsers)
+        fetch = lambda url, validators: (fetch_fixtures(url) if url == args.url else fetch_scorecard(url), None)
+
+    poller = LivePoller(fetch, args.output_dir, args.workers)
+    try:
+        poller.watch(args.match_urls)
+        poller.run(None if args.no_discover else args.url, args.interval, args.discover_interval, args.cycles, args.until_done)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        poller.close()
+        for browser in browsers:
+            browser.close()
+    run_metrics.finish_run('live_scores', args.metrics_dir or args.output_dir)
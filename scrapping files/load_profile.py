@@ -0,0 +1,215 @@
+import argparse
+import json
+import threading
+from urllib.parse import urlparse
+
+import trio
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+from metrics import log, metrics
+
+# How the scrapers' browsers load pages. Every scraper only reads the DOM, so the
+# lean profile runs headless, stops waiting at DOMContentLoaded ('eager') and
+# lets a request through only when it goes to a first-party host and is of a
+# resource type the DOM needs. Everything else (images, media, fonts, trackers,
+# ads, video players) is failed in the browser through the DevTools Fetch domain.
+# The lists below are shared by all scrapers
+
+# Sites the scrapers read; requests to any other host are third-party. Loopback
+# hosts are the local fixture site of the benchmarks
+first_party_hosts = ('espncricinfo.com', 'hscicdn.com', 'cricbuzz.com', 'cricbuzz.in', 'localhost', '127.0.0.1')
+
+# Resource types a page needs for its DOM; every other type is blocked
+allowed_resource_types = {'Document', 'Script', 'XHR', 'Fetch', 'Stylesheet', 'Other'}
+
+profiles = {
+    'lean': {'headless': True, 'page_load_strategy': 'eager', 'block': True},
+    'full': {'headless': False, 'page_load_strategy': 'normal', 'block': False},
+}
+default_profile = 'lean'
+
+
+def chrome_options(profile, headless=None):
+    # An explicit headless flag from a caller wins over the profile
+    settings = profiles[profile]
+    options = Options()
+    if settings['headless'] if headless is None else headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.page_load_strategy = settings['page_load_strategy']
+    if settings['block']:
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+
+    # Network events for the per-page report
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+def create_driver(profile=default_profile, headless=None):
+    profile = profile or default_profile
+    options = chrome_options(profile, headless)
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver.load_profile = profile
+    filter_tab(driver)
+    return driver
+
+
+def is_first_party(url):
+    host = urlparse(url).hostname or ''
+    return any(host == domain or host.endswith('.' + domain) for domain in first_party_hosts)
+
+
+def is_allowed(url, resource_type):
+    return resource_type in allowed_resource_types and (is_first_party(url) or url.startswith('data:'))
+
+
+class RequestFilter:
+    # Enforces the allowlist in one tab. DevTools pauses every request of the tab
+    # and only reports it as an event, which needs a connection of its own: it is
+    # served by trio on a daemon thread until the tab or the browser goes away
+    def __init__(self, driver, timeout=10):
+        self.version, self.ws_url = driver._get_cdp_details()
+        self.target_id = driver.current_window_handle
+        self.ready = threading.Event()
+        self.error = None
+        threading.Thread(target=trio.run, args=(self._serve,), daemon=True).start()
+        # Requests are only filtered once Fetch is enabled, so wait for it
+        if not self.ready.wait(timeout):
+            raise WebDriverException(f"Request filter did not start within {timeout}s")
+        if self.error:
+            raise self.error
+
+    async def _serve(self):
+        from selenium.webdriver.common.bidi import cdp
+        devtools = cdp.import_devtools(self.version)
+        try:
+            async with cdp.open_cdp(self.ws_url) as connection:
+                async with connection.open_session(self.target_id) as session:
+                    paused = session.listen(devtools.fetch.RequestPaused, buffer_size=256)
+                    await session.execute(devtools.fetch.enable(patterns=[devtools.fetch.RequestPattern(url_pattern='*')]))
+                    self.ready.set()
+                    async for event in paused:
+                        if is_allowed(event.request.url, event.resource_type.value):
+                            await session.execute(devtools.fetch.continue_request(request_id=event.request_id))
+                        else:
+                            await session.execute(devtools.fetch.fail_request(
+                                request_id=event.request_id, error_reason=devtools.network.ErrorReason.BLOCKED_BY_CLIENT))
+        except Exception as e:
+            if not self.ready.is_set():
+                self.error = WebDriverException(f"Request filter failed to start: {e}")
+                self.ready.set()
+            else:
+                # The tab was closed or the browser quit
+                log.debug(f"Request filter for tab {self.target_id} stopped: {e}")
+
+
+def filter_tab(driver):
+    # Called for the first window and for every tab opened later (see tab_pool.py),
+    # since DevTools settings only apply to the tab they were made in
+    if profiles[getattr(driver, 'load_profile', default_profile)]['block']:
+        RequestFilter(driver)
+
+
+def network_events(driver):
+    # Drains the performance log, so each call covers the pages loaded since the last one
+    try:
+        entries = driver.get_log('performance')
+    except WebDriverException:
+        return []
+    events = []
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        if message.get('method', '').startswith('Network.'):
+            events.append(message)
+    return events
+
+
+def summarise_events(events):
+    stats = {'requests': 0, 'bytes': 0, 'blocked': 0, 'third_party': 0, 'unneeded': 0}
+    for event in events:
+        params = event.get('params', {})
+        method = event['method']
+        if method == 'Network.requestWillBeSent':
+            stats['requests'] += 1
+            if not is_first_party(params['request']['url']):
+                stats['third_party'] += 1
+            if params.get('type', 'Other') not in allowed_resource_types:
+                stats['unneeded'] += 1
+        elif method == 'Network.loadingFinished':
+            stats['bytes'] += int(params.get('encodedDataLength', 0))
+        elif method == 'Network.loadingFailed' and (params.get('blockedReason') or
+                                                    params.get('errorText') == 'net::ERR_BLOCKED_BY_CLIENT'):
+            stats['blocked'] += 1
+    return stats
+
+
+class LoadReport:
+    # Running totals of what the browsers fetched and what the profile blocked
+    def __init__(self):
+        # Worker tabs on several threads record into the same totals
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.totals = {'requests': 0, 'bytes': 0, 'blocked': 0, 'third_party': 0, 'unneeded': 0}
+
+    def record(self, driver, url):
+        stats = summarise_events(network_events(driver))
+        if not stats['requests']:
+            return None  # Performance logging is off for this browser
+        with self.lock:
+            self.pages += 1
+            for key, value in stats.items():
+                self.totals[key] += value
+        metrics.count('browser_requests', stats['requests'])
+        metrics.count('browser_requests_blocked', stats['blocked'])
+        metrics.count('browser_bytes', stats['bytes'])
+        log.info(f"Loaded {url}: {stats['requests']} requests, {stats['bytes'] / 1024:.0f} KiB, "
+                 f"{stats['blocked']} blocked ({stats['third_party']} third-party, {stats['unneeded']} of unneeded types requested)")
+        return stats
+
+    def summary(self):
+        with self.lock:
+            pages, totals = self.pages, dict(self.totals)
+        if not pages:
+            return "No page loads recorded"
+        return (f"{pages} pages: {totals['requests'] / pages:.1f} requests and "
+                f"{totals['bytes'] / pages / 1024:.0f} KiB per page, "
+                f"{totals['blocked'] / pages:.1f} requests blocked per page")
+
+
+load_report = LoadReport()
+
+
+def add_arguments(parser):
+    parser.add_argument('--profile', choices=sorted(profiles), default=default_profile,
+                        help="Browser load profile: 'lean' is headless with blocking, 'full' loads everything in a visible window")
+
+
+def compare(url):
+    # Load one page with every profile and show what the lean profile saves
+    results = {}
+    for profile in profiles:
+        driver = create_driver(profile, headless=True)
+        try:
+            driver.get(url)
+            results[profile] = summarise_events(network_events(driver))
+        finally:
+            driver.quit()
+    for profile, stats in results.items():
+        print(f"{profile:>5}: {stats['requests']:4d} requests, {stats['bytes'] / 1024:8.0f} KiB, {stats['blocked']:3d} blocked")
+    saved_requests = results['full']['requests'] - (results['lean']['requests'] - results['lean']['blocked'])
+    saved_bytes = results['full']['bytes'] - results['lean']['bytes']
+    print(f"Saved {saved_requests} requests and {saved_bytes / 1024:.0f} KiB on {url}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the page weight of the browser load profiles on one page')
+    parser.add_argument('url')
+    args = parser.parse_args()
+    compare(args.url)
@@ -0,0 +1,210 @@
+import argparse
+import csv
+import os
+import sqlite3
+from urllib.parse import urlparse
+
+from columnar import age_to_days, overs_to_balls, parse_float, parse_int
+
+# Keyed SQLite copy of everything the scrapers write. Unlike the append-only
+# CSVs, every row has a natural key, so writing a match or squad again replaces
+# its rows instead of adding a second copy. A match is written with one bulk
+# upsert transaction, and WAL mode lets readers query while a crawl is writing
+
+# The series the shipped CSVs come from
+default_series = 'icc-men-s-t20-world-cup-2024-1411166'
+
+
+def text(value):
+    return value
+
+
+# table: (key columns, (column, SQL type, CSV column, converter) for every other column)
+tables = {
+    'batting': (['series', 'match_id', 'innings', 'name'], [
+        ('player_id', 'INTEGER', 'player_id', parse_int),
+        ('match', 'TEXT', 'match', text),
+        ('team', 'TEXT', 'team', text),
+        ('bat_pos', 'INTEGER', 'bat_pos', parse_int),
+        ('not_out', 'INTEGER', 'not_out', lambda value: int(value == 'Not Out')),
+        ('runs', 'INTEGER', 'runs', parse_int),
+        ('balls', 'INTEGER', 'balls', parse_int),
+        ('minutes', 'INTEGER', 'minutes', parse_int),
+        ('fours', 'INTEGER', 'fours', parse_int),
+        ('sixes', 'INTEGER', 'sixes', parse_int),
+        ('strike_rate', 'REAL', 'strike_rate', parse_float),
+    ]),
+    'bowling': (['series', 'match_id', 'innings', 'name'], [
+        ('player_id', 'INTEGER', 'player_id', parse_int),
+        ('match', 'TEXT', 'match', text),
+        ('team', 'TEXT', 'team', text),
+        ('balls', 'INTEGER', 'overs', overs_to_balls),
+        ('maidens', 'INTEGER', 'maidens', parse_int),
+        ('runs', 'INTEGER', 'runs', parse_int),
+        ('wickets', 'INTEGER', 'wickets', parse_int),
+        ('economy', 'REAL', 'economy', parse_float),
+        ('dots', 'INTEGER', 'dots', parse_int),
+        ('fours', 'INTEGER', 'fours', parse_int),
+        ('sixes', 'INTEGER', 'sixes', parse_int),
+        ('wides', 'INTEGER', 'wides', parse_int),
+        ('no_balls', 'INTEGER', 'no_balls', parse_int),
+    ]),
+    'matches': (['series', 'match_id'], [
+        ('match', 'TEXT', 'match', text),
+        ('title', 'TEXT', 'title', text),
+        ('team_1', 'TEXT', 'team_1', text),
+        ('team_2', 'TEXT', 'team_2', text),
+        ('url', 'TEXT', 'url', text),
+    ]),
+    'squads': (['country', 'name'], [
+        ('role', 'TEXT', 'Role', text),
+        ('age_days', 'INTEGER', 'Age', age_to_days),
+        ('batting_type', 'TEXT', 'Batting Type', text),
+        ('bowling_type', 'TEXT', 'Bowling Type', text),
+        ('image_url', 'TEXT', 'Image URL', text),
+    ]),
+}
+
+# Lookups by player, team and match; series lookups are covered by the primary keys
+indexes = {
+    'batting': [['player_id'], ['team'], ['match_id']],
+    'bowling': [['player_id'], ['team'], ['match_id']],
+    'matches': [['match_id'], ['team_1'], ['team_2']],
+    'squads': [['name']],
+}
+
+
+def series_slug(match_url):
+    # .../series/<series>/<match>/full-scorecard -> <series>
+    parts = urlparse(match_url).path.strip('/').split('/')
+    if 'series' in parts[:-1]:
+        return parts[parts.index('series') + 1]
+    return default_series
+
+
+def innings_numbers(batting, bowling, teams=()):
+    # Both batting and bowling rows carry the batting side, so innings follow the
+    # order the teams batted in
+    numbers = {}
+    for team in list(teams) + [row['team'] for row in list(batting) + list(bowling)]:
+        numbers.setdefault(team, len(numbers) + 1)
+    return numbers
+
+
+class MatchStore:
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        # With WAL, NORMAL only risks the last transactions on power loss, never corruption
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            for table, (keys, columns) in tables.items():
+                definitions = [f"{key} {'INTEGER' if key == 'innings' else 'TEXT'} NOT NULL" for key in keys]
+                definitions += [f"{column} {sql_type}" for column, sql_type, _, _ in columns]
+                self.connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(definitions)}, PRIMARY KEY ({', '.join(keys)}))")
+                for index_columns in indexes[table]:
+                    self.connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {table}_{'_'.join(index_columns)} ON {table} ({', '.join(index_columns)})")
+
+        self.statements = {table: self._upsert_statement(table) for table in tables}
+
+    def _upsert_statement(self, table):
+        keys, columns = tables[table]
+        names = keys + [column for column, _, _, _ in columns]
+        updates = ', '.join(f"{column} = excluded.{column}" for column, _, _, _ in columns)
+        return (f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+                f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}")
+
+    def close(self):
+        self.connection.close()
+
+    def add_match(self, series, match_id, teams=(), batting=(), bowling=(), match=None, replace=()):
+        # One transaction per match. Rows are keyed by (series, match, innings,
+        # player), so writing the same match again leaves one copy of each row.
+        # replace names the tables given in full: their old rows of the match go
+        # first, so players dropped or renamed in a corrected scorecard do not
+        # linger. Live polls pass only changed rows and leave it empty
+        match_id = str(match_id)
+        innings = innings_numbers(batting, bowling, teams)
+        with self.connection:
+            for table in replace:
+                self.connection.execute(f"DELETE FROM {table} WHERE series = ? AND match_id = ?", [series, match_id])
+            for table, rows in (('batting', batting), ('bowling', bowling)):
+                if rows:
+                    columns = tables[table][1]
+                    self.connection.executemany(self.statements[table], [
+                        [series, match_id, innings[row['team']], row['name']] +
+                        [convert(row.get(csv_column)) for _, _, csv_column, convert in columns]
+                        for row in rows
+                    ])
+            if match:
+                self.connection.execute(self.statements['matches'], [series, match_id] + [
+                    match.get(csv_column) for _, _, csv_column, _ in tables['matches'][1]])
+
+    def add_squad(self, players):
+        # players are squad CSV rows, keyed by (country, name)
+        columns = tables['squads'][1]
+        with self.connection:
+            self.connection.executemany(self.statements['squads'], [
+                [player['Country'], player['Name']] + [convert(player.get(csv_column)) for _, _, csv_column, convert in columns]
+                for player in players
+            ])
+
+    def count(self, table):
+        return self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def open_store(folder):
+    # The store lives next to the CSVs it mirrors
+    return MatchStore(os.path.join(folder, 'matches.sqlite'))
+
+
+def read_rows(csv_file):
+    if not os.path.isfile(csv_file):
+        return []
+    with open(csv_file, newline='', encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+
+def import_csvs(store, folder, series=default_series):
+    # Load existing CSVs; the repeated matches of append-mode reruns collapse onto their keys
+    by_match = {}
+    for kind, file_name in (('batting', 'batting_stats.csv'), ('bowling', 'bowling_stats.csv')):
+        for row in read_rows(os.path.join(folder, file_name)):
+            by_match.setdefault(row['match_id'], {'batting': [], 'bowling': []})[kind].append(row)
+    matches = {row['match_id']: row for row in read_rows(os.path.join(folder, 'match_data.csv'))}
+
+    for match_id, rows in by_match.items():
+        match = matches.get(match_id)
+        match_series = series_slug(match['url']) if match and match.get('url') else series
+        teams = [team for team in (match['team_1'], match['team_2']) if team] if match else []
+        store.add_match(match_series, match_id, teams, rows['batting'], rows['bowling'], match,
+                        replace=('batting', 'bowling'))
+
+    squad = read_rows(os.path.join(folder, 'player_data.csv'))
+    if squad:
+        store.add_squad(squad)
+    return len(by_match), len(squad)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load the scraped CSVs into the keyed SQLite store')
+    parser.add_argument('folder', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csv files'))
+    parser.add_argument('--series', default=default_series, help='Series of CSV rows whose match has no URL in match_data.csv')
+    args = parser.parse_args()
+
+    store = open_store(args.folder)
+    try:
+        matches, players = import_csvs(store, args.folder, args.series)
+        print(f"Loaded {matches} matches and {players} squad rows into {store.path}")
+        for table in tables:
+            print(f"{table:>8}: {store.count(table)} rows")
+    finally:
+        store.close()
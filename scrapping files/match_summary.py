@@ -1,144 +1,123 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-import time
+import argparse
 import csv
-import re
+import os
+import urllib.error
+from http_fetch import fetch_page
+import metrics as run_metrics
+from metrics import log, metrics
+from page_cache import PageCache, cached_fetch
+import quarantine as page_quarantine
+from quarantine import parse_or_quarantine, quarantine
+from summary_parser import count_matches, parse_match_summaries, summary_header
+from throttle import add_arguments, configure_from_args, is_transient, rate_limiter, throttled
 
-# Initialize ChromeDriver using the Service class
-service = Service(ChromeDriverManager().install())
-options = Options()
-options.add_argument("--headless")  # Run in headless mode
-driver = webdriver.Chrome(service=service, options=options)
+# The Cricbuzz matches list is in the server HTML, so it is fetched with a plain
+# HTTP client and parsed offline. A browser is only started when the HTML has no
+# matches in it (e.g. the site switched to client-side rendering) or the plain
+# request is refused or fails (e.g. a 403 or 429 bot block)
 
 url = 'https://m.cricbuzz.com/cricket-series/7476/icc-mens-t20-world-cup-2024/matches'
-driver.get(url)
-
-# Wait for the page to load
-time.sleep(5)
-
-# Locate the match divs using CSS selector
-try:
-    match_divs = driver.find_elements(By.CSS_SELECTOR, 'a.w-full.bg-cbWhite.flex.flex-col.p-3.gap-1')
-except Exception as e:
-    print(f"Error finding match divs: {e}")
-    driver.quit()
-    exit()
-
-# Create a list to store all the matches
-matches = []
-
-# Initialize match number
-match_no = 1
-
-# Helper function to extract runs, wickets, and overs
-def extract_score(score_str):
-    default_wickets = '10'
-    runs = ''
-    wickets = default_wickets
-    overs = '0.0'
-    
-    if '-' in score_str:
-        runs_wickets = score_str.split('-')
-        runs = runs_wickets[0].strip() if len(runs_wickets) > 0 else ''
-        if len(runs_wickets) > 1:
-            wickets = runs_wickets[1].split(' ')[0].strip()
-    else:
-        runs = re.split(r'\s*\(', score_str)[0].strip()
-    
-    overs_match = re.search(r'\((\d+(\.\d+)?)\)', score_str)
-    if overs_match:
-        overs = overs_match.group(1)
-    
-    runs = re.sub(r'\D', '', runs)
-    wickets = re.sub(r'\D', '', wickets) if wickets else default_wickets
-    
+csv_file_path = 'C:\\Users\\DEEPAK\\Downloads\\match data\\match_summary.csv'
+
+match_selector = 'a.w-full.bg-cbWhite.flex.flex-col.p-3.gap-1'
+
+
+def wait_for_matches(driver, timeout=10):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    # Wait for the match list to render instead of a fixed delay
+    return WebDriverWait(driver, timeout).until(
+        EC.presence_of_all_elements_located((By.CSS_SELECTOR, match_selector))
+    )
+
+
+# Browser load profile used when the browser is needed
+browser_profile = 'lean'
+
+
+def create_driver():
+    # Selenium is imported here so the HTTP path never pays for it
+    import load_profile
+    return load_profile.create_driver(browser_profile)
+
+
+def fetch_with_browser(url):
+    import load_profile
+    driver = create_driver()
     try:
-        overs = float(overs.replace(',', '.'))
-    except ValueError:
-        overs = 0.0
-    
-    return runs, wickets, overs
-
-def scrape_matches(url):
-    options = Options()
-    options.add_argument("--headless")  # Run in headless mode
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    driver.get(url)
-    
-    # Find all match elements
-    match_divs = driver.find_elements(By.CSS_SELECTOR, 'a.w-full.bg-cbWhite.flex.flex-col.p-3.gap-1')
-    
-    matches = []
-
-    for match_div in match_divs:
-        try:
-            # Extract match title
-            title = match_div.get_attribute('title')
-            title_parts = title.split(', ')
-            if len(title_parts) >= 3:
-                team1, team2 = title_parts[0].split(' vs ')
-                match_no = title_parts[1].replace('Match ', '')
-                group = title_parts[2].replace('Group ', '')
-            else:
-                team1, team2 = 'NA', 'NA'
-                match_no, group = 'NA', 'NA'
-            
-            # Extract venue
-            venue_div = match_div.find_element(By.CSS_SELECTOR, 'div.text-xs.text-cbTxtSec.dark:text-cbTxtSec')
-            venue = venue_div.text.split('•')[-1].strip() if '•' in venue_div.text else 'NA'
-            
-            # Extract scores
-            score_divs = match_div.find_elements(By.CSS_SELECTOR, 'div.flex.flex-col.gap-3.my-2 > div')
-            if len(score_divs) == 2:
-                team1_score = score_divs[0].text
-                team2_score = score_divs[1].text
-                team1_runs, team1_wickets, team1_overs = extract_score(team1_score)
-                team2_runs, team2_wickets, team2_overs = extract_score(team2_score)
-            else:
-                team1_runs, team1_wickets, team1_overs = 'NA', 'NA', 'NA'
-                team2_runs, team2_wickets, team2_overs = 'NA', 'NA', 'NA'
-            
-            # Extract match result
-            result_text = match_div.find_element(By.CSS_SELECTOR, 'span.text-cbComplete').text
-            if 'won' in result_text:
-                margin = re.search(r'by (.+)', result_text)
-                winner = result_text
-                margin = margin.group(1) if margin else 'NA'
-            else:
-                winner = result_text
-                margin = 'NA'
-                # Set scores and overs to 'NA' if the match result doesn't contain 'won'
-                team1_runs, team1_wickets, team1_overs = 'NA', 'NA', 'NA'
-                team2_runs, team2_wickets, team2_overs = 'NA', 'NA', 'NA'
-            
-            # Append to matches list
-            matches.append([team1, team2, match_no, group, venue, team1_runs, team1_wickets, team1_overs, team2_runs, team2_wickets, team2_overs, margin, winner])
-        
-        except Exception as e:
-            print(f"Error parsing match: {e}")
-            matches.append(['NA'] * 13)  # Fill with 'NA' in case of an error
-
-    driver.quit()
-    
+        with metrics.timer('navigation'):
+            driver.get(url)
+        with metrics.timer('wait'):
+            wait_for_matches(driver)
+        load_profile.load_report.record(driver, url)
+        return driver.page_source
+    finally:
+        driver.quit()
+
+
+def fetch_listing(url):
+    try:
+        page_source = fetch_page(url)
+    except Exception as e:
+        if not (isinstance(e, urllib.error.HTTPError) or is_transient(e)):
+            raise
+        metrics.count('browser_fallbacks')
+        log.warning(f"Plain request for {url} failed ({e}), loading the page in a browser")
+        rate_limiter.wait(url)
+        return fetch_with_browser(url)
+    if count_matches(page_source):
+        return page_source
+
+    metrics.count('browser_fallbacks')
+    log.warning("No matches in the server HTML, loading the page in a browser")
+    rate_limiter.wait(url)
+    return fetch_with_browser(url)
+
+
+def scrape_matches(url, use_browser=False, cache=None, replay=False):
+    fetch = throttled(fetch_with_browser if use_browser else fetch_listing)
+    page_source = cached_fetch(cache, fetch, url, replay=replay)
+    with metrics.timer('extract'):
+        matches = parse_or_quarantine('match_list', parse_match_summaries, url, page_source)
+    failed = sum(1 for match in matches if match[0] == 'NA')
+    if failed:
+        quarantine.capture('match_list', url, page_source, f"{failed} of {len(matches)} matches failed to parse")
     return matches
 
 
 def save_to_csv(matches, filename):
-    with open(filename, mode='w', newline='', encoding='utf-8') as file:
+    folder = os.path.dirname(filename)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with metrics.timer('write'), open(filename, mode='w', newline='', encoding='utf-8') as file:
         writer = csv.writer(file)
-        header = ['Team 1', 'Team 2', 'Match No', 'Group', 'Venue', 'Team 1 Runs', 'Team 1 Wickets', 'Team 1 Overs', 'Team 2 Runs', 'Team 2 Wickets', 'Team 2 Overs', 'Margin', 'Winner']
-        writer.writerow(header)
+        writer.writerow(summary_header)
         writer.writerows(matches)
+    metrics.count('rows_matches', len(matches))
 
-if __name__ == "__main__":
-    url = 'https://m.cricbuzz.com/cricket-series/7476/icc-mens-t20-world-cup-2024/matches'
-    matches = scrape_matches(url)
-    save_to_csv(matches, 'C:\\Users\\DEEPAK\\Downloads\\match data\\match_summary.csv')
 
-print("Data saved to 'C:\\Users\\DEEPAK\\Downloads\\match data\\match_summary.csv' successfully!")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Save the result summary of every match in the series')
+    parser.add_argument('--url', default=url)
+    parser.add_argument('--output', default=csv_file_path)
+    parser.add_argument('--browser', action='store_true', help='Always load the page in a headless browser')
+    parser.add_argument('--profile', choices=['full', 'lean'], default=browser_profile, help='Browser load profile, see load_profile.py')
+    parser.add_argument('--cache-dir', default=os.path.join(os.path.dirname(csv_file_path), 'page_cache'))
+    parser.add_argument('--no-cache', action='store_true', help='Always fetch the page from the site')
+    parser.add_argument('--replay', action='store_true', help='Parse the cached page without a browser or network')
+    add_arguments(parser)
+    page_quarantine.add_arguments(parser)
+    run_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    page_quarantine.configure_from_args(args, os.path.dirname(args.output) or '.')
+    run_metrics.configure_logging(args.verbose)
+    browser_profile = args.profile
 
-# Close the driver
-driver.quit()
+    cache = None if args.no_cache and not args.replay else PageCache(args.cache_dir)
+    matches = scrape_matches(args.url, use_browser=args.browser, cache=cache, replay=args.replay)
+    save_to_csv(matches, args.output)
+    log.info(f"Data saved to '{args.output}' successfully! ({len(matches)} matches)")
+    run_metrics.finish_run('match_summary', args.metrics_dir or os.path.dirname(args.output))
@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from page_cache import write_atomic
+
+# Run instrumentation shared by the scrapers: timers for the stages every page
+# goes through (navigation, wait, extract, write), counters for rows, retries,
+# timeouts and failures, and quiet logging. At the end of a run the numbers are
+# written as a JSON summary and a Prometheus textfile, so runs can be compared
+
+# Time spent waiting on the rate limiter is timed as 'throttle'
+stages = ('throttle', 'navigation', 'wait', 'extract', 'write')
+
+log = logging.getLogger('scraper')
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.timers = {}
+        self.counters = {}
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            timer = self.timers.setdefault(stage, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            timer['count'] += 1
+            timer['seconds'] += seconds
+            timer['max_seconds'] = max(timer['max_seconds'], seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self, job):
+        with self.lock:
+            timers = {stage: dict(timer, mean_seconds=timer['seconds'] / timer['count'])
+                      for stage, timer in self.timers.items()}
+            return {
+                'job': job,
+                'started_at': self.started,
+                'duration_seconds': time.time() - self.started,
+                'stages': timers,
+                'counters': dict(self.counters),
+            }
+
+    def prometheus_text(self, job):
+        summary = self.summary(job)
+        lines = [
+            '# HELP scraper_stage_seconds_total Time spent in each scraping stage',
+            '# TYPE scraper_stage_seconds_total counter',
+        ]
+        for stage, timer in summary['stages'].items():
+            lines.append(f'scraper_stage_seconds_total{{job="{job}",stage="{stage}"}} {timer["seconds"]:.6f}')
+        lines += ['# HELP scraper_stage_runs_total Times each scraping stage ran', '# TYPE scraper_stage_runs_total counter']
+        for stage, timer in summary['stages'].items():
+            lines.append(f'scraper_stage_runs_total{{job="{job}",stage="{stage}"}} {timer["count"]}')
+        lines += ['# HELP scraper_stage_max_seconds Slowest single run of each stage', '# TYPE scraper_stage_max_seconds gauge']
+        for stage, timer in summary['stages'].items():
+            lines.append(f'scraper_stage_max_seconds{{job="{job}",stage="{stage}"}} {timer["max_seconds"]:.6f}')
+        lines += ['# HELP scraper_events_total Rows, retries, timeouts and failures counted during the run',
+                  '# TYPE scraper_events_total counter']
+        for name, value in sorted(summary['counters'].items()):
+            lines.append(f'scraper_events_total{{job="{job}",event="{name}"}} {value}')
+        lines += [
+            '# TYPE scraper_run_duration_seconds gauge',
+            f'scraper_run_duration_seconds{{job="{job}"}} {summary["duration_seconds"]:.3f}',
+            '# TYPE scraper_last_run_timestamp_seconds gauge',
+            f'scraper_last_run_timestamp_seconds{{job="{job}"}} {time.time():.0f}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def export(self, folder, job):
+        # <job>_metrics.json keeps the full summary; <job>.prom is for a node_exporter textfile collector
+        json_file = os.path.join(folder, f"{job}_metrics.json")
+        prom_file = os.path.join(folder, f"{job}.prom")
+        write_atomic(json_file, json.dumps(self.summary(job), indent=2).encode('utf-8'))
+        write_atomic(prom_file, self.prometheus_text(job).encode('utf-8'))
+        return json_file, prom_file
+
+    def report(self, job):
+        summary = self.summary(job)
+        stage_text = ', '.join(f"{stage} {summary['stages'][stage]['seconds']:.1f}s"
+                               for stage in stages if stage in summary['stages'])
+        counter_text = ', '.join(f"{name} {value}" for name, value in sorted(summary['counters'].items()))
+        return f"{job} finished in {summary['duration_seconds']:.1f}s ({stage_text or 'no stages timed'}; {counter_text or 'no events'})"
+
+
+metrics = Metrics()
+
+
+def configure_logging(verbose=False):
+    # Quiet by default: only warnings and errors unless --verbose is given
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING, format='%(message)s')
+
+
+def add_arguments(parser, default_folder=None):
+    parser.add_argument('--verbose', action='store_true', help='Log every page and match instead of only problems')
+    parser.add_argument('--metrics-dir', default=default_folder,
+                        help='Folder for the JSON summary and Prometheus textfile written at the end of the run')
+
+
+def finish_run(job, folder):
+    # Print the one-line summary and write the metrics files
+    print(metrics.report(job))
+    if folder:
+        try:
+            json_file, prom_file = metrics.export(folder, job)
+            log.info(f"Metrics written to {json_file} and {prom_file}")
+        except OSError as e:
+            log.warning(f"Could not write metrics to {folder}: {e}")
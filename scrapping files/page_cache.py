@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from scorecard_parser import is_completed_match
+
+# On-disk page cache. Page bodies are stored gzip-compressed under the hash of
+# their content, and a small JSON index entry per URL points at the current body
+# together with when it was fetched, how long it stays fresh and whether it is
+# pinned (pages of completed matches never change again, so they never expire)
+
+default_ttl = 15 * 60
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+
+class PageCache:
+    def __init__(self, folder, ttl=default_ttl):
+        self.folder = folder
+        self.ttl = ttl
+
+    def index_path(self, url):
+        key = url_key(url)
+        return os.path.join(self.folder, 'index', key[:2], f"{key}.json")
+
+    def object_path(self, digest):
+        return os.path.join(self.folder, 'objects', digest[:2], f"{digest}.html.gz")
+
+    def entry(self, url):
+        try:
+            with open(self.index_path(url), encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        return entry['pinned'] or time.time() - entry['fetched_at'] < entry['ttl']
+
+    def get(self, url, allow_stale=False):
+        entry = self.entry(url)
+        if entry is None or (not allow_stale and not self.is_fresh(entry)):
+            return None
+        try:
+            with gzip.open(self.object_path(entry['sha256']), 'rb') as file:
+                return file.read().decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def put(self, url, page_source, ttl=None, pinned=False):
+        data = page_source.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+
+        # Identical pages share one stored body
+        object_path = self.object_path(digest)
+        if not os.path.isfile(object_path):
+            write_atomic(object_path, gzip.compress(data, compresslevel=6))
+
+        entry = {
+            'url': url,
+            'sha256': digest,
+            'fetched_at': time.time(),
+            'ttl': self.ttl if ttl is None else ttl,
+            'pinned': pinned,
+        }
+        write_atomic(self.index_path(url), json.dumps(entry).encode('utf-8'))
+
+    def urls(self):
+        index_folder = os.path.join(self.folder, 'index')
+        for root, _, files in os.walk(index_folder):
+            for name in files:
+                if name.endswith('.json'):
+                    with open(os.path.join(root, name), encoding='utf-8') as file:
+                        yield json.load(file)['url']
+
+
+def cached_fetch(cache, fetch, url, replay=False, ttl=None, pin_completed=False):
+    # Serve from the cache when possible; in replay mode never touch the network
+    if cache is None:
+        return fetch(url)
+
+    page_source = cache.get(url, allow_stale=replay)
+    if page_source is not None:
+        return page_source
+    if replay:
+        raise KeyError(f"{url} is not in the page cache")
+
+    page_source = fetch(url)
+    cache.put(url, page_source, ttl=ttl, pinned=pin_completed and is_completed_match(page_source))
+    return page_source
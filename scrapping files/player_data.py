@@ -1,138 +1,188 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException
-import time
-import csv
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import os
-
-# Initialize the Chrome WebDriver
-driver = webdriver.Chrome()
+from columnar import write_parquet_outputs
+from crawl_manifest import CrawlManifest, commit_record
+from csv_sink import MatchCSVWriter
+from http_fetch import fetch_page
+import load_profile
+import metrics as run_metrics
+from metrics import log, metrics
+from match_store import open_store
+from page_cache import PageCache, cached_fetch
+import quarantine as page_quarantine
+from quarantine import parse_or_quarantine, quarantine
+from scorecard import BrowserFetcher
+from squad_parser import parse_squad, parse_squad_links, squad_header
+from throttle import add_arguments, configure_from_args, rate_limiter, throttled
 
 # Path for the CSV file
 csv_file_path = r'C:\Users\DEEPAK\Downloads\match data\player_data.csv'
 
+# Squads index of the series
+base_url = "https://www.espncricinfo.com/series/icc-men-s-t20-world-cup-2024-1411166/squads"
+
+# Squads change rarely, so cached squad pages stay fresh for a day
+squad_cache_ttl = 24 * 60 * 60
+
+country_selector = '.ds-flex.ds-flex-row.ds-space-x-2.ds-items-center'
+player_selector = '.ds-relative.ds-flex.ds-flex-row.ds-space-x-4.ds-p-3'
+
+parser = argparse.ArgumentParser(description='Scrape the squad of every country in the series')
+parser.add_argument('--url', default=base_url, help='Squads index of the series')
+parser.add_argument('--output-dir', default=os.path.dirname(csv_file_path), help='Folder for player_data.csv')
+parser.add_argument('--workers', type=int, default=4, help='Number of squad pages fetched in parallel')
+parser.add_argument('--http', action='store_true', help='Fetch pages with a plain HTTP client instead of browsers')
+parser.add_argument('--cache-dir', help='Page cache folder (default: page_cache in the output folder)')
+parser.add_argument('--no-cache', action='store_true', help='Always fetch pages from the site')
+parser.add_argument('--replay', action='store_true', help='Extract the squads from the page cache without a browser or network')
+parser.add_argument('--no-manifest', action='store_true', help='Scrape every squad again instead of only the new ones')
+add_arguments(parser)
+load_profile.add_arguments(parser)
+page_quarantine.add_arguments(parser)
+run_metrics.add_arguments(parser)
+args = parser.parse_args()
+configure_from_args(args)
+page_quarantine.configure_from_args(args, args.output_dir)
+run_metrics.configure_logging(args.verbose)
+csv_file_path = os.path.join(args.output_dir, 'player_data.csv')
+if args.cache_dir is None:
+    args.cache_dir = os.path.join(args.output_dir, 'page_cache')
+
+cache = None if args.no_cache and not args.replay else PageCache(args.cache_dir, ttl=squad_cache_ttl)
+
+# Initialize the Chrome WebDriver (only the squads index needs it)
+driver = None if args.replay or args.http else load_profile.create_driver(args.profile)
+
 # Create directory if it does not exist
 os.makedirs(os.path.dirname(csv_file_path), exist_ok=True)
 
-# Set to keep track of processed countries
-processed_countries = set()
+# Squads finished in earlier runs are recorded next to the CSV and skipped
+manifest = None if args.no_manifest else CrawlManifest(os.path.join(os.path.dirname(csv_file_path), 'crawl_manifest.jsonl'))
+if manifest:
+    manifest.repair_outputs()
 
-def get_player_info(player, label):
-    try:
-        # Find all divs with the specified class
-        info_divs = player.find_elements(By.CSS_SELECTOR, 'div.ds-flex.ds-items-center.ds-space-x-1, div.ds-flex.ds-items-start.ds-space-x-1')
-        for div in info_divs:
-            # Check if the div contains the label
-            if label in div.text:
-                # Return the text of the second span (which contains the value)
-                return div.find_elements(By.CSS_SELECTOR, 'span')[1].text.strip()
-        return "Not Available"
-    except Exception:
-        return "Not Available"
-
-# Retry Logic Function for Player Scraping
-def scrape_players(url, country_name, retries=3):
-    for attempt in range(retries):
+# Each squad is written with one fsync'd append
+csv_writer = MatchCSVWriter(csv_file_path, squad_header)
+
+# Keyed copy of the squads, so a rescraped squad replaces its rows
+store = open_store(os.path.dirname(csv_file_path))
+
+
+def load_index(url):
+    page_source = cache.get(url, allow_stale=args.replay) if cache else None
+    if page_source is not None:
+        return page_source
+    if args.replay:
+        raise KeyError(f"{url} is not in the page cache")
+
+    # Request spacing comes from the per-host rate limiter
+    rate_limiter.wait(url)
+    if driver is None:
+        page_source = fetch_page(url)
+    else:
+        driver.get(url)
+        wait = WebDriverWait(driver, 10)
+        wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, country_selector)))
+        page_source = driver.page_source
+    if cache:
+        cache.put(url, page_source)
+    return page_source
+
+
+def write_squad(url, players):
+    # Write the whole squad in one go
+    with metrics.timer('write'):
+        for player in players:
+            csv_writer.add(dict(zip(squad_header, player)))
+        committed = False
         try:
-            print(f"Going into URL: {url}")
-            driver.get(url)
-            wait = WebDriverWait(driver, 10)
-
-            # Find all player elements on the page
-            players = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, '.ds-relative.ds-flex.ds-flex-row.ds-space-x-4.ds-p-3')))
-            
-            if not players:
-                print(f"No players found for {country_name}.")
-                return False
-
-            # Open CSV file for writing player data
-            with open(csv_file_path, mode='a', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                if file.tell() == 0:
-                    writer.writerow(['Country', 'Name', 'Role', 'Age', 'Batting Type', 'Bowling Type', 'Image URL'])
-
-                for player in players:
-                    try:
-                        # Extract player details
-                        name = player.find_element(By.CSS_SELECTOR, 'span.ds-text-compact-s.ds-font-bold').text
-                        role = player.find_element(By.CSS_SELECTOR, 'p.ds-text-tight-s').text
-                        
-                        # Use the new function to get age, batting and bowling types
-                        age = get_player_info(player, 'Age:')
-                        batting_type = get_player_info(player, 'Batting:')
-                        bowling_type = get_player_info(player, 'Bowling:')
-                        
-                        image_url = player.find_element(By.CSS_SELECTOR, 'img').get_attribute('src')
-
-                        # Write player data to CSV
-                        writer.writerow([country_name, name, role, age, batting_type, bowling_type, image_url])
-
-                    except Exception as e:
-                        print(f"Error processing player: {e}")
-
-            print(f"Successfully scraped data for {country_name}")
-            return True  # Indicate successful scraping
+            metrics.count('rows_squad', csv_writer.commit())
+            committed = True
+            store.add_squad([dict(zip(squad_header, player)) for player in players])
+            # Last, so a squad is only marked done once every output has it
+            if manifest:
+                manifest.record(url, {'squad': commit_record(csv_writer)})
+        except Exception:
+            csv_writer.rollback()
+            if committed:
+                csv_writer.revert()
+            metrics.count('write_failures')
+            raise
 
-        except Exception as e:
-            print(f"Attempt {attempt + 1} failed: {e}")
-            if attempt < retries - 1:
-                time.sleep(5)  # Wait before retrying
-            else:
-                print(f"Max retries reached for {country_name}, moving to next country.")
-                return False  # Indicate failed scraping
 
 # Main Scraper Function for Country Links
 def scrape_country_data(base_url):
-    while True:
-        driver.get(base_url)
-        wait = WebDriverWait(driver, 10)
-
-        # Find all country elements on the page
-        countries = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, '.ds-flex.ds-flex-row.ds-space-x-2.ds-items-center')))
-
-        if not countries:
-            print("No more countries found. Exiting.")
-            break
-
-        found_new_country = False
-        for country in countries:
-            try:
-                country_name = country.find_element(By.TAG_NAME, 'img').get_attribute('alt')
-                
-                if country_name in processed_countries:
-                    continue  # Skip already processed countries
-                
-                found_new_country = True
-                squad_link = country.find_element(By.TAG_NAME, 'a').get_attribute('href')
-                squad_link_full = f"https://www.espncricinfo.com{squad_link}" if squad_link.startswith("/") else squad_link
-
-                print(f"Processing new country: {country_name}, Squad Link: {squad_link_full}")
-                
-                success = scrape_players(squad_link_full, country_name)
-                
-                if success:
-                    processed_countries.add(country_name)
-                    print(f"Added {country_name} to processed countries. Total processed: {len(processed_countries)}")
-                
-                time.sleep(2)  # Wait between countries
-                break  # Process one new country per iteration
-
-            except Exception as e:
-                print(f"Error scraping country data: {e}")
-                continue
-
-        if not found_new_country:
-            print("No new countries found. Exiting.")
-            break
-
-        time.sleep(5)  # Wait before checking for more countries
-
-# Start scraping from the base URL
-base_url = "https://www.espncricinfo.com/series/icc-men-s-t20-world-cup-2024-1411166/squads"
+    # Harvest every squad link from a single load of the squads index
+    countries = parse_squad_links(load_index(base_url), base_url)
+
+    if not countries:
+        log.warning("No countries found. Exiting.")
+        return
+
+    pending = [(country_name, url) for country_name, url in countries
+               if not (manifest and manifest.is_done(url, ['squad']))]
+    log.info(f"Found {len(countries)} countries, {len(pending)} still to scrape")
+
+    browser_fetcher = None
+    if args.replay:
+        fetcher = None
+    elif args.http:
+        fetcher = throttled(fetch_page)
+    else:
+        browser_fetcher = BrowserFetcher(wait_selector=player_selector, profile=args.profile)
+        fetcher = throttled(browser_fetcher)
+
+    def fetch_squad(country):
+        country_name, url = country
+        try:
+            page_source = cached_fetch(cache, fetcher, url, replay=args.replay, ttl=squad_cache_ttl)
+        except Exception as e:
+            return None, e
+        context = {'country': country_name}
+        try:
+            with metrics.timer('extract'):
+                players = parse_or_quarantine('squad', parse_squad, url, page_source, country_name, context=context)
+        except Exception as e:
+            metrics.count('parse_failures')
+            return None, e
+        if not players:
+            quarantine.capture('squad', url, page_source, 'no players', context)
+        return players, None
 
+    # Squad pages are fetched with bounded parallelism and written in index order
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            for (country_name, url), (players, error) in zip(pending, executor.map(fetch_squad, pending)):
+                if error is not None:
+                    metrics.count('squad_failures')
+                    log.error(f"Error scraping {country_name}: {error}")
+                    continue
+                if not players:
+                    metrics.count('parse_failures')
+                    log.warning(f"No players found for {country_name}.")
+                    continue
+                try:
+                    write_squad(url, players)
+                    log.info(f"Successfully scraped data for {country_name}")
+                except Exception as e:
+                    log.error(f"Error saving {country_name}: {e}")
+    finally:
+        if browser_fetcher:
+            browser_fetcher.close()
+
+    # Typed Parquet copy next to the CSV
+    write_parquet_outputs(os.path.dirname(csv_file_path), ['squad'])
+
+# Start scraping from the squads index
 try:
-    scrape_country_data(base_url)
+    scrape_country_data(args.url)
 finally:
-    driver.quit()
\ No newline at end of file
+    if driver:
+        driver.quit()
+        log.info(load_profile.load_report.summary())
+    store.close()
+    run_metrics.finish_run('player_data', args.metrics_dir or args.output_dir)
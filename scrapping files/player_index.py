@@ -0,0 +1,213 @@
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+
+from scorecard_parser import clean_text
+
+# Canonical player ids. The index is built from player_data.csv, persisted as
+# player_index.csv and only ever appended to, so an id never changes once given.
+# Scorecard names are resolved to ids through a memoized lookup on a normalized
+# key, which turns joins between batting, bowling and squad rows into integer joins
+
+index_header = ['player_id', 'country', 'name', 'key']
+alias_header = ['alias', 'country', 'name']
+
+# Squad pages and scorecards spell some countries differently
+team_aliases = {
+    'usa': 'unitedstatesofamerica',
+    'unitedstates': 'unitedstatesofamerica',
+    'png': 'papuanewguinea',
+}
+
+
+def name_key(name):
+    # 'Rahmanullah Gurbaz (wk)', '†Rahmanullah Gurbaz' and 'rahmanullah gurbaz' all match
+    return clean_text(name or '').lower()
+
+
+def team_key(team):
+    key = ''.join(character for character in (team or '').lower() if character.isalnum())
+    return team_aliases.get(key, key)
+
+
+def short_key(key):
+    # First initial and surname, for scorecards that abbreviate first names
+    parts = key.split()
+    return f"{parts[0][0]} {parts[-1]}" if len(parts) > 1 else key
+
+
+class PlayerIndex:
+    def __init__(self, index_file, alias_file=None, persist=True):
+        # With persist=False new players get ids for this run only and the
+        # index file is left untouched, for read-only analysis
+        self.index_file = index_file
+        self.persist = persist
+        self.alias_file = alias_file or os.path.join(os.path.dirname(index_file), 'player_aliases.csv')
+        self.players = {}      # player_id -> (country, name)
+        self.by_key = {}       # name key -> [player_id, ...]
+        self.by_short_key = {}
+        self.aliases = {}      # alias key -> [(team key, canonical name key), ...]
+        self.memo = {}
+        self.next_id = 1
+        self._load()
+
+    def _load(self):
+        if os.path.isfile(self.index_file):
+            with open(self.index_file, newline='', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    self._add(int(row['player_id']), row['country'], row['name'], row['key'])
+
+        if os.path.isfile(self.alias_file):
+            with open(self.alias_file, newline='', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    self.aliases.setdefault(name_key(row['alias']), []).append((team_key(row['country']), name_key(row['name'])))
+
+    def _add(self, player_id, country, name, key):
+        self.players[player_id] = (country, name)
+        self.by_key.setdefault(key, []).append(player_id)
+        self.by_short_key.setdefault(short_key(key), []).append(player_id)
+        self.next_id = max(self.next_id, player_id + 1)
+
+    def _append(self, player_id, country, name, key):
+        if self.persist:
+            new_file = not os.path.isfile(self.index_file) or os.path.getsize(self.index_file) == 0
+            with open(self.index_file, mode='a', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                if new_file:
+                    writer.writerow(index_header)
+                writer.writerow([player_id, country, name, key])
+        self._add(player_id, country, name, key)
+        self.memo = {}
+
+    def add_player(self, country, name):
+        key = name_key(name)
+        for player_id in self.by_key.get(key, []):
+            if team_key(self.players[player_id][0]) == team_key(country):
+                return player_id
+        player_id = self.next_id
+        self._append(player_id, country, name, key)
+        return player_id
+
+    def add_squads(self, squad_file):
+        # Give every squad player an id; players already indexed keep theirs
+        with open(squad_file, newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                self.add_player(row['Country'], row['Name'])
+
+    def _pick(self, player_ids, teams):
+        if teams:
+            player_ids = [player_id for player_id in player_ids if team_key(self.players[player_id][0]) in teams]
+        return player_ids[0] if len(player_ids) == 1 else None
+
+    def _lookup(self, key, teams):
+        # Exact name within the given teams, then a name unique in the whole index
+        candidates = self.by_key.get(key, [])
+        player_id = self._pick(candidates, teams) or self._pick(candidates, ())
+        if player_id:
+            return player_id
+
+        # Abbreviated first names only match inside the given teams
+        player_id = self._pick(self.by_short_key.get(short_key(key), []), teams)
+        if player_id:
+            return player_id
+
+        for alias_team, canonical_key in self.aliases.get(key, []):
+            if not teams or not alias_team or alias_team in teams:
+                player_id = self._pick(self.by_key.get(canonical_key, []), teams)
+                if player_id:
+                    return player_id
+        return None
+
+    def resolve(self, name, teams=(), create=False):
+        key = name_key(name)
+        teams = tuple(team_key(team) for team in teams if team)
+        memo_key = (key, teams)
+        # A remembered miss must not stop a later call from creating the player
+        if memo_key in self.memo and (self.memo[memo_key] is not None or not create):
+            return self.memo[memo_key]
+
+        player_id = self._lookup(key, teams)
+        if player_id is None and create and key:
+            # Players missing from the squad lists (late replacements) get an id of their own
+            player_id = self.next_id
+            self._append(player_id, teams[0] if teams else '', clean_text(name), key)
+
+        self.memo[memo_key] = player_id
+        return player_id
+
+
+def load_index(folder, persist=True):
+    # The index lives next to player_data.csv and is topped up from it on load
+    index = PlayerIndex(os.path.join(folder, 'player_index.csv'), persist=persist)
+    squad_file = os.path.join(folder, 'player_data.csv')
+    if os.path.isfile(squad_file):
+        index.add_squads(squad_file)
+    return index
+
+
+def opponents(rows):
+    # Bowling rows carry the batting side, so a bowler's team is the other team of that match
+    teams = {}
+    for row in rows:
+        teams.setdefault(row['match_id'], [])
+        if row['team'] not in teams[row['match_id']]:
+            teams[row['match_id']].append(row['team'])
+    return teams
+
+
+def add_player_ids(index, batting=(), bowling=(), match_teams=None):
+    for row in batting:
+        row['player_id'] = index.resolve(row['name'], [row['team']], create=True) or ''
+
+    match_teams = match_teams or opponents(list(batting) + list(bowling))
+    for row in bowling:
+        other_teams = [team for team in match_teams.get(row['match_id'], []) if team != row['team']]
+        row['player_id'] = index.resolve(row['name'], other_teams, create=True) or ''
+
+
+def annotate_csv(csv_file, rows, header):
+    # Rewrite through a temporary file so the CSV is never left half-written
+    fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(csv_file)), suffix='.tmp')
+    with os.fdopen(fd, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=header)
+        writer.writeheader()
+        writer.writerows(rows)
+    # mkstemp creates the file as 0600; keep the permissions of the CSV it replaces
+    shutil.copymode(csv_file, temp_file)
+    os.replace(temp_file, csv_file)
+
+
+def read_rows(csv_file):
+    with open(csv_file, newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        return reader.fieldnames, list(reader)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the player index and add player_id columns to existing CSVs')
+    parser.add_argument('folder', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csv files'))
+    args = parser.parse_args()
+
+    index = load_index(args.folder)
+    squad_ids = len(index.players)
+
+    outputs = {}
+    for name in ('batting_stats.csv', 'bowling_stats.csv'):
+        csv_file = os.path.join(args.folder, name)
+        if os.path.isfile(csv_file):
+            header, rows = read_rows(csv_file)
+            if 'player_id' not in header:
+                header = header + ['player_id']
+            outputs[csv_file] = (header, rows)
+
+    batting = outputs.get(os.path.join(args.folder, 'batting_stats.csv'), ([], []))[1]
+    bowling = outputs.get(os.path.join(args.folder, 'bowling_stats.csv'), ([], []))[1]
+    add_player_ids(index, batting, bowling)
+
+    for csv_file, (header, rows) in outputs.items():
+        annotate_csv(csv_file, rows, header)
+        print(f"Added player_id to {len(rows)} rows of {csv_file}")
+
+    print(f"{squad_ids} squad players indexed, {len(index.players) - squad_ids} more from scorecards only")
@@ -0,0 +1,223 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from commentary_parser import parse_deliveries
+from metrics import log, metrics
+from page_cache import url_key, write_atomic
+from scorecard_parser import parse_scorecard
+from squad_parser import parse_squad
+from summary_parser import parse_match_summaries
+
+# Snapshots of pages that failed to parse. The page source is stored
+# gzip-compressed under the hash of its content and a small JSON index entry
+# per URL records which extractor failed and why. Each URL is captured once,
+# identical pages share one file, and nothing more is captured once the
+# snapshots reach a size cap. Running this module re-parses the quarantined
+# pages with the current extractors, so a parser fix can be checked offline
+
+# Default data folder, next to the scripts
+folder_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csv files')
+
+default_max_mb = 100
+
+
+def failure_text(error):
+    return error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+
+
+class Quarantine:
+    # Captures nothing until a folder is configured
+    def __init__(self, folder=None, max_bytes=default_max_mb * 1024 * 1024):
+        self.lock = threading.Lock()
+        self.configure(folder, max_bytes)
+
+    def configure(self, folder, max_bytes=default_max_mb * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.used = self.stored_bytes()
+        self.full = False
+
+    def index_path(self, url):
+        return os.path.join(self.folder, 'index', f"{url_key(url)}.json")
+
+    def object_path(self, digest):
+        return os.path.join(self.folder, 'objects', digest[:2], f"{digest}.html.gz")
+
+    def stored_bytes(self):
+        total = 0
+        if self.folder:
+            for root, _, names in os.walk(os.path.join(self.folder, 'objects')):
+                total += sum(os.path.getsize(os.path.join(root, name)) for name in names)
+        return total
+
+    def capture(self, kind, url, page_source, error, context=None):
+        # kind names the extractor (see extractors below); context holds anything
+        # else it needs, such as the country of a squad page
+        if not self.folder or url is None or page_source is None:
+            return False
+        with self.lock:
+            index_path = self.index_path(url)
+            if os.path.exists(index_path):
+                metrics.count('quarantine_repeats')
+                return False
+
+            data = page_source.encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()
+            object_path = self.object_path(digest)
+            if os.path.exists(object_path):
+                metrics.count('quarantine_duplicates')
+            else:
+                body = gzip.compress(data)
+                if self.used + len(body) > self.max_bytes:
+                    metrics.count('quarantine_full')
+                    if not self.full:
+                        self.full = True
+                        log.warning(f"Quarantine at {self.folder} is full, no more failing pages are kept")
+                    return False
+                write_atomic(object_path, body)
+                self.used += len(body)
+
+            entry = {
+                'url': url,
+                'kind': kind,
+                'sha256': digest,
+                'error': failure_text(error),
+                'context': context or {},
+                'captured_at': time.time(),
+            }
+            write_atomic(index_path, json.dumps(entry).encode('utf-8'))
+        metrics.count('quarantined_pages')
+        log.warning(f"Quarantined {url} ({entry['error']})")
+        return True
+
+    def entries(self):
+        index_folder = os.path.join(self.folder, 'index')
+        if os.path.isdir(index_folder):
+            for name in sorted(os.listdir(index_folder)):
+                if name.endswith('.json'):
+                    with open(os.path.join(index_folder, name), encoding='utf-8') as file:
+                        yield json.load(file)
+
+    def page(self, entry):
+        with gzip.open(self.object_path(entry['sha256']), 'rb') as file:
+            return file.read().decode('utf-8')
+
+    def release(self, entry):
+        # Forget a URL; its page goes too unless another URL has the same page
+        with self.lock:
+            os.unlink(self.index_path(entry['url']))
+            if not any(other['sha256'] == entry['sha256'] for other in self.entries()):
+                object_path = self.object_path(entry['sha256'])
+                self.used -= os.path.getsize(object_path)
+                os.unlink(object_path)
+
+
+# One quarantine for the whole process, like the rate limiter
+quarantine = Quarantine()
+
+
+def parse_or_quarantine(kind, parse, url, page_source, *args, context=None):
+    # parse(page_source, *args), keeping the page when the extractor raises
+    try:
+        return parse(page_source, *args)
+    except Exception as e:
+        quarantine.capture(kind, url, page_source, e, context)
+        raise
+
+
+def add_arguments(parser):
+    parser.add_argument('--quarantine-dir', help='Folder for pages that failed to parse (default: quarantine in the output folder)')
+    parser.add_argument('--quarantine-max-mb', type=float, default=default_max_mb, help='Size cap of the quarantined pages')
+    parser.add_argument('--no-quarantine', action='store_true', help='Do not keep pages that failed to parse')
+
+
+def configure_from_args(args, default_folder):
+    if not args.no_quarantine:
+        quarantine.configure(args.quarantine_dir or os.path.join(default_folder, 'quarantine'),
+                             int(args.quarantine_max_mb * 1024 * 1024))
+
+
+def scorecard_problem(scorecard):
+    # Parsers mostly fail quietly: an innings found without its batting rows
+    # means the table markup has moved. Scorecards without any innings are left
+    # alone, matches that were abandoned or have not started have none
+    empty = [innings['team'] for innings in scorecard['innings'] if not innings['batting']]
+    return f"no batting rows for {', '.join(empty)}" if empty else None
+
+
+def reparse_scorecard(page_source, context):
+    scorecard = parse_scorecard(page_source)
+    problem = scorecard_problem(scorecard) or (None if scorecard['innings'] else 'no innings')
+    if problem:
+        raise ValueError(problem)
+    return sum(len(innings['batting']) + len(innings['bowling']) for innings in scorecard['innings'])
+
+
+def reparse_commentary(page_source, context):
+    count = sum(1 for _ in parse_deliveries(page_source))
+    if not count:
+        raise ValueError('no deliveries')
+    return count
+
+
+def reparse_squad(page_source, context):
+    players = parse_squad(page_source, context.get('country', ''))
+    if not players:
+        raise ValueError('no players')
+    return len(players)
+
+
+def reparse_match_list(page_source, context):
+    matches = parse_match_summaries(page_source)
+    failed = sum(1 for match in matches if match[0] == 'NA')
+    if not matches or failed:
+        raise ValueError(f"{failed} of {len(matches)} matches failed to parse")
+    return len(matches)
+
+
+# Extractor for each kind of quarantined page; each returns the number of rows
+# it found and raises when the page still does not parse
+extractors = {
+    'scorecard': reparse_scorecard,
+    'commentary': reparse_commentary,
+    'squad': reparse_squad,
+    'match_list': reparse_match_list,
+}
+
+
+def reparse(folder, kinds=None, release=False):
+    # Returns (fixed, still failing)
+    store = Quarantine(folder)
+    fixed, failing = 0, 0
+    for entry in store.entries():
+        if kinds and entry['kind'] not in kinds:
+            continue
+        try:
+            rows = extractors[entry['kind']](store.page(entry), entry['context'])
+        except Exception as e:
+            failing += 1
+            print(f"FAIL  {entry['kind']:<10} {entry['url']}: {failure_text(e)} (was: {entry['error']})")
+            continue
+        fixed += 1
+        print(f"OK    {entry['kind']:<10} {entry['url']}: {rows} rows (was: {entry['error']})")
+        if release:
+            store.release(entry)
+    return fixed, failing
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Re-run the extractors over quarantined pages, without a browser or network')
+    parser.add_argument('folder', nargs='?', default=os.path.join(folder_path, 'quarantine'))
+    parser.add_argument('--kind', action='append', choices=sorted(extractors), help='Only re-parse pages of this kind')
+    parser.add_argument('--release', action='store_true', help='Drop the pages that parse now')
+    args = parser.parse_args()
+
+    fixed, failing = reparse(args.folder, args.kind, args.release)
+    store = Quarantine(args.folder)
+    print(f"{fixed} pages parse now, {failing} still fail ({store.used / 1024:.0f} KiB quarantined)")
+    raise SystemExit(1 if failing else 0)
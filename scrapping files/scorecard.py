@@ -0,0 +1,463 @@
+import argparse
+import hashlib
+import os
+import re
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from columnar import write_parquet_outputs
+from crawl_manifest import CrawlManifest, commit_record
+from csv_sink import MatchCSVWriter
+from http_fetch import fetch_page
+import load_profile
+from aggregates import open_aggregates
+from match_store import open_store, series_slug
+from player_index import add_player_ids, load_index
+from page_cache import PageCache, cached_fetch
+import quarantine as page_quarantine
+from quarantine import parse_or_quarantine, quarantine, scorecard_problem
+from scorecard_parser import batting_rows, bowling_rows, match_row, parse_match_links, parse_scorecard
+from metrics import log, metrics
+import metrics as run_metrics
+from tab_pool import WorkerTab
+from throttle import add_arguments, configure_from_args, fetch_with_retries, rate_limiter, throttled
+
+# Single-pass scorecard crawler: every match page is loaded once and its batting
+# rows, bowling rows and match metadata are all taken from the same page source
+
+# Base URL
+base_url = 'https://www.espncricinfo.com/series/icc-men-s-t20-world-cup-2024-1411166/match-schedule-fixtures-and-results'
+
+# Folder path for saving CSV
+folder_path = r'C:\Users\DEEPAK\Downloads\match data'
+
+# CSV file name and header for each output
+outputs = {
+    'batting': ('batting_stats.csv',
+                ['match_id', 'match', 'team', 'bat_pos', 'name', 'not_out', 'runs', 'balls', 'minutes', 'fours', 'sixes', 'strike_rate', 'player_id']),
+    'bowling': ('bowling_stats.csv',
+                ['match_id', 'match', 'team', 'name', 'overs', 'maidens', 'runs', 'wickets', 'economy', 'dots', 'fours', 'sixes', 'wides', 'no_balls', 'player_id']),
+    'matches': ('match_data.csv',
+                ['match_id', 'match', 'title', 'team_1', 'team_2', 'url']),
+}
+
+all_kinds = ('batting', 'bowling', 'matches')
+
+show_more_selector = 'button.ds-button.ds-text-center.ds-uppercase.ds-font-bold.ds-border-none.ds-bg-fill-primary'
+title_selector = 'h1.ds-text-title-xs.ds-font-bold'
+match_div_selector = 'div.ds-p-4.hover\\:ds-bg-ui-fill-translucent'
+
+
+def create_driver(headless=None, profile=None):
+    # Headless, eager loading and request blocking come from the shared load profile
+    return load_profile.create_driver(profile, headless)
+
+
+def wait_for_element(driver, selector, timeout=10):
+    return WebDriverWait(driver, timeout).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+    )
+
+
+def open_writers(kinds, folder=None):
+    folder = folder or folder_path
+    try:
+        return {kind: MatchCSVWriter(os.path.join(folder, outputs[kind][0]), outputs[kind][1]) for kind in kinds}
+    except ValueError as e:
+        # CSVs from before the player index lack the player_id column
+        raise ValueError(f"{e}. Run 'python player_index.py \"{folder}\"' to add the player_id column") from None
+
+
+def open_manifest(folder=None):
+    # The manifest lives next to the CSVs it describes
+    manifest = CrawlManifest(os.path.join(folder or folder_path, 'crawl_manifest.jsonl'))
+    manifest.repair_outputs()
+    return manifest
+
+
+def parse_page(page_source, url=None):
+    # Pages that fail to parse are kept in the quarantine, see quarantine.py
+    with metrics.timer('extract'):
+        try:
+            scorecard = parse_or_quarantine('scorecard', parse_scorecard, url, page_source)
+        except Exception:
+            metrics.count('parse_failures')
+            raise
+    problem = scorecard_problem(scorecard)
+    if problem:
+        metrics.count('parse_failures')
+        log.warning(f"{scorecard['match_name']}: {problem}")
+        quarantine.capture('scorecard', url, page_source, problem)
+    return scorecard
+
+
+def match_id_from_url(match_url):
+    # ESPN match URLs end their match slug with the object id, e.g.
+    # .../canada-vs-united-states-of-america-1st-match-group-a-1415701/full-scorecard
+    for segment in reversed(urlparse(match_url).path.strip('/').split('/')):
+        object_id = re.search(r'-(\d+)$', segment)
+        if object_id:
+            return object_id.group(1)
+
+    # Fall back to a stable hash of the URL so the id never depends on visit order.
+    # Kept to 31 bits, the columnar outputs store match ids as int32
+    return str(int(hashlib.sha1(match_url.encode('utf-8')).hexdigest()[:8], 16) & 0x7fffffff)
+
+
+def match_rows(scorecard, match_url, index=None):
+    match_id = match_id_from_url(match_url)
+    rows = {
+        'batting': batting_rows(scorecard, match_id),
+        'bowling': bowling_rows(scorecard, match_id),
+        'matches': [match_row(scorecard, match_id, match_url)],
+    }
+    if index:
+        teams = [innings['team'] for innings in scorecard['innings']]
+        add_player_ids(index, rows['batting'], rows['bowling'], {match_id: teams})
+    return rows
+
+
+def write_match(writers, scorecard, match_url, manifest=None, index=None, aggregates=None, store=None):
+    if manifest:
+        # Matches still in progress are left for a later run, otherwise they
+        # would be recorded as finished with a partial scorecard
+        if not scorecard['completed']:
+            log.info(f"Skipping {scorecard['match_name']} until it has a result")
+            metrics.count('matches_incomplete')
+            return
+        writers = {kind: writers[kind] for kind in manifest.pending_kinds(match_url, writers)}
+
+    rows_by_kind = match_rows(scorecard, match_url, index)
+    committed = []
+    try:
+        for kind, rows in rows_by_kind.items():
+            if kind in writers:
+                for row in rows:
+                    writers[kind].add(row)
+
+        # Write every output of this match in one go
+        with metrics.timer('write'):
+            for kind, writer in writers.items():
+                count = writer.commit()
+                committed.append(writer)
+                metrics.count(f"rows_{kind}", count)
+                log.info(f"Saved {count} {kind} rows for {scorecard['match_name']}")
+
+            if aggregates:
+                # Running totals only change for the players of this match
+                teams = [innings['team'] for innings in scorecard['innings']]
+                aggregates.add_match(match_id_from_url(match_url), teams,
+                                     rows_by_kind['batting'] if 'batting' in writers else (),
+                                     rows_by_kind['bowling'] if 'bowling' in writers else ())
+
+            if store:
+                # Keyed copy of the match; a rerun replaces its rows instead of adding more
+                teams = [innings['team'] for innings in scorecard['innings']]
+                store.add_match(series_slug(match_url), match_id_from_url(match_url), teams,
+                                rows_by_kind['batting'] if 'batting' in writers else (),
+                                rows_by_kind['bowling'] if 'bowling' in writers else (),
+                                rows_by_kind['matches'][0] if 'matches' in writers else None,
+                                replace=[kind for kind in ('batting', 'bowling') if kind in writers])
+
+            if manifest:
+                # Last, so a match is only marked done once every output has it
+                manifest.record(match_url, {kind: commit_record(writer) for kind, writer in writers.items()})
+    except Exception:
+        # Nothing of the match is kept unless the manifest has it
+        for writer in writers.values():
+            writer.rollback()
+        for writer in committed:
+            writer.revert()
+        metrics.count('write_failures')
+        raise
+    metrics.count('matches_written')
+
+
+def load_fixtures_page(driver, url=None):
+    url = url or base_url
+    rate_limiter.wait(url)
+    driver.get(url)
+
+    # Wait for the first match to render instead of a fixed delay
+    try:
+        wait_for_element(driver, match_div_selector)
+    except TimeoutException:
+        metrics.count('timeouts')
+        log.warning("No matches rendered on the fixtures page.")
+
+
+def scrape_match(tab, match_url, writers, cache=None, manifest=None, index=None, aggregates=None, store=None):
+    page_source = cache.get(match_url) if cache else None
+    if page_source is not None:
+        metrics.count('cache_hits')
+        scorecard = parse_page(page_source, match_url)
+    else:
+        # The match page is loaded in the long-lived worker tab, leaving the
+        # fixtures list untouched in the main window
+        page_source = fetch_with_retries(lambda url: tab.load(url, title_selector), match_url)
+        scorecard = parse_page(page_source, match_url)
+        if cache:
+            cache.put(match_url, page_source, pinned=scorecard['completed'])
+
+    log.info(f"Match Title: {scorecard['title']}")
+    write_match(writers, scorecard, match_url, manifest, index, aggregates, store)
+
+
+def scrape_matches(driver, kinds=all_kinds, folder=None, cache=None, manifest=None):
+    writers = open_writers(kinds, folder)
+    index = load_index(folder or folder_path)
+    aggregates = open_aggregates(folder or folder_path)
+    store = open_store(folder or folder_path)
+
+    load_fixtures_page(driver)
+    tab = WorkerTab(driver)
+
+    match_links_scraped = set()
+
+    while True:
+        # Get current match links on the page
+        match_urls = parse_match_links(driver.page_source, base_url)
+
+        if not match_urls:
+            log.info("No more matches found. Exiting.")
+            break
+
+        for match_url in match_urls:
+            if match_url in match_links_scraped:
+                continue
+
+            match_links_scraped.add(match_url)
+            if manifest and manifest.is_done(match_url, kinds):
+                continue  # Finished in an earlier run
+
+            log.info(f"Navigating to match URL: {match_url}")
+
+            try:
+                scrape_match(tab, match_url, writers, cache, manifest, index, aggregates, store)
+            except Exception as e:
+                metrics.count('match_failures')
+                log.error(f"Error scraping match {match_url}: {str(e)}")
+                log.debug(traceback.format_exc())
+                continue
+
+        if not click_show_more(driver):
+            break
+
+    tab.close()
+
+    # Keep the fully expanded fixtures list for replay runs
+    if cache:
+        cache.put(base_url, driver.page_source)
+
+    aggregates.close()
+    store.close()
+    write_parquet_outputs(folder or folder_path, kinds)
+
+    log.info(f"Scraping completed. Data should be saved to {folder or folder_path}")
+
+
+def click_show_more(driver, timeout=10, url=None):
+    # Check if there's a "Show More" button and click it
+    buttons = driver.find_elements(By.CSS_SELECTOR, show_more_selector)
+    if not buttons:
+        log.info("No more 'Show More' button found. Exiting.")
+        return False
+
+    try:
+        match_count = len(driver.find_elements(By.CSS_SELECTOR, match_div_selector))
+        rate_limiter.wait(url or base_url)
+        driver.execute_script("arguments[0].click();", buttons[0])
+
+        # Wait until the new matches are in the DOM rather than for a fixed delay
+        WebDriverWait(driver, timeout).until(
+            lambda d: len(d.find_elements(By.CSS_SELECTOR, match_div_selector)) > match_count
+        )
+        return True
+    except TimeoutException:
+        metrics.count('timeouts')
+        log.warning("'Show More' did not load any more matches. Exiting.")
+        return False
+    except Exception as e:
+        log.error(f"Error clicking 'Show More' button: {str(e)}")
+        log.debug(traceback.format_exc())
+        return False
+
+
+def collect_match_links(driver, cache=None, url=None):
+    # Expand the whole fixtures list first so the match pages can be shared out
+    url = url or base_url
+    load_fixtures_page(driver, url)
+    while click_show_more(driver, url=url):
+        pass
+    page_source = driver.page_source
+    if cache:
+        cache.put(url, page_source)
+    return parse_match_links(page_source, url)
+
+
+class BrowserFetcher:
+    # One headless browser per worker thread, created on first use. Each browser
+    # loads its pages in a long-lived worker tab, and a browser that has died
+    # altogether is replaced on the next page
+    def __init__(self, headless=True, wait_selector=title_selector, profile=None, prepare=None):
+        # prepare(driver) runs once wait_selector is present, before the page source is read
+        self.headless = headless
+        self.profile = profile
+        self.wait_selector = wait_selector
+        self.prepare = prepare
+        self.local = threading.local()
+        self.drivers = []
+        self.lock = threading.Lock()
+
+    def _worker_tab(self):
+        tab = getattr(self.local, 'tab', None)
+        if tab is None:
+            driver = create_driver(headless=self.headless, profile=self.profile)
+            tab = WorkerTab(driver)
+            self.local.tab = tab
+            with self.lock:
+                self.drivers.append(driver)
+        return tab
+
+    def _replace_browser(self, tab):
+        with self.lock:
+            if tab.driver in self.drivers:
+                self.drivers.remove(tab.driver)
+        try:
+            tab.driver.quit()
+        except WebDriverException:
+            pass
+        self.local.tab = None
+
+    def __call__(self, url):
+        tab = self._worker_tab()
+        try:
+            return tab.load(url, self.wait_selector, prepare=self.prepare)
+        except WebDriverException:
+            try:
+                tab.driver.window_handles
+            except WebDriverException:
+                metrics.count('browser_restarts')
+                log.warning(f"Browser died while loading {url}, starting a new one")
+                self._replace_browser(tab)
+            raise
+
+    def close(self):
+        for driver in self.drivers:
+            driver.quit()
+        self.drivers = []
+
+
+def scrape_matches_concurrent(match_urls, fetch, workers=4, kinds=all_kinds, folder=None, manifest=None):
+    writers = open_writers(kinds, folder)
+    index = load_index(folder or folder_path)
+    aggregates = open_aggregates(folder or folder_path)
+    store = open_store(folder or folder_path)
+
+    if manifest:
+        # Only fetch matches that were not finished in an earlier run
+        match_urls = [match_url for match_url in match_urls if not manifest.is_done(match_url, kinds)]
+
+    def fetch_and_parse(match_url):
+        try:
+            return match_url, parse_page(fetch(match_url), match_url), None
+        except Exception as e:
+            return match_url, None, e
+
+    # Pages are fetched in parallel, but results come back in fixture order so the
+    # CSVs are identical whatever order the workers finish in
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for match_url, scorecard, error in executor.map(fetch_and_parse, match_urls):
+            if error is not None:
+                metrics.count('match_failures')
+                log.error(f"Error scraping match {match_url}: {str(error)}")
+                continue
+            try:
+                write_match(writers, scorecard, match_url, manifest, index, aggregates, store)
+            except Exception as e:
+                metrics.count('match_failures')
+                log.error(f"Error saving match {match_url}: {str(e)}")
+                log.debug(traceback.format_exc())
+
+    aggregates.close()
+    store.close()
+    write_parquet_outputs(folder or folder_path, kinds)
+
+
+def replay_matches(cache, kinds=all_kinds, folder=None, manifest=None):
+    # Run the whole extraction from cached pages only, without a browser or network
+    fixtures_page = cache.get(base_url, allow_stale=True)
+    if fixtures_page is None:
+        log.error(f"The fixtures page is not in the page cache at {cache.folder}")
+        return
+
+    match_urls = parse_match_links(fixtures_page, base_url)
+    log.info(f"Replaying {len(match_urls)} matches from {cache.folder}")
+    fetch = lambda match_url: cached_fetch(cache, None, match_url, replay=True)
+    scrape_matches_concurrent(match_urls, fetch, workers=1, kinds=kinds, folder=folder, manifest=manifest)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scrape batting, bowling and match data from every scorecard')
+    parser.add_argument('--url', default=base_url, help='Fixtures and results page of the series')
+    parser.add_argument('--workers', type=int, default=1, help='Number of match pages fetched in parallel')
+    parser.add_argument('--http', action='store_true', help='Fetch match pages with a plain HTTP client instead of browsers')
+    parser.add_argument('--output-dir', default=folder_path)
+    parser.add_argument('--cache-dir', default=os.path.join(folder_path, 'page_cache'))
+    parser.add_argument('--no-cache', action='store_true', help='Always fetch pages from the site')
+    parser.add_argument('--replay', action='store_true', help='Extract everything from the page cache without a browser or network')
+    parser.add_argument('--no-manifest', action='store_true', help='Scrape every match again instead of only the new ones')
+    parser.add_argument('--commentary', action='store_true', help='Also store the ball-by-ball deliveries of every match, see commentary.py')
+    add_arguments(parser)
+    load_profile.add_arguments(parser)
+    page_quarantine.add_arguments(parser)
+    run_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    page_quarantine.configure_from_args(args, args.output_dir)
+    run_metrics.configure_logging(args.verbose)
+    base_url = args.url
+
+    cache = None if args.no_cache else PageCache(args.cache_dir)
+    manifest = None if args.no_manifest else open_manifest(args.output_dir)
+
+    if args.replay:
+        replay_matches(PageCache(args.cache_dir), folder=args.output_dir, manifest=manifest)
+    else:
+        driver = create_driver(profile=args.profile)
+        try:
+            if args.workers <= 1 and not args.http:
+                scrape_matches(driver, folder=args.output_dir, cache=cache, manifest=manifest)
+            else:
+                match_urls = collect_match_links(driver, cache)
+                log.info(f"Found {len(match_urls)} matches")
+                fetcher = fetch_page if args.http else BrowserFetcher(profile=args.profile)
+                fetch_politely = throttled(fetcher)
+                fetch = lambda match_url: cached_fetch(cache, fetch_politely, match_url, pin_completed=True)
+                try:
+                    scrape_matches_concurrent(match_urls, fetch, workers=args.workers, folder=args.output_dir, manifest=manifest)
+                finally:
+                    if not args.http:
+                        fetcher.close()
+
+            if args.commentary:
+                from commentary import commentary_selector, load_older_overs, match_urls_from, scrape_commentary
+                fetcher = fetch_page if args.http else BrowserFetcher(wait_selector=commentary_selector, profile=args.profile,
+                                                                      prepare=load_older_overs)
+                fetch_politely = throttled(fetcher)
+                fetch = lambda url: cached_fetch(cache, fetch_politely, url, pin_completed=True)
+                try:
+                    scrape_commentary(match_urls_from(args.output_dir), fetch, max(args.workers, 1), args.output_dir, manifest)
+                finally:
+                    if not args.http:
+                        fetcher.close()
+        finally:
+            driver.quit()
+        log.info(load_profile.load_report.summary())
+
+    run_metrics.finish_run('scorecard', args.metrics_dir or args.output_dir)
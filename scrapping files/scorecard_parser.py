@@ -0,0 +1,196 @@
+import re
+import unicodedata
+from urllib.parse import urljoin
+
+from lxml import html as lxml_html
+
+# Offline scorecard extraction: everything here works on the page source of an
+# ESPNcricinfo full scorecard, so it needs no browser and can run on saved pages
+
+batting_columns = ['runs', 'balls', 'minutes', 'fours', 'sixes', 'strike_rate']
+bowling_columns = ['overs', 'maidens', 'runs', 'wickets', 'economy', 'dots', 'fours', 'sixes', 'wides', 'no_balls']
+
+
+def clean_text(text):
+    # Remove content within parentheses
+    text = re.sub(r'\s*\([^)]*\)', '', text)
+
+    # Remove the wicketkeeper/substitute markers from the beginning of the text
+    text = re.sub(r'^[†+]\s*', '', text)
+
+    # Remove or replace non-ASCII characters
+    text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
+
+    # Remove any remaining non-alphanumeric characters (except spaces)
+    text = re.sub(r'[^\w\s]', '', text)
+
+    # Remove extra whitespace
+    text = ' '.join(text.split())
+
+    return text.strip()
+
+
+def has_classes(*classes):
+    # XPath equivalent of a CSS compound class selector such as '.a.b'
+    return ' and '.join(f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')" for name in classes)
+
+
+site_url = 'https://www.espncricinfo.com'
+
+title_xpath = f"//h1[{has_classes('ds-text-title-xs', 'ds-font-bold')}]"
+innings_xpath = f"//div[{has_classes('ds-rounded-lg', 'ds-mt-2')}]"
+team_xpath = f".//span[{has_classes('ds-text-title-xs', 'ds-font-bold', 'ds-capitalize')}]"
+batting_table_xpath = f".//table[{has_classes('ci-scorecard-table')}]"
+bowling_tables_xpath = f".//table[{has_classes('ds-w-full', 'ds-table', 'ds-table-md', 'ds-table-auto')}]"
+match_link_xpath = f"//div[{has_classes('ds-p-4', 'hover:ds-bg-ui-fill-translucent')}]"
+# The status line under the match title: 'Live', 'Stumps', 'Innings break', or the result
+status_xpath = f"({title_xpath}/following::p[{has_classes('ds-text-tight-s', 'ds-font-medium', 'ds-truncate', 'ds-text-typo')}])[1]"
+
+completed_pattern = re.compile(r'\b(won by|match tied|no result|abandoned|match drawn)\b', re.IGNORECASE)
+
+
+def element_text(element):
+    return ' '.join(element.text_content().split())
+
+
+def parse_batting_table(table):
+    rows = []
+    bat_pos = 1
+    for row in table.iter('tr'):
+        columns = row.findall('td')
+        if len(columns) < 8:
+            continue  # Skip rows that don't have enough columns
+
+        values = [element_text(column) for column in columns]
+        batting_data = {
+            'bat_pos': bat_pos,
+            'name': clean_text(values[0]),
+            'not_out': 'Not Out' if 'not out' in values[1].lower() else 'Out',
+        }
+        batting_data.update(zip(batting_columns, values[2:8]))
+        rows.append(batting_data)
+        bat_pos += 1
+    return rows
+
+
+def find_bowling_table(innings):
+    for table in innings.xpath(bowling_tables_xpath):
+        # The bowling table is the one whose first column header is "Bowling"
+        first_header = table.xpath('./thead//th[1]')
+        if first_header and element_text(first_header[0]) == 'Bowling':
+            return table
+    return None
+
+
+def parse_bowling_table(table):
+    rows = []
+    for row in table.xpath('./tbody/tr'):
+        columns = row.findall('td')
+        if len(columns) < 11:
+            continue  # Skip rows that don't have enough columns
+
+        values = [element_text(column) for column in columns]
+        bowling_data = {'name': clean_text(values[0])}
+        bowling_data.update(zip(bowling_columns, values[1:11]))
+        rows.append(bowling_data)
+    return rows
+
+
+def match_status(document):
+    elements = document.xpath(status_xpath)
+    return element_text(elements[0]) if elements else ''
+
+
+def is_completed_status(status):
+    # Result strings only appear in the status once a match is over
+    return completed_pattern.search(status) is not None
+
+
+def is_completed_match(page_source):
+    # Only the status line counts: results elsewhere on the page (other matches
+    # in a sidebar, commentary text, scripts) say nothing about this match
+    return is_completed_status(match_status(lxml_html.fromstring(page_source)))
+
+
+def is_live(match_div):
+    # Matches in progress carry a 'Live' badge on the fixtures page
+    return any(element_text(span).lower() == 'live' for span in match_div.iter('span'))
+
+
+def parse_match_links(page_source, base=site_url, live_only=False):
+    # Match URLs from the fixtures page, in page order and without repeats
+    document = lxml_html.fromstring(page_source)
+    links = []
+    for match_div in document.xpath(match_link_xpath):
+        anchors = match_div.xpath('.//a[@href]')
+        if not anchors or (live_only and not is_live(match_div)):
+            continue
+        match_url = urljoin(base, anchors[0].get('href'))
+        if match_url not in links:
+            links.append(match_url)
+    return links
+
+
+def parse_scorecard(page_source):
+    document = lxml_html.fromstring(page_source)
+
+    title_elements = document.xpath(title_xpath)
+    title = element_text(title_elements[0]) if title_elements else ''
+    status = match_status(document)
+
+    innings_list = []
+    for innings in document.xpath(innings_xpath):
+        team_elements = innings.xpath(team_xpath)
+        if not team_elements:
+            continue
+
+        batting_tables = innings.xpath(batting_table_xpath)
+        bowling_table = find_bowling_table(innings)
+        innings_list.append({
+            'team': clean_text(element_text(team_elements[0])),
+            'batting': parse_batting_table(batting_tables[0]) if batting_tables else [],
+            'bowling': parse_bowling_table(bowling_table) if bowling_table is not None else [],
+        })
+
+    return {
+        'title': title,
+        'match_name': clean_text(title.split(',')[0]),
+        'innings': innings_list,
+        'status': status,
+        'completed': is_completed_status(status),
+    }
+
+
+# One row of match metadata for a parsed scorecard
+def match_row(scorecard, match_id, match_url):
+    teams = [innings['team'] for innings in scorecard['innings']]
+    return {
+        'match_id': match_id,
+        'match': scorecard['match_name'],
+        'title': scorecard['title'],
+        'team_1': teams[0] if len(teams) > 0 else '',
+        'team_2': teams[1] if len(teams) > 1 else '',
+        'url': match_url,
+    }
+
+
+# Flatten a parsed scorecard into the rows written to batting_stats.csv
+def batting_rows(scorecard, match_id):
+    rows = []
+    for innings in scorecard['innings']:
+        for batting_data in innings['batting']:
+            row = {'match_id': match_id, 'match': scorecard['match_name'], 'team': innings['team']}
+            row.update(batting_data)
+            rows.append(row)
+    return rows
+
+
+# Flatten a parsed scorecard into the rows written to bowling_stats.csv
+def bowling_rows(scorecard, match_id):
+    rows = []
+    for innings in scorecard['innings']:
+        for bowling_data in innings['bowling']:
+            row = {'match_id': match_id, 'match': scorecard['match_name'], 'team': innings['team']}
+            row.update(bowling_data)
+            rows.append(row)
+    return rows
@@ -0,0 +1,235 @@
+import argparse
+import os
+import sqlite3
+import time
+
+from aggregates import print_top
+from match_store import MatchStore
+
+# Read side of the keyed match store for selection questions. Views add the
+# derived columns every question needs (batting position group, the bowler's own
+# team), and per-player summaries are precomputed into indexed tables. Triggers
+# on the store mark the summaries stale whenever a match or squad is written, so
+# they are rebuilt once on the next query instead of on every query
+
+position_groups = [
+    # (group, first position, last position)
+    ('openers', 1, 2),
+    ('top order', 3, 4),
+    ('middle order', 5, 7),
+    ('lower order', 8, 11),
+]
+
+position_case = 'CASE ' + ' '.join(
+    f"WHEN bat_pos BETWEEN {first} AND {last} THEN '{group}'" for group, first, last in position_groups) + ' END'
+
+views = {
+    'batting_innings': f"""
+        SELECT *, {position_case} AS position, COALESCE(player_id, name) AS player_key
+        FROM batting""",
+    'bowling_innings': """
+        SELECT bowling.*, COALESCE(player_id, name) AS player_key,
+               COALESCE(
+                   (SELECT other.team FROM batting AS other
+                    WHERE other.series = bowling.series AND other.match_id = bowling.match_id AND other.team != bowling.team
+                    LIMIT 1),
+                   REPLACE(REPLACE(bowling.match, bowling.team || ' vs ', ''), ' vs ' || bowling.team, '')
+               ) AS bowling_team
+        FROM bowling""",
+}
+
+batting_columns = """
+    COUNT(*) AS innings, SUM(not_out) AS not_outs, SUM(runs) AS runs, SUM(balls) AS balls,
+    SUM(fours) AS fours, SUM(sixes) AS sixes, MAX(runs) AS highest,
+    ROUND(1.0 * SUM(runs) / NULLIF(COUNT(*) - SUM(not_out), 0), 2) AS average,
+    ROUND(100.0 * SUM(runs) / NULLIF(SUM(balls), 0), 2) AS strike_rate,
+    ROUND(100.0 * (SUM(fours) + SUM(sixes)) / NULLIF(SUM(balls), 0), 2) AS boundary_pct"""
+
+# Precomputed table: (query, indexed columns)
+summaries = {
+    'batting_summary': (f"""
+        SELECT player_key, MAX(player_id) AS player_id, MAX(name) AS name, MAX(team) AS team, {batting_columns}
+        FROM batting_innings GROUP BY player_key""", [['player_id'], ['team'], ['balls', 'strike_rate']]),
+    'batting_by_position': (f"""
+        SELECT player_key, position, MAX(player_id) AS player_id, MAX(name) AS name, MAX(team) AS team, {batting_columns}
+        FROM batting_innings GROUP BY player_key, position""", [['position', 'balls', 'strike_rate'], ['player_id']]),
+    'bowling_summary': ("""
+        SELECT player_key, MAX(player_id) AS player_id, MAX(name) AS name, MAX(bowling_team) AS team,
+               COUNT(*) AS innings, SUM(balls) AS balls, SUM(maidens) AS maidens, SUM(runs) AS runs,
+               SUM(wickets) AS wickets, SUM(dots) AS dots, SUM(fours) AS fours, SUM(sixes) AS sixes,
+               SUM(wides) AS wides, SUM(no_balls) AS no_balls,
+               (SUM(balls) / 6) || '.' || (SUM(balls) % 6) AS overs,
+               ROUND(6.0 * SUM(runs) / NULLIF(SUM(balls), 0), 2) AS economy,
+               ROUND(1.0 * SUM(runs) / NULLIF(SUM(wickets), 0), 2) AS average,
+               ROUND(1.0 * SUM(balls) / NULLIF(SUM(wickets), 0), 2) AS strike_rate,
+               ROUND(100.0 * SUM(dots) / NULLIF(SUM(balls), 0), 2) AS dot_pct
+        FROM bowling_innings GROUP BY player_key""", [['player_id'], ['team'], ['balls', 'economy']]),
+    'team_batting': (f"""
+        SELECT team, COUNT(DISTINCT series || '/' || match_id) AS matches, {batting_columns}
+        FROM batting_innings GROUP BY team""", []),
+}
+
+watched_tables = ('batting', 'bowling', 'matches', 'squads')
+
+
+class SelectionQueries:
+    def __init__(self, path):
+        # Opening the store creates its tables, so the views always have something to read
+        MatchStore(path).close()
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self.connection:
+            for view, query in views.items():
+                self.connection.execute(f"CREATE VIEW IF NOT EXISTS {view} AS {query}")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS query_state (id INTEGER PRIMARY KEY CHECK (id = 1), stale INTEGER)")
+            self.connection.execute("INSERT OR IGNORE INTO query_state VALUES (1, 1)")
+            for table in watched_tables:
+                for event in ('INSERT', 'UPDATE', 'DELETE'):
+                    self.connection.execute(
+                        f"CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_stale AFTER {event} ON {table} "
+                        f"BEGIN UPDATE query_state SET stale = 1 WHERE stale = 0; END")
+
+    def close(self):
+        self.connection.close()
+
+    def is_stale(self):
+        return bool(self.connection.execute("SELECT stale FROM query_state").fetchone()[0])
+
+    def refresh(self, force=False):
+        # Rebuild every summary in one transaction, only when the store has changed
+        if not force and not self.is_stale():
+            return False
+        with self.connection:
+            for table, (query, index_columns) in summaries.items():
+                self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+                self.connection.execute(f"CREATE TABLE {table} AS {query}")
+                for columns in index_columns:
+                    self.connection.execute(f"CREATE INDEX {table}_{'_'.join(columns)} ON {table} ({', '.join(columns)})")
+            self.connection.execute("UPDATE query_state SET stale = 0")
+        return True
+
+    def query(self, sql, params=()):
+        self.refresh()
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def top_strike_rates(self, min_balls=60, count=15, by_position=False):
+        if not by_position:
+            return self.query("SELECT * FROM batting_summary WHERE balls >= ? ORDER BY strike_rate DESC LIMIT ?",
+                              (min_balls, count))
+        return self.query("""
+            SELECT * FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY position ORDER BY strike_rate DESC) AS position_rank
+                FROM batting_by_position WHERE balls >= ?)
+            WHERE position_rank <= ? ORDER BY position, position_rank""", (min_balls, count))
+
+    def top_run_scorers(self, count=15):
+        return self.query("SELECT * FROM batting_summary ORDER BY runs DESC LIMIT ?", (count,))
+
+    def economical_bowlers(self, min_balls=60, count=15):
+        return self.query("SELECT * FROM bowling_summary WHERE balls >= ? ORDER BY economy LIMIT ?", (min_balls, count))
+
+    def wicket_takers(self, count=15):
+        return self.query("SELECT * FROM bowling_summary ORDER BY wickets DESC, economy LIMIT ?", (count,))
+
+    def player(self, name):
+        # Squad details with the batting and bowling summary of one player
+        pattern = f"%{name}%"
+        return {
+            'squad': self.query("SELECT * FROM squads WHERE name LIKE ?", (pattern,)),
+            'batting': self.query("SELECT * FROM batting_summary WHERE name LIKE ?", (pattern,)),
+            'bowling': self.query("SELECT * FROM bowling_summary WHERE name LIKE ?", (pattern,)),
+        }
+
+    def teams(self):
+        return self.query("SELECT * FROM team_batting ORDER BY strike_rate DESC")
+
+
+def open_queries(folder):
+    # Reads the store written by the scrapers, see match_store.py
+    return SelectionQueries(os.path.join(folder, 'matches.sqlite'))
+
+
+def print_rows(rows, sort_column, columns, descending=True):
+    print_top(rows, sort_column, columns, count=len(rows), descending=descending)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Answer selection questions from the keyed match store')
+    parser.add_argument('--folder', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csv files'),
+                        help='Folder with matches.sqlite (load CSVs into it with match_store.py)')
+    parser.add_argument('--refresh', action='store_true', help='Rebuild the precomputed summaries even if nothing changed')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    strike_rates = commands.add_parser('strike-rates', help='Highest strike rates')
+    strike_rates.add_argument('--min-balls', type=int, default=60)
+    strike_rates.add_argument('--count', type=int, default=15)
+    strike_rates.add_argument('--by-position', action='store_true', help='Rank openers, top, middle and lower order separately')
+
+    runs = commands.add_parser('runs', help='Most runs')
+    runs.add_argument('--count', type=int, default=15)
+
+    economy = commands.add_parser('economy', help='Most economical bowlers')
+    economy.add_argument('--min-balls', type=int, default=60)
+    economy.add_argument('--count', type=int, default=15)
+
+    wickets = commands.add_parser('wickets', help='Most wickets')
+    wickets.add_argument('--count', type=int, default=15)
+
+    player = commands.add_parser('player', help='Squad details and summaries of a player')
+    player.add_argument('name')
+
+    commands.add_parser('teams', help='Team batting')
+
+    sql = commands.add_parser('sql', help='Run any read-only SQL against the store, its views and summaries')
+    sql.add_argument('statement')
+    args = parser.parse_args()
+
+    queries = open_queries(args.folder)
+    try:
+        if queries.refresh(force=args.refresh):
+            print("Rebuilt the precomputed summaries")
+
+        start = time.perf_counter()
+        batting_view = ['name', 'team', 'innings', 'runs', 'balls', 'average', 'strike_rate']
+        bowling_view = ['name', 'team', 'overs', 'wickets', 'economy', 'dot_pct']
+        if args.command == 'strike-rates':
+            rows = queries.top_strike_rates(args.min_balls, args.count, args.by_position)
+            if args.by_position:
+                for group, _, _ in position_groups:
+                    print(f"\n{group.capitalize()}")
+                    print_rows([row for row in rows if row['position'] == group], 'strike_rate', batting_view)
+            else:
+                print_rows(rows, 'strike_rate', batting_view)
+        elif args.command == 'runs':
+            rows = queries.top_run_scorers(args.count)
+            print_rows(rows, 'runs', batting_view)
+        elif args.command == 'economy':
+            rows = queries.economical_bowlers(args.min_balls, args.count)
+            print_rows(rows, 'economy', bowling_view, descending=False)
+        elif args.command == 'wickets':
+            rows = queries.wicket_takers(args.count)
+            print_rows(rows, 'wickets', bowling_view)
+        elif args.command == 'player':
+            rows = queries.player(args.name)
+            for section, section_rows in rows.items():
+                for row in section_rows:
+                    print(f"{section}: " + ', '.join(f"{key} {value}" for key, value in row.items() if key != 'player_key'))
+        elif args.command == 'teams':
+            rows = queries.teams()
+            print_rows(rows, 'strike_rate', ['team', 'matches', 'runs', 'balls', 'strike_rate', 'boundary_pct'])
+        else:
+            queries.refresh()
+            queries.connection.execute('PRAGMA query_only = ON')
+            try:
+                rows = queries.query(args.statement)
+            except sqlite3.Error as e:
+                parser.exit(1, f"SQL error: {e}\n")
+            if rows:
+                print('\t'.join(rows[0]))
+                for row in rows:
+                    print('\t'.join('' if value is None else str(value) for value in row.values()))
+        print(f"\n({(time.perf_counter() - start) * 1000:.1f} ms)")
+    finally:
+        queries.close()
@@ -0,0 +1,215 @@
+import argparse
+import os
+import re
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+from urllib.parse import urlparse
+
+from aggregates import open_aggregates
+from columnar import write_parquet_outputs
+from http_fetch import fetch_page
+import load_profile
+import metrics as run_metrics
+from metrics import log, metrics
+from match_store import open_store
+from page_cache import PageCache, cached_fetch
+from player_index import load_index
+import quarantine as page_quarantine
+from scorecard import (BrowserFetcher, all_kinds, collect_match_links, create_driver, folder_path, match_id_from_url,
+                       open_manifest, open_writers, parse_page, write_match)
+from scorecard_parser import parse_match_links
+from throttle import add_arguments, configure_from_args, throttled
+
+# Scorecards of several series in one job. Every series gets its own folder,
+# <output>/<season>/<series>, with the same CSVs, manifest, aggregates and
+# Parquet copies as a scorecard.py run. The match pages of all series share one
+# pool of workers and the per-host rate limit, and a match listed by more than
+# one series is only scraped for the first series that lists it
+
+fixtures_page = 'match-schedule-fixtures-and-results'
+
+# 2024 or 2023-24, as a whole part of the series slug
+season_pattern = re.compile(r'(?:^|-)((?:19|20)\d{2}(?:-\d{2})?)(?=-|$)')
+
+
+def series_root(url):
+    # Any page of a series, e.g. its fixtures list, to the series URL and slug
+    parsed = urlparse(url)
+    parts = parsed.path.strip('/').split('/')
+    if 'series' not in parts[:-1]:
+        raise ValueError(f"{url} is not a series URL")
+    slug = parts[parts.index('series') + 1]
+    return f"{parsed.scheme}://{parsed.netloc}/series/{slug}", slug
+
+
+def season_of(slug):
+    # The object id ends the slug, e.g. icc-men-s-t20-world-cup-2024-1411166 is season 2024
+    seasons = season_pattern.findall(re.sub(r'-\d+$', '', slug))
+    return seasons[-1] if seasons else 'unknown-season'
+
+
+class Series:
+    def __init__(self, url, output_root, kinds=all_kinds, use_manifest=True):
+        self.url, self.slug = series_root(url)
+        self.season = season_of(self.slug)
+        self.fixtures_url = f"{self.url}/{fixtures_page}"
+        self.folder = os.path.join(output_root, self.season, self.slug)
+        self.kinds = kinds
+        self.match_urls = []
+
+        self.writers = open_writers(kinds, self.folder)
+        self.manifest = open_manifest(self.folder) if use_manifest else None
+        self.aggregates = open_aggregates(self.folder)
+
+    def done_match_ids(self):
+        if not self.manifest:
+            return set()
+        return {match_id_from_url(url) for url in self.manifest.entries if self.manifest.is_done(url, self.kinds)}
+
+    def close(self):
+        self.aggregates.close()
+        write_parquet_outputs(self.folder, self.kinds)
+
+
+def read_series_file(path):
+    # One series URL per line; blank lines and # comments are skipped
+    with open(path, encoding='utf-8') as file:
+        return [line.strip() for line in file if line.strip() and not line.strip().startswith('#')]
+
+
+def open_series(urls, output_root, kinds=all_kinds, use_manifest=True):
+    series_list = []
+    seen = set()
+    for url in urls:
+        root, _ = series_root(url)
+        if root in seen:
+            continue  # The same series queued twice
+        seen.add(root)
+        series_list.append(Series(url, output_root, kinds, use_manifest))
+    return series_list
+
+
+def list_matches(series_list, fetch, cache=None, driver=None, workers=4):
+    # The fixtures lists need a browser for 'Show More'; over HTTP they are
+    # fetched in parallel like any other page
+    if driver is not None:
+        for series in series_list:
+            series.match_urls = collect_match_links(driver, cache, series.fixtures_url)
+    else:
+        def fixtures(series):
+            return parse_match_links(cached_fetch(cache, fetch, series.fixtures_url), series.fixtures_url)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for series, match_urls in zip(series_list, executor.map(fixtures, series_list)):
+                series.match_urls = match_urls
+
+    for series in series_list:
+        log.info(f"{series.slug}: {len(series.match_urls)} matches")
+
+
+def schedule(series_list):
+    # Each match belongs to the first series that lists it, and matches finished
+    # in an earlier run (under any series) are dropped. The series are then
+    # interleaved so all of them make progress together
+    done_ids = set().union(*(series.done_match_ids() for series in series_list))
+    owners = {}
+    queues = []
+    for series in series_list:
+        queue = []
+        for match_url in series.match_urls:
+            match_id = match_id_from_url(match_url)
+            if match_id in owners:
+                metrics.count('duplicate_matches')
+                log.info(f"{match_url} is already scraped for {owners[match_id].slug}")
+                continue
+            owners[match_id] = series
+            if match_id not in done_ids:
+                queue.append((series, match_url))
+        queues.append(queue)
+    return [item for items in zip_longest(*queues) for item in items if item is not None]
+
+
+def crawl(series_list, fetch, workers=4, index=None, store=None):
+    work = schedule(series_list)
+    log.info(f"{len(work)} matches to scrape across {len(series_list)} series")
+
+    def fetch_and_parse(item):
+        _, match_url = item
+        try:
+            return parse_page(fetch(match_url), match_url), None
+        except Exception as e:
+            return None, e
+
+    # One pool for every series; results come back in queue order, so each
+    # series' CSVs are written in fixture order whatever the workers do
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (series, match_url), (scorecard, error) in zip(work, executor.map(fetch_and_parse, work)):
+            if error is not None:
+                metrics.count('match_failures')
+                log.error(f"Error scraping match {match_url} of {series.slug}: {error}")
+                continue
+            try:
+                write_match(series.writers, scorecard, match_url, series.manifest, index, series.aggregates, store)
+            except Exception as e:
+                metrics.count('match_failures')
+                log.error(f"Error saving match {match_url} of {series.slug}: {e}")
+                log.debug(traceback.format_exc())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scrape the scorecards of several series into one folder per season and series')
+    parser.add_argument('series', nargs='*',
+                        help='Series URLs, e.g. https://www.espncricinfo.com/series/icc-men-s-t20-world-cup-2024-1411166')
+    parser.add_argument('--series-file', help='File with one series URL per line')
+    parser.add_argument('--output-dir', default=folder_path, help='Root folder; each series is written to <season>/<series> under it')
+    parser.add_argument('--kinds', nargs='+', choices=all_kinds, default=list(all_kinds))
+    parser.add_argument('--workers', type=int, default=4, help='Match pages fetched in parallel across all series')
+    parser.add_argument('--http', action='store_true',
+                        help='Fetch fixtures lists and match pages with a plain HTTP client instead of browsers')
+    parser.add_argument('--cache-dir', help='Page cache shared by all series (default: page_cache in the output folder)')
+    parser.add_argument('--no-cache', action='store_true', help='Always fetch pages from the site')
+    parser.add_argument('--no-manifest', action='store_true', help='Scrape every match again instead of only the new ones')
+    add_arguments(parser)
+    load_profile.add_arguments(parser)
+    page_quarantine.add_arguments(parser)
+    run_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    page_quarantine.configure_from_args(args, args.output_dir)
+    run_metrics.configure_logging(args.verbose)
+
+    urls = list(args.series) + (read_series_file(args.series_file) if args.series_file else [])
+    if not urls:
+        parser.error('give at least one series URL or --series-file')
+
+    cache = None if args.no_cache else PageCache(args.cache_dir or os.path.join(args.output_dir, 'page_cache'))
+    series_list = open_series(urls, args.output_dir, tuple(args.kinds), use_manifest=not args.no_manifest)
+
+    # Player ids are shared by every series, so one index sits at the root, and
+    # so does the keyed store, whose rows carry their series
+    index = load_index(args.output_dir)
+    store = open_store(args.output_dir)
+
+    driver = None
+    fetcher = fetch_page
+    if not args.http:
+        driver = create_driver(profile=args.profile)
+        fetcher = BrowserFetcher(profile=args.profile)
+    fetch_politely = throttled(fetcher)
+    try:
+        list_matches(series_list, fetch_politely, cache, driver, args.workers)
+        fetch = lambda match_url: cached_fetch(cache, fetch_politely, match_url, pin_completed=True)
+        crawl(series_list, fetch, args.workers, index, store)
+    finally:
+        if driver:
+            fetcher.close()
+            driver.quit()
+            log.info(load_profile.load_report.summary())
+        for series in series_list:
+            series.close()
+        store.close()
+
+    for series in series_list:
+        print(f"{series.slug}: {series.folder}")
+    run_metrics.finish_run('series_crawler', args.metrics_dir or args.output_dir)
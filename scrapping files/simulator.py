@@ -0,0 +1,292 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from best11 import csv_folder, default_constraints, load_stats, score_players, select_best_xi
+from player_index import team_key
+
+# Monte Carlo matches between candidate XIs and an opponent XI. Every player gets
+# per-ball scoring and dismissal rates fitted from the scraped innings (shrunk
+# towards the tournament rates for their batting position), bowlers get per-ball
+# economy and wicket rates, and whole matches are drawn as arrays of shape
+# (candidates, simulations, batters) with no per-ball or per-match Python loop.
+# Batches of candidates are spread over a process pool, and each batch has its
+# own seed, so results do not depend on the number of workers
+
+innings_balls = 120
+overs_per_bowler = 4
+bowlers_used = innings_balls // (6 * overs_per_bowler)
+
+# Innings of prior weight, in balls, when shrinking a player's rates
+prior_balls = 30.0
+# A part-time bowler concedes this much more per ball, and takes wickets this much less often
+part_timer_factor = 1.25
+
+# Batches are sized so one batch's arrays stay around a few tens of MB
+batch_cells = 2_000_000
+
+
+def fit_model(batting, bowling, stats):
+    # Per-player arrays, aligned with the rows of `stats` (best11.score_players)
+    batting = batting.assign(
+        out=(batting['not_out'] == 'Out').astype(np.int64),
+        runs=pd.to_numeric(batting['runs'], errors='coerce').fillna(0),
+        balls=pd.to_numeric(batting['balls'], errors='coerce').fillna(0),
+        bat_pos=pd.to_numeric(batting['bat_pos'], errors='coerce').fillna(11).clip(1, 11),
+    )
+    by_position = batting.groupby('bat_pos')[['runs', 'balls', 'out']].sum().reindex(range(1, 12), fill_value=0)
+    position_rpb = (by_position['runs'] / by_position['balls'].clip(lower=1)).to_numpy()
+    position_out = (by_position['out'] / by_position['balls'].clip(lower=1)).to_numpy()
+    position_out = np.clip(position_out, 0.01, None)
+
+    # Each player is shrunk towards the rates of the position they usually bat at;
+    # players who never batted are treated as number 11
+    usual_position = batting.groupby('player_id')['bat_pos'].median().round().astype(int)
+    player_ids = stats['player_id'].to_numpy()
+    order = usual_position.reindex(player_ids).fillna(11).to_numpy(dtype=np.int64)
+    runs = stats['runs'].fillna(0).to_numpy(dtype=np.float64)
+    balls = stats['balls'].fillna(0).to_numpy(dtype=np.float64)
+    outs = stats['outs'].fillna(0).to_numpy(dtype=np.float64)
+    bat_rpb = (runs + prior_balls * position_rpb[order - 1]) / (balls + prior_balls)
+    bat_out = (outs + prior_balls * position_out[order - 1]) / (balls + prior_balls)
+
+    # Innings scores are overdispersed next to a Poisson count (boundaries come in
+    # fours and sixes), so runs are drawn from a gamma-Poisson mixture whose shape
+    # is fitted by moments over every innings
+    player_rpb = pd.Series(bat_rpb, index=player_ids)
+    expected = batting['balls'].to_numpy() * player_rpb.reindex(batting['player_id']).to_numpy()
+    excess = ((batting['runs'].to_numpy() - expected) ** 2 - expected).sum()
+    dispersion = float(np.clip((expected ** 2).sum() / max(excess, 1e-9), 0.5, 50.0))
+
+    balls_bowled = stats['balls_bowled'].fillna(0).to_numpy(dtype=np.float64)
+    runs_conceded = stats['runs_conceded'].fillna(0).to_numpy(dtype=np.float64)
+    wickets = stats['wickets'].fillna(0).to_numpy(dtype=np.float64)
+    league_rpb = runs_conceded.sum() / max(balls_bowled.sum(), 1)
+    league_wpb = wickets.sum() / max(balls_bowled.sum(), 1)
+    bowl_rpb = (runs_conceded + prior_balls * league_rpb) / (balls_bowled + prior_balls)
+    bowl_wpb = (wickets + prior_balls * league_wpb) / (balls_bowled + prior_balls)
+
+    extras = pd.to_numeric(bowling['wides'], errors='coerce').fillna(0).sum() + \
+        pd.to_numeric(bowling['no_balls'], errors='coerce').fillna(0).sum()
+    return {
+        'order': order,
+        'bat_rpb': bat_rpb,
+        'bat_out': bat_out,
+        'dispersion': dispersion,
+        'bowl_balls': balls_bowled,
+        'bowl_rpb': bowl_rpb,
+        'bowl_wpb': bowl_wpb,
+        'league_rpb': league_rpb,
+        'league_wpb': league_wpb,
+        'extras_per_ball': extras / max(balls_bowled.sum(), 1),
+    }
+
+
+def attack_rates(model, xis):
+    # Per-ball runs and wickets of each XI's attack: the five most used bowlers
+    # bowl their four overs, and part-timers bowl whatever is left
+    bowled = model['bowl_balls'][xis]
+    ranked = np.argsort(-bowled, axis=1, kind='stable')[:, :bowlers_used]
+    chosen = np.take_along_axis(xis, ranked, axis=1)
+    is_bowler = model['bowl_balls'][chosen] > 0
+    quota = 6 * overs_per_bowler
+    part_time_balls = innings_balls - quota * is_bowler.sum(axis=1)
+    runs = quota * (model['bowl_rpb'][chosen] * is_bowler).sum(axis=1) + \
+        part_time_balls * model['league_rpb'] * part_timer_factor
+    wickets = quota * (model['bowl_wpb'][chosen] * is_bowler).sum(axis=1) + \
+        part_time_balls * model['league_wpb'] / part_timer_factor
+    return runs / innings_balls, wickets / innings_balls
+
+
+def batting_order(model, xis):
+    return np.take_along_axis(xis, np.argsort(model['order'][xis], axis=1, kind='stable'), axis=1)
+
+
+def simulate_innings(model, batters, attack_rpb, attack_wpb, simulations, rng):
+    # batters: (candidates, 11) player indices in batting order; returns total
+    # runs of shape (candidates, simulations). Batters face balls one at a time
+    # until they are out, the tenth wicket or the last ball ends the innings
+    scale_rpb = (attack_rpb / model['league_rpb'])[:, None]
+    scale_wpb = (attack_wpb / model['league_wpb'])[:, None]
+    rpb = model['bat_rpb'][batters[:, :10]] * scale_rpb
+    out = np.clip(model['bat_out'][batters[:, :10]] * scale_wpb, 1e-3, 0.5)
+
+    # Balls until each batter is out are geometric, drawn by inverting the CDF in
+    # float32, which is several times faster than Generator.geometric
+    size = (len(batters), simulations, 10)
+    log_survive = np.log1p(-out).astype(np.float32)[:, None, :]
+    until_out = np.floor(np.log(1 - rng.random(size, dtype=np.float32)) / log_survive) + 1
+    ends = np.minimum(np.cumsum(until_out, axis=2), innings_balls)
+    faced = np.diff(ends, axis=2, prepend=0)
+
+    # A sum of Poisson counts is Poisson in the summed means, so after drawing each
+    # batter's gamma-distributed scoring rate one Poisson draw per innings covers
+    # every batter and the extras
+    shape = model['dispersion']
+    mean = rng.standard_gamma(shape, size, dtype=np.float32) * (faced * (rpb / shape).astype(np.float32)[:, None, :])
+    return rng.poisson(mean.sum(axis=2) + ends[:, :, -1] * model['extras_per_ball'])
+
+
+def simulate_batch(model, xis, opponent, simulations, seed):
+    # Win probability of each candidate XI against one opponent XI; innings are
+    # independent, so which side bats first does not change the result, and ties
+    # count as half a win (super over)
+    rng = np.random.default_rng(seed)
+    opponents = np.broadcast_to(opponent, xis.shape)
+    candidate_rpb, candidate_wpb = attack_rates(model, xis)
+    opponent_rpb, opponent_wpb = attack_rates(model, opponents[:1])
+
+    scored = simulate_innings(model, batting_order(model, xis), opponent_rpb.repeat(len(xis)),
+                              opponent_wpb.repeat(len(xis)), simulations, rng)
+    conceded = simulate_innings(model, batting_order(model, opponents), candidate_rpb, candidate_wpb, simulations, rng)
+    wins = (scored > conceded).mean(axis=1) + 0.5 * (scored == conceded).mean(axis=1)
+    return wins, scored.mean(axis=1), conceded.mean(axis=1)
+
+
+worker_model = None
+
+
+def set_worker_model(model):
+    global worker_model
+    worker_model = model
+
+
+def run_batch(task):
+    xis, opponent, simulations, seed = task
+    return simulate_batch(worker_model, xis, opponent, simulations, seed)
+
+
+def rank_xis(model, xis, opponent, simulations=5000, workers=None, seed=0):
+    # xis: (candidates, 11) player indices; returns win probability, mean runs
+    # scored and mean runs conceded per candidate
+    xis = np.asarray(xis, dtype=np.int64)
+    opponent = np.asarray(opponent, dtype=np.int64)
+    batch = max(1, batch_cells // (simulations * 11))
+    chunks = [xis[start:start + batch] for start in range(0, len(xis), batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(chunk, opponent, simulations, chunk_seed) for chunk, chunk_seed in zip(chunks, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        results = [simulate_batch(model, *task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=set_worker_model,
+                                 initargs=(model,)) as executor:
+            results = list(executor.map(run_batch, tasks))
+    return tuple(np.concatenate(column) for column in zip(*results))
+
+
+flag_columns = ['is_keeper', 'is_opener', 'is_bowling_option', 'is_specialist_bowler']
+minimum_keys = ['min_keepers', 'min_openers', 'min_bowling_options', 'min_specialist_bowlers']
+
+
+def xi_flags(stats, xis):
+    # Role counts of each XI, in the order of the best11 constraints
+    return np.stack([stats[column].to_numpy(dtype=np.int64)[xis].sum(axis=1) for column in flag_columns], axis=1)
+
+
+def team_stats(stats, team):
+    return stats[stats['team'].map(team_key) == team_key(team)]
+
+
+def squad_constraints(players, constraints=None):
+    # A single squad often lists fewer specialists (say, no 'Opening Batter') than
+    # the tournament-wide minimums ask for, so each minimum is capped at what it has
+    constraints = {**default_constraints, **(constraints or {})}
+    for column, key in zip(flag_columns, minimum_keys):
+        constraints[key] = min(constraints[key], int(players[column].sum()))
+    return constraints
+
+
+def best_xi(stats, team=None, constraints=None):
+    # Rows of `stats` (which every model array is aligned with) of the best XI by score
+    players = team_stats(stats, team) if team else stats
+    chosen = select_best_xi(players, squad_constraints(players, constraints))
+    return pd.Index(stats['player_id']).get_indexer(chosen['player_id'])
+
+
+def candidate_xis(stats, count, team=None, constraints=None, pool_size=30, rng=None):
+    # The best XI by score first, then distinct random XIs drawn from the
+    # highest-scoring players that still meet the role constraints
+    players = team_stats(stats, team) if team else stats
+    constraints = squad_constraints(players, constraints)
+    rng = rng or np.random.default_rng(0)
+    best = best_xi(stats, team, constraints)
+
+    pool = players.sort_values('score', ascending=False, kind='stable').index.to_numpy()[:pool_size]
+    pool = np.union1d(pool, best)
+    minimums = np.array([constraints[key] for key in minimum_keys])
+    team_codes = pd.factorize(stats['team'].map(team_key))[0]
+    found = {tuple(np.sort(best))}
+    xis = [best]
+    for _ in range(50):
+        if len(xis) >= count:
+            break
+        draws = np.argsort(rng.random((4 * count, len(pool))), axis=1)[:, :constraints['size']]
+        draws = np.sort(pool[draws], axis=1)
+        valid = draws[(xi_flags(stats, draws) >= minimums).all(axis=1)]
+        if constraints['max_per_team']:
+            most = np.array([np.bincount(row).max() for row in team_codes[valid]], dtype=np.int64)
+            valid = valid[most <= constraints['max_per_team']]
+        for xi in valid:
+            if len(xis) < count and tuple(xi) not in found:
+                found.add(tuple(xi))
+                xis.append(xi)
+    return np.array(xis)
+
+
+def find_players(stats, names):
+    # Case-insensitive, unique substring match of each name
+    indexes = []
+    lowered = stats['name'].str.lower()
+    for name in names:
+        matches = stats.index[lowered == name.strip().lower()]
+        if len(matches) == 0:
+            matches = stats.index[lowered.str.contains(name.strip().lower(), regex=False)]
+        if len(matches) != 1:
+            raise ValueError(f"{name!r} matches {len(matches)} players")
+        indexes.append(matches[0])
+    if len(indexes) != 11:
+        raise ValueError(f"An XI needs 11 players, got {len(indexes)}")
+    return np.array(indexes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rank candidate XIs by simulated win probability against an opponent XI')
+    parser.add_argument('--csv-dir', default=csv_folder)
+    parser.add_argument('--team', help='Pick candidates from this team only (default: every player)')
+    parser.add_argument('--xi', action='append', default=[], help='Comma-separated names of an XI to rank (repeatable)')
+    parser.add_argument('--candidates', type=int, default=200, help='Random role-valid XIs to rank when no --xi is given')
+    parser.add_argument('--opponent', help="Play this team's best XI (default: the tournament's best XI)")
+    parser.add_argument('--opponent-xi', help='Comma-separated names of the opponent XI')
+    parser.add_argument('--simulations', type=int, default=5000, help='Matches simulated per candidate')
+    parser.add_argument('--workers', type=int, default=None, help='Processes (default: one per CPU)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    batting, bowling, players = load_stats(args.csv_dir)
+    stats = score_players(batting, bowling, players)
+    model = fit_model(batting, bowling, stats)
+
+    if args.xi:
+        xis = np.array([find_players(stats, xi.split(',')) for xi in args.xi])
+    else:
+        xis = candidate_xis(stats, args.candidates, args.team, rng=np.random.default_rng(args.seed))
+    opponent = find_players(stats, args.opponent_xi.split(',')) if args.opponent_xi else best_xi(stats, args.opponent)
+
+    start = time.perf_counter()
+    wins, scored, conceded = rank_xis(model, xis, opponent, args.simulations, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+
+    names = stats['name'].to_numpy()
+    print(f"Opponent: {', '.join(names[batting_order(model, opponent[None, :])[0]])}\n")
+    for rank, candidate in enumerate(np.argsort(-wins, kind='stable')[:args.top], 1):
+        order = batting_order(model, xis[candidate:candidate + 1])[0]
+        print(f"{rank:>2}. win {100 * wins[candidate]:5.1f}%  scores {scored[candidate]:5.1f}, "
+              f"concedes {conceded[candidate]:5.1f}  {', '.join(names[order])}")
+    print(f"\nSimulated {len(xis) * args.simulations:,} matches for {len(xis)} XIs in {elapsed:.2f}s")
@@ -0,0 +1,70 @@
+from urllib.parse import urljoin
+
+from lxml import html as lxml_html
+
+from scorecard_parser import element_text, has_classes, site_url
+
+# Offline extraction for the squads index and the squad pages of a series
+
+country_xpath = f"//*[{has_classes('ds-flex', 'ds-flex-row', 'ds-space-x-2', 'ds-items-center')}]"
+player_xpath = f"//*[{has_classes('ds-relative', 'ds-flex', 'ds-flex-row', 'ds-space-x-4', 'ds-p-3')}]"
+name_xpath = f".//span[{has_classes('ds-text-compact-s', 'ds-font-bold')}]"
+role_xpath = f".//p[{has_classes('ds-text-tight-s')}]"
+info_xpath = (f".//div[({has_classes('ds-flex', 'ds-items-center', 'ds-space-x-1')}) or "
+              f"({has_classes('ds-flex', 'ds-items-start', 'ds-space-x-1')})]")
+
+squad_header = ['Country', 'Name', 'Role', 'Age', 'Batting Type', 'Bowling Type', 'Image URL']
+
+
+def parse_squad_links(page_source, base=site_url):
+    # (country name, squad URL) for every country on the squads index, in page order
+    document = lxml_html.fromstring(page_source)
+    links = []
+    seen = set()
+    for country in document.xpath(country_xpath):
+        images = country.xpath('.//img[@alt]')
+        anchors = country.xpath('.//a[@href]')
+        if not images or not anchors:
+            continue
+        country_name = images[0].get('alt')
+        if country_name in seen:
+            continue
+        seen.add(country_name)
+        links.append((country_name, urljoin(base, anchors[0].get('href'))))
+    return links
+
+
+def get_player_info(player, label):
+    for div in player.xpath(info_xpath):
+        # Check if the div contains the label
+        if label in element_text(div):
+            spans = div.findall('.//span')
+            if len(spans) > 1:
+                # The second span contains the value
+                return element_text(spans[1])
+    return "Not Available"
+
+
+def first_text(element, xpath):
+    found = element.xpath(xpath)
+    return element_text(found[0]) if found else ''
+
+
+def parse_squad(page_source, country_name):
+    document = lxml_html.fromstring(page_source)
+    rows = []
+    for player in document.xpath(player_xpath):
+        name = first_text(player, name_xpath)
+        if not name:
+            continue
+        images = player.xpath('.//img')
+        rows.append([
+            country_name,
+            name,
+            first_text(player, role_xpath),
+            get_player_info(player, 'Age:'),
+            get_player_info(player, 'Batting:'),
+            get_player_info(player, 'Bowling:'),
+            images[0].get('src', '') if images else '',
+        ])
+    return rows
@@ -0,0 +1,105 @@
+import re
+
+from lxml import html as lxml_html
+
+from metrics import log, metrics
+from scorecard_parser import element_text, has_classes
+
+# Offline extraction for the Cricbuzz mobile series matches list used by
+# match_summary.py. The list is in the server HTML, so no browser is needed
+
+match_xpath = f"//a[{has_classes('w-full', 'bg-cbWhite', 'flex', 'flex-col', 'p-3', 'gap-1')}]"
+venue_xpath = f".//div[{has_classes('text-xs', 'text-cbTxtSec', 'dark:text-cbTxtSec')}]"
+scores_xpath = f".//div[{has_classes('flex', 'flex-col', 'gap-3', 'my-2')}]/div"
+result_xpath = f".//span[{has_classes('text-cbComplete')}]"
+
+summary_header = ['Team 1', 'Team 2', 'Match No', 'Group', 'Venue', 'Team 1 Runs', 'Team 1 Wickets', 'Team 1 Overs',
+                  'Team 2 Runs', 'Team 2 Wickets', 'Team 2 Overs', 'Margin', 'Winner']
+
+
+# Helper function to extract runs, wickets, and overs
+def extract_score(score_str):
+    default_wickets = '10'
+    runs = ''
+    wickets = default_wickets
+    overs = '0.0'
+
+    if '-' in score_str:
+        runs_wickets = score_str.split('-')
+        runs = runs_wickets[0].strip() if len(runs_wickets) > 0 else ''
+        if len(runs_wickets) > 1:
+            wickets = runs_wickets[1].split(' ')[0].strip()
+    else:
+        runs = re.split(r'\s*\(', score_str)[0].strip()
+
+    overs_match = re.search(r'\((\d+(\.\d+)?)\)', score_str)
+    if overs_match:
+        overs = overs_match.group(1)
+
+    runs = re.sub(r'\D', '', runs)
+    wickets = re.sub(r'\D', '', wickets) if wickets else default_wickets
+
+    try:
+        overs = float(overs.replace(',', '.'))
+    except ValueError:
+        overs = 0.0
+
+    return runs, wickets, overs
+
+
+def parse_match_div(match_div):
+    # Extract match title
+    title = match_div.get('title') or ''
+    title_parts = title.split(', ')
+    if len(title_parts) >= 3:
+        team1, team2 = title_parts[0].split(' vs ')
+        match_no = title_parts[1].replace('Match ', '')
+        group = title_parts[2].replace('Group ', '')
+    else:
+        team1, team2 = 'NA', 'NA'
+        match_no, group = 'NA', 'NA'
+
+    # Extract venue
+    venue_text = element_text(match_div.xpath(venue_xpath)[0])
+    venue = venue_text.split('•')[-1].strip() if '•' in venue_text else 'NA'
+
+    # Extract scores
+    score_divs = match_div.xpath(scores_xpath)
+    if len(score_divs) == 2:
+        team1_runs, team1_wickets, team1_overs = extract_score(element_text(score_divs[0]))
+        team2_runs, team2_wickets, team2_overs = extract_score(element_text(score_divs[1]))
+    else:
+        team1_runs, team1_wickets, team1_overs = 'NA', 'NA', 'NA'
+        team2_runs, team2_wickets, team2_overs = 'NA', 'NA', 'NA'
+
+    # Extract match result
+    result_text = element_text(match_div.xpath(result_xpath)[0])
+    if 'won' in result_text:
+        margin = re.search(r'by (.+)', result_text)
+        winner = result_text
+        margin = margin.group(1) if margin else 'NA'
+    else:
+        winner = result_text
+        margin = 'NA'
+        # Set scores and overs to 'NA' if the match result doesn't contain 'won'
+        team1_runs, team1_wickets, team1_overs = 'NA', 'NA', 'NA'
+        team2_runs, team2_wickets, team2_overs = 'NA', 'NA', 'NA'
+
+    return [team1, team2, match_no, group, venue, team1_runs, team1_wickets, team1_overs,
+            team2_runs, team2_wickets, team2_overs, margin, winner]
+
+
+def count_matches(page_source):
+    return len(lxml_html.fromstring(page_source).xpath(match_xpath))
+
+
+def parse_match_summaries(page_source):
+    matches = []
+    for match_div in lxml_html.fromstring(page_source).xpath(match_xpath):
+        try:
+            matches.append(parse_match_div(match_div))
+        except Exception as e:
+            metrics.count('parse_failures')
+            log.warning(f"Error parsing match: {e}")
+            matches.append(['NA'] * 13)  # Fill with 'NA' in case of an error
+    return matches
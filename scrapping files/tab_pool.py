@@ -0,0 +1,134 @@
+from selenium.common.exceptions import NoSuchWindowException, TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from load_profile import filter_tab, load_report
+from metrics import log, metrics
+
+# Long-lived worker tab for loading pages in a browser. Instead of opening and
+# closing a tab for every match, one tab is navigated again and again and only
+# replaced after a number of pages, when its JavaScript heap has grown too much,
+# or when its renderer has crashed
+
+default_max_pages = 100
+default_max_heap_growth = 256 * 1024 * 1024
+
+heap_script = 'return (window.performance && performance.memory) ? performance.memory.usedJSHeapSize : null;'
+
+
+def is_crash(error):
+    message = str(error).lower()
+    return isinstance(error, NoSuchWindowException) or 'tab crashed' in message or 'target window already closed' in message
+
+
+class WorkerTab:
+    def __init__(self, driver, max_pages=default_max_pages, max_heap_growth=default_max_heap_growth):
+        self.driver = driver
+        self.max_pages = max_pages
+        self.max_heap_growth = max_heap_growth
+
+        # The window the driver was on stays the home window (e.g. the fixtures list)
+        self.home = driver.current_window_handle
+        self.handle = None
+        self.pages = 0
+        self.baseline_heap = None
+        self.recycled = 0
+        self.crashes = 0
+
+    def _open(self):
+        self.driver.switch_to.new_window('tab')
+        self.handle = self.driver.current_window_handle
+        filter_tab(self.driver)
+        self.pages = 0
+        self.baseline_heap = None
+
+    def _discard(self):
+        # Close the worker tab, ignoring a renderer that is already gone
+        if self.handle is not None:
+            try:
+                if self.handle in self.driver.window_handles:
+                    self.driver.switch_to.window(self.handle)
+                    self.driver.close()
+            except WebDriverException:
+                pass
+        self.handle = None
+
+    def is_healthy(self):
+        if self.handle is None or self.handle not in self.driver.window_handles:
+            return False
+        try:
+            self.driver.switch_to.window(self.handle)
+            self.driver.execute_script('return document.readyState;')
+            return True
+        except WebDriverException:
+            return False
+
+    def _heap_size(self):
+        try:
+            return self.driver.execute_script(heap_script)
+        except WebDriverException:
+            return None
+
+    def _needs_recycling(self):
+        if self.pages >= self.max_pages:
+            return True
+        heap = self._heap_size()
+        if heap is None:
+            return False
+        if self.baseline_heap is None:
+            self.baseline_heap = heap
+            return False
+        return heap - self.baseline_heap > self.max_heap_growth
+
+    def _load(self, url, wait_selector, timeout, prepare):
+        if not self.is_healthy():
+            self._discard()
+            self._open()
+        with metrics.timer('navigation'):
+            self.driver.get(url)
+        try:
+            with metrics.timer('wait'):
+                WebDriverWait(self.driver, timeout).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector))
+                )
+        except TimeoutException:
+            metrics.count('timeouts')
+            raise
+        if prepare:
+            # Pages that render more on demand (e.g. older overs on scroll)
+            with metrics.timer('wait'):
+                prepare(self.driver)
+        self.pages += 1
+        metrics.count('pages_browser')
+        page_source = self.driver.page_source
+        load_report.record(self.driver, url)
+        return page_source
+
+    def load(self, url, wait_selector, timeout=10, prepare=None):
+        try:
+            try:
+                page_source = self._load(url, wait_selector, timeout, prepare)
+            except WebDriverException as e:
+                if not is_crash(e):
+                    raise
+                # A crashed renderer costs one retry in a fresh tab, not the run
+                log.warning(f"Worker tab crashed on {url}, replacing it")
+                metrics.count('tab_crashes')
+                self.crashes += 1
+                self._discard()
+                page_source = self._load(url, wait_selector, timeout, prepare)
+
+            if self._needs_recycling():
+                self._discard()
+                metrics.count('tab_recycles')
+                self.recycled += 1
+            return page_source
+        finally:
+            self.driver.switch_to.window(self.home)
+
+    def close(self):
+        self._discard()
+        try:
+            self.driver.switch_to.window(self.home)
+        except WebDriverException:
+            pass
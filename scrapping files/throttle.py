@@ -0,0 +1,114 @@
+import http.client
+import random
+import sys
+import threading
+import time
+import urllib.error
+from urllib.parse import urlparse
+
+from metrics import log, metrics
+
+# Request pacing shared by the scrapers: a token bucket per host decides when the
+# next request may go out, and requests that failed for a transient reason are
+# retried with exponential backoff
+
+default_rate = 1.0   # Requests per second per host
+default_burst = 3    # Requests that may go out back to back after an idle spell
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class HostRateLimiter:
+    def __init__(self, rate=default_rate, burst=default_burst):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def configure(self, rate=None, burst=None):
+        with self.lock:
+            if rate is not None:
+                self.rate = rate
+            if burst is not None:
+                self.burst = burst
+            self.buckets = {}
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+
+# One limiter for the whole process so every scraper shares the same budget
+rate_limiter = HostRateLimiter()
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    # Exponential backoff with full jitter: 0..1s, 0..2s, 0..4s, ... capped
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_transient(error):
+    # Timeouts, dropped connections, rate limiting and server errors may go away
+    # on another try. Anything else (404, 410, a page that fails to parse) will not
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code == 429 or error.code >= 500
+    if isinstance(error, (TimeoutError, ConnectionError, urllib.error.URLError, http.client.IncompleteRead)):
+        return True
+    # Browser errors; selenium is only loaded by the browser paths
+    selenium_errors = sys.modules.get('selenium.common.exceptions')
+    if selenium_errors and isinstance(error, selenium_errors.WebDriverException):
+        return not isinstance(error, (selenium_errors.InvalidArgumentException, selenium_errors.InvalidSelectorException))
+    return False
+
+
+def fetch_with_retries(fetch, url, retries=3, limiter=None):
+    limiter = limiter or rate_limiter
+    for attempt in range(retries):
+        with metrics.timer('throttle'):
+            limiter.wait(url)
+        try:
+            return fetch(url)
+        except Exception as e:
+            if attempt == retries - 1 or not is_transient(e):
+                metrics.count('fetch_failures')
+                raise
+            delay = backoff_delay(attempt)
+            metrics.count('retries')
+            log.warning(f"Attempt {attempt + 1} for {url} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def throttled(fetch, retries=3, limiter=None):
+    return lambda url: fetch_with_retries(fetch, url, retries, limiter)
+
+
+def add_arguments(parser):
+    parser.add_argument('--rate', type=float, default=default_rate, help='Requests per second allowed per host')
+    parser.add_argument('--burst', type=int, default=default_burst, help='Requests allowed back to back per host')
+
+
+def configure_from_args(args):
+    rate_limiter.configure(args.rate, args.burst)